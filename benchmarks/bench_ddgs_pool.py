@@ -0,0 +1,134 @@
+"""
+DDGS 客户端复用的吞吐量基准测试
+
+在本地启动一个模拟 DuckDuckGo 的 HTTP 服务，用一个行为类似 DDGS 的替身客户端
+（首次请求需要额外获取令牌，连接和令牌保存在客户端对象中）对比：
+
+- before: 每次搜索新建客户端（旧实现）
+- after:  通过 ClientPool 复用客户端（新实现）
+
+用法:
+    PYTHONPATH=src python benchmarks/bench_ddgs_pool.py [--queries 200] [--threads 4]
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from multienginesearch.clientpool import ClientPool
+from multienginesearch.engines import DuckDuckGoEngine
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """模拟 DuckDuckGo：/token 模拟 vqd 令牌获取，/search 返回结果"""
+
+    protocol_version = "HTTP/1.1"
+    token_latency = 0.03
+    search_latency = 0.01
+
+    def do_GET(self):
+        if self.path.startswith("/token"):
+            time.sleep(self.token_latency)
+            body = b'{"vqd": "stub-token"}'
+        else:
+            time.sleep(self.search_latency)
+            items = [
+                {"title": f"Result {i}", "href": f"http://stub/{i}", "body": "stub"}
+                for i in range(10)
+            ]
+            body = json.dumps(items).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_stub_ddgs(base_url):
+    """构造指向本地服务的 DDGS 替身类"""
+
+    class StubDDGS:
+        def __init__(self):
+            self.session = requests.Session()
+            self.token = None
+            self.sleep_timestamp = 0.0
+
+        def text(self, keywords, region, safesearch, timelimit, max_results):
+            if self.token is None:
+                self.token = self.session.get(f"{base_url}/token").json()["vqd"]
+            response = self.session.get(
+                f"{base_url}/search", params={"q": keywords, "vqd": self.token}
+            )
+            return response.json()[:max_results]
+
+    return StubDDGS
+
+
+class FreshClientPool(ClientPool):
+    """模拟旧实现：每次搜索都新建客户端，用完即丢弃"""
+
+    def acquire(self):
+        self.created += 1
+        return self.factory()
+
+    def release(self, client, error=None):
+        pass
+
+
+def run(engine, queries, threads):
+    """并发执行搜索并返回 (耗时, 每秒查询数)"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda i: engine.search(f"query {i}", 10), range(queries)))
+    elapsed = time.perf_counter() - started
+    return elapsed, queries / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--json", action="store_true", help="输出 JSON 格式结果")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stub_ddgs = make_stub_ddgs(f"http://127.0.0.1:{server.server_port}")
+
+    results = {}
+    for label, pool in [
+        ("before", FreshClientPool(stub_ddgs)),
+        ("after", ClientPool(stub_ddgs, max_size=args.threads)),
+    ]:
+        engine = DuckDuckGoEngine(pool=pool)
+        elapsed, qps = run(engine, args.queries, args.threads)
+        results[label] = {
+            "elapsed": round(elapsed, 4),
+            "qps": round(qps, 2),
+            "clients_created": pool.created,
+        }
+
+    server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for label, data in results.items():
+            print(
+                f"{label:>6}: {data['qps']:8.2f} 查询/秒  "
+                f"耗时 {data['elapsed']:.3f}s  新建客户端 {data['clients_created']} 个"
+            )
+        speedup = results["after"]["qps"] / results["before"]["qps"]
+        print(f"加速比: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
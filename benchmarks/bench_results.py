@@ -0,0 +1,140 @@
+"""
+结果模型内存占用和序列化吞吐量基准测试
+
+对比：
+
+- before: 普通 __dict__ 结果类，json.dumps(to_dict()) 序列化（旧实现）
+- after:  __slots__ 结果类 + 驻留的引擎名，serialize 模块直接序列化（新实现）
+- orjson: 安装了 orjson 时，缩进 JSON 输出使用 orjson
+
+用法:
+    PYTHONPATH=src python benchmarks/bench_results.py [--results 100000] [--json]
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from multienginesearch import serialize
+from multienginesearch.engines import SearchResponse, SearchResult
+
+
+class LegacySearchResult:
+    """旧的结果类：每个实例带一个 __dict__，引擎名不驻留"""
+
+    def __init__(self, title, url, description, engine):
+        self.title = title
+        self.url = url
+        self.description = description
+        self.engine = engine
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "url": self.url,
+            "description": self.description,
+            "engine": self.engine,
+        }
+
+
+def build(result_class, count):
+    """构造 count 条结果；引擎名每次新建字符串，模拟从缓存或网络解析得到的数据"""
+    return [
+        result_class(
+            f"Result title number {i}",
+            f"https://example.com/articles/{i}",
+            f"A short description of search result {i} with a few words.",
+            "".join(["duck", "duckgo"]),
+        )
+        for i in range(count)
+    ]
+
+
+def bytes_per_result(result_class, count):
+    """测量每条结果占用的内存（包括标题、URL 等字符串本身）"""
+    gc.collect()
+    tracemalloc.start()
+    results = build(result_class, count)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return size / count
+
+
+def throughput(fn, count, repeat=3):
+    """返回最快一次的每秒结果数"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return count / best
+
+
+def legacy_json(results):
+    data = {"results": [r.to_dict() for r in results], "count": len(results)}
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def legacy_ndjson(results):
+    return "\n".join(json.dumps(r.to_dict(), ensure_ascii=False) for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--results", type=int, default=100000)
+    parser.add_argument("--json", action="store_true", help="输出 JSON 格式结果")
+    args = parser.parse_args()
+    count = args.results
+
+    legacy = build(LegacySearchResult, count)
+    response = SearchResponse(build(SearchResult, count))
+    orjson = serialize.orjson
+
+    results = {
+        "before": {
+            "bytes_per_result": round(bytes_per_result(LegacySearchResult, count), 1),
+            "json_per_sec": round(throughput(lambda: legacy_json(legacy), count)),
+            "ndjson_per_sec": round(throughput(lambda: legacy_ndjson(legacy), count)),
+        }
+    }
+
+    serialize.orjson = None
+    results["after"] = {
+        "bytes_per_result": round(bytes_per_result(SearchResult, count), 1),
+        "json_per_sec": round(
+            throughput(lambda: serialize.response_json_pretty(response), count)
+        ),
+        "ndjson_per_sec": round(
+            throughput(
+                lambda: "\n".join(map(serialize.result_json, response.results)), count
+            )
+        ),
+    }
+    serialize.orjson = orjson
+
+    if orjson is not None:
+        results["orjson"] = {
+            "json_per_sec": round(
+                throughput(lambda: serialize.response_json_pretty(response), count)
+            )
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for label, data in results.items():
+        line = f"{label:>6}:"
+        if "bytes_per_result" in data:
+            line += f" {data['bytes_per_result']:7.1f} 字节/条"
+        line += f"  JSON {data['json_per_sec']:>10,} 条/秒"
+        if "ndjson_per_sec" in data:
+            line += f"  NDJSON {data['ndjson_per_sec']:>10,} 条/秒"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
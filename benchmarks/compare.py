@@ -0,0 +1,83 @@
+"""
+对比两次基准测试的结果
+
+指标名称以 _ms 或 _s 结尾的越小越好，以 qps 或 _per_sec 结尾的越大越好，
+其它指标（如 empty_ratio）只显示变化，不参与判断。
+
+用法:
+    python benchmarks/compare.py base.json head.json [--threshold 10] [--fail]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+LOWER_IS_BETTER = ("_ms", "_s")
+HIGHER_IS_BETTER = ("qps", "_per_sec")
+
+
+def direction(name: str) -> Optional[int]:
+    """返回 -1（越小越好）、1（越大越好）或 None（不判断）"""
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    return None
+
+
+def compare(base: dict, head: dict, threshold: float):
+    """逐项对比两份结果
+
+    Returns:
+        list: (指标名, 旧值, 新值, 变化百分比, 状态) 列表，
+        状态为 "better"、"worse"、"same" 或 ""（不判断的指标）
+    """
+    rows = []
+    base_metrics, head_metrics = base["metrics"], head["metrics"]
+    for name in sorted(set(base_metrics) & set(head_metrics)):
+        old, new = base_metrics[name], head_metrics[name]
+        change = (new - old) / old * 100 if old else 0.0
+        sign = direction(name)
+        if sign is None:
+            status = ""
+        elif abs(change) < threshold:
+            status = "same"
+        else:
+            status = "better" if change * sign > 0 else "worse"
+        rows.append((name, old, new, change, status))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base", help="基准结果 JSON 文件")
+    parser.add_argument("head", help="待对比的结果 JSON 文件")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="视为变化的最小百分比"
+    )
+    parser.add_argument("--fail", action="store_true", help="有指标变差时返回非零状态")
+    args = parser.parse_args(argv)
+
+    base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    head = json.loads(Path(args.head).read_text(encoding="utf-8"))
+    rows = compare(base, head, args.threshold)
+
+    print(
+        f"base: {base['meta'].get('git_commit') or args.base}  "
+        f"head: {head['meta'].get('git_commit') or args.head}"
+    )
+    marks = {"better": "✅", "worse": "❌", "same": "  ", "": "  "}
+    for name, old, new, change, status in rows:
+        print(f"{marks[status]} {name:<40} {old:>12g} → {new:<12g} {change:+7.1f}%")
+
+    worse = [row for row in rows if row[4] == "worse"]
+    if worse:
+        print(f"\n{len(worse)} 项指标变差超过 {args.threshold:g}%")
+    if worse and args.fail:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+离线基准测试使用的本地搜索后端
+
+- /customsearch/v1: 与 Google Custom Search JSON API 响应结构相同的模拟接口
+- /ddg: 供 StubDDGS（行为类似 duckduckgo_search.DDGS 的替身客户端）使用的接口
+
+延迟、抖动和错误率均可配置，随机数使用固定种子，便于在不同提交之间对比。
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+
+class StubConfig:
+    """模拟后端的行为配置"""
+
+    def __init__(
+        self,
+        latency: float = 0.02,
+        jitter: float = 0.005,
+        error_rate: float = 0.0,
+        total_results: int = 100,
+        seed: int = 1234,
+    ):
+        """
+        Args:
+            latency: 每个请求的平均延迟（秒）
+            jitter: 延迟的随机波动范围（秒，均匀分布 ±jitter）
+            error_rate: 返回 503 错误的概率
+            total_results: 每个查询共有多少条结果（Google 分页在此截止）
+            seed: 随机数种子
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.total_results = total_results
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """返回 (本次延迟, 是否出错)"""
+        with self._lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            failed = self._random.random() < self.error_rate
+        return max(0.0, delay), failed
+
+
+def _google_items(query: str, start: int, num: int, total: int):
+    stop = min(start - 1 + num, total)
+    return [
+        {
+            "kind": "customsearch#result",
+            "title": f"{query} - 结果 {i}",
+            "htmlTitle": f"<b>{query}</b> - 结果 {i}",
+            "link": f"https://example.com/{i}?q={query}",
+            "displayLink": "example.com",
+            "snippet": f"关于 {query} 的第 {i} 条模拟搜索结果摘要。",
+            "htmlSnippet": f"关于 <b>{query}</b> 的第 {i} 条模拟搜索结果摘要。",
+            "formattedUrl": f"https://example.com/{i}",
+        }
+        for i in range(start, stop + 1)
+    ]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """模拟搜索后端的请求处理器"""
+
+    protocol_version = "HTTP/1.1"
+    # 响应头和正文一次写出，避免 Nagle 算法与延迟确认叠加出额外的 40ms
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    config: StubConfig = StubConfig()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        delay, failed = self.config.draw()
+        time.sleep(delay)
+
+        if failed:
+            self._send(503, {"error": {"code": 503, "message": "stub failure"}})
+        elif url.path == "/customsearch/v1":
+            self._send(200, self._google(params))
+        elif url.path == "/ddg":
+            query = params.get("q", "")
+            count = min(int(params.get("max", 10)), self.config.total_results)
+            results = [
+                {
+                    "title": f"{query} - 结果 {i}",
+                    "href": f"https://example.org/{i}?q={query}",
+                    "body": f"关于 {query} 的第 {i} 条模拟搜索结果摘要。",
+                }
+                for i in range(1, count + 1)
+            ]
+            self._send(200, results)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _google(self, params):
+        query = params.get("q", "")
+        start = int(params.get("start", 1))
+        num = int(params.get("num", 10))
+        total = self.config.total_results
+        data = {
+            "kind": "customsearch#search",
+            "queries": {
+                "request": [{"searchTerms": query, "startIndex": start, "count": num}]
+            },
+            "searchInformation": {
+                "searchTime": 0.1,
+                "totalResults": str(total),
+            },
+        }
+        items = _google_items(query, start, num, total)
+        if items:
+            data["items"] = items
+        return data
+
+    def _send(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """在后台线程中运行的模拟搜索后端"""
+
+    def __init__(self, config: Optional[StubConfig] = None):
+        handler = type("ConfiguredStubHandler", (StubHandler,), {})
+        handler.config = config or StubConfig()
+        self.config = handler.config
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    @property
+    def google_url(self) -> str:
+        """可设置为 MES_GOOGLE_API_URL 的模拟接口地址"""
+        return f"{self.base_url}/customsearch/v1"
+
+    def __enter__(self) -> "StubServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_stub_ddgs(base_url: str):
+    """构造指向本地服务的 DDGS 替身类，接口与 DDGS.text() 相同"""
+
+    class StubDDGS:
+        def __init__(self):
+            self.session = requests.Session()
+            self.sleep_timestamp = 0.0
+
+        def text(self, keywords, region, safesearch, timelimit, max_results):
+            response = self.session.get(
+                f"{base_url}/ddg", params={"q": keywords, "max": max_results}
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"stub status {response.status_code}")
+            return response.json()
+
+    return StubDDGS
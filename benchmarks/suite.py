@@ -0,0 +1,265 @@
+"""
+离线基准测试套件
+
+在本地启动模拟的 Google Custom Search 接口和 DDGS 替身后端（见 stubs.py），测量：
+
+- GoogleEngine.search / DuckDuckGoEngine.search 在不同 limit 下的延迟和吞吐量
+- format_results 各输出格式的吞吐量
+- mes 命令的冷启动时间
+
+结果写成扁平的 JSON 指标（名称以 _ms/_s 结尾的越小越好，以 qps/_per_sec
+结尾的越大越好），可用 compare.py 在不同提交之间对比。
+
+用法:
+    PYTHONPATH=src python benchmarks/suite.py [--quick] [--output results.json]
+    python benchmarks/compare.py base.json head.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from stubs import StubConfig, StubServer, make_stub_ddgs
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """计算延迟样本（秒）的均值、中位数和 p95，单位毫秒"""
+    ordered = sorted(samples)
+    p95 = ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+    return {
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+    }
+
+
+def bench_search(
+    search: Callable, limits: List[int], iterations: int, threads: int
+) -> Dict[str, float]:
+    """测量搜索的串行延迟和并发吞吐量"""
+    metrics = {}
+    for limit in limits:
+        latencies = []
+        empty = 0
+        for i in range(iterations):
+            started = time.perf_counter()
+            response = search(f"latency {limit} {i}", limit)
+            latencies.append(time.perf_counter() - started)
+            empty += not response.results
+        for name, value in summarize(latencies).items():
+            metrics[f"limit_{limit}.{name}"] = value
+
+        count = iterations * threads
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            responses = list(
+                executor.map(lambda i: search(f"qps {limit} {i}", limit), range(count))
+            )
+        metrics[f"limit_{limit}.qps"] = round(
+            count / (time.perf_counter() - started), 2
+        )
+        empty += sum(not r.results for r in responses)
+        # 出错的搜索返回空结果，记录比例以便确认错误率设置生效
+        metrics[f"limit_{limit}.empty_ratio"] = round(empty / (iterations + count), 4)
+    return metrics
+
+
+def bench_google(server: StubServer, args) -> Dict[str, float]:
+    from multienginesearch.engines import GoogleEngine
+    from multienginesearch.transport import HttpTransport
+
+    os.environ["MES_GOOGLE_API_URL"] = server.google_url
+    transport = HttpTransport(pool_size=32, backoff_base=0.01, backoff_max=0.05)
+    engine = GoogleEngine(transport=transport)
+    # 基准测试的请求不受每日配额限制
+    engine.daily_limit = engine.quota_store.daily_limit = 10**9
+    return bench_search(
+        lambda q, limit: engine.search(q, limit),
+        args.google_limits,
+        args.iterations,
+        args.threads,
+    )
+
+
+def bench_duckduckgo(server: StubServer, args) -> Dict[str, float]:
+    from multienginesearch.clientpool import ClientPool
+    from multienginesearch.engines import DuckDuckGoEngine
+
+    pool = ClientPool(make_stub_ddgs(server.base_url), max_size=args.threads)
+    engine = DuckDuckGoEngine(pool=pool)
+    return bench_search(
+        lambda q, limit: engine.search(q, limit),
+        args.ddg_limits,
+        args.iterations,
+        args.threads,
+    )
+
+
+def bench_format(count: int) -> Dict[str, float]:
+    """测量 format_results 各输出格式每秒处理的结果数"""
+    from multienginesearch.engines import SearchResponse, SearchResult, format_results
+
+    response = SearchResponse(
+        [
+            SearchResult(
+                f"结果标题 {i}",
+                f"https://example.com/{i}",
+                f"第 {i} 条结果的摘要，包含一些中文和 ASCII text。",
+                "google",
+            )
+            for i in range(count)
+        ]
+    )
+    metrics = {}
+    for fmt in ("simple", "json", "ndjson"):
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            format_results(response, fmt)
+            best = min(best, time.perf_counter() - started)
+        metrics[f"{fmt}.results_per_sec"] = round(count / best)
+    return metrics
+
+
+def bench_cold_start(server: StubServer, runs: int) -> Dict[str, float]:
+    """测量 mes 子命令在新进程中的总耗时（中位数）"""
+    env = dict(os.environ, PYTHONPATH=str(SRC), MES_GOOGLE_API_URL=server.google_url)
+    commands = {
+        "version": ["version"],
+        "help": ["--help"],
+        "search_google": ["search", "cold start", "-e", "google", "--no-cache"],
+    }
+    metrics = {}
+    for name, argv in commands.items():
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-m", "multienginesearch.cli", *argv],
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True,
+            )
+            samples.append(time.perf_counter() - started)
+        metrics[f"{name}.median_s"] = round(statistics.median(samples), 4)
+    return metrics
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_suite(args) -> Dict:
+    """运行全部基准测试，返回 {"meta": ..., "metrics": {名称: 数值}}"""
+    config = StubConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    metrics: Dict[str, float] = {}
+
+    with tempfile.TemporaryDirectory() as home, StubServer(config) as server:
+        # 配额文件和缓存写到临时目录，不影响真实的主目录
+        os.environ.update(
+            HOME=home,
+            MES_GOOGLE_API_KEY="bench",
+            MES_GOOGLE_SEARCH_ENGINE_ID="bench",
+        )
+        groups = {
+            "google": lambda: bench_google(server, args),
+            "duckduckgo": lambda: bench_duckduckgo(server, args),
+            "format": lambda: bench_format(args.format_results),
+            "cold_start": lambda: bench_cold_start(server, args.cold_runs),
+        }
+        for group, run in groups.items():
+            # 引擎出错时会打印错误信息，基准测试中不需要
+            with contextlib.redirect_stdout(io.StringIO()):
+                group_metrics = run()
+            for name, value in group_metrics.items():
+                metrics[f"{group}.{name}"] = value
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "latency": args.latency,
+                "jitter": args.jitter,
+                "error_rate": args.error_rate,
+                "iterations": args.iterations,
+                "threads": args.threads,
+            },
+        },
+        "metrics": metrics,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", "-o", help="结果 JSON 文件路径，默认输出到标准输出")
+    parser.add_argument("--quick", action="store_true", help="减少迭代次数，快速运行")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="后端平均延迟（秒）"
+    )
+    parser.add_argument("--jitter", type=float, default=0.005, help="延迟波动（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="后端错误率")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--format-results", type=int, default=20000)
+    parser.add_argument("--cold-runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    args.google_limits = [10, 30, 100]
+    args.ddg_limits = [10, 50]
+    if args.quick:
+        args.iterations = min(args.iterations, 3)
+        args.threads = min(args.threads, 2)
+        args.format_results = min(args.format_results, 1000)
+        args.cold_runs = 1
+        args.google_limits = [10, 30]
+        args.ddg_limits = [10]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_suite(args)
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
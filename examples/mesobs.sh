@@ -75,15 +75,9 @@ if [ -z "$KEYWORD" ]; then
     exit 1
 fi
 
-TIMESTAMP=$(date "+%Y%m%d_%H%M%S")
-FILENAME="search_${TIMESTAMP}_$(echo "$KEYWORD" | tr ' ' '_')_${ENGINE}_${TIME_FILTER}.md"
-
 # 假设的保存路径（从环境变量 MES_SAVE_PATH 读取，若未设置则使用当前目录）
 SAVE_PATH="${MES_SAVE_PATH:-$(pwd)}"
 
-# 创建目录
-mkdir -p "$SAVE_PATH"
-
 # 搜索引擎说明函数
 get_engine_label() {
     case "$1" in
@@ -110,15 +104,7 @@ TIME_LABEL=$(get_time_label "$TIME_FILTER")
 echo "🔍 正在搜索: $KEYWORD"
 echo "🚀 搜索引擎: $ENGINE_LABEL"
 echo "⏰ 时间筛选: $TIME_LABEL"
-echo "📁 保存路径: $SAVE_PATH/$FILENAME"
-
-# 执行搜索并保存
-echo "# 搜索结果: $KEYWORD" > "$SAVE_PATH/$FILENAME"
-echo "" >> "$SAVE_PATH/$FILENAME"
-echo "搜索时间: $(date)" >> "$SAVE_PATH/$FILENAME"
-echo "搜索引擎: $ENGINE_LABEL" >> "$SAVE_PATH/$FILENAME"
-echo "时间筛选: $TIME_LABEL" >> "$SAVE_PATH/$FILENAME"
-echo "" >> "$SAVE_PATH/$FILENAME"
-mes search "$KEYWORD" --engine "$ENGINE" --time "$TIME_FILTER" >> "$SAVE_PATH/$FILENAME"
+echo "📁 保存目录: $SAVE_PATH"
 
-echo "✅ 搜索完成，结果保存到: $SAVE_PATH/$FILENAME"
+# 执行搜索并保存（mes save 生成报告后原子地写入，搜索失败时不会留下不完整的文件）
+mes save "$KEYWORD" --engine "$ENGINE" --time "$TIME_FILTER" --dir "$SAVE_PATH"
@@ -6,20 +6,46 @@ MultiEngineSearch - 多引擎搜索工具
 
 from .engines import (
     SearchResult,
+    SearchError,
     SearchEngine,
     DuckDuckGoEngine,
     SearchEngineFactory,
     format_results,
 )
-from .cli import app, main
 
 __version__ = "0.1.0"
 __all__ = [
     "SearchResult",
+    "SearchError",
     "SearchEngine",
     "DuckDuckGoEngine",
     "SearchEngineFactory",
     "format_results",
+    "CachedSearchEngine",
+    "ResultCache",
+    "MemoizedSearchEngine",
+    "search_page",
     "app",
     "main",
 ]
+
+
+# 按需导入的名称及其所在模块：CLI 依赖 typer，缓存依赖 sqlite3，
+# 作为库使用或运行 mes version 等命令时不必加载它们
+_LAZY_ATTRS = {
+    "CachedSearchEngine": "cache",
+    "ResultCache": "cache",
+    "MemoizedSearchEngine": "memo",
+    "search_page": "paging",
+    "app": "cli",
+    "main": "cli",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is not None:
+        import importlib
+
+        return getattr(importlib.import_module(f".{module}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
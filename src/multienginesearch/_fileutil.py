@@ -0,0 +1,71 @@
+"""
+状态文件的公共读写工具
+
+配额、限速、熔断、延迟统计、已见结果记录和报告等文件都由多个线程或
+多个 mes 进程同时读写：修改前先加锁，写入时以“临时文件 + 重命名”的方式原子替换，
+读取方要么看到旧内容，要么看到完整的新内容。
+"""
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows 等平台没有 fcntl，退化为仅进程内加锁
+    fcntl = None
+
+
+@contextmanager
+def locked(
+    lock_path: Optional[Union[str, Path]],
+    thread_lock: Optional[threading.Lock] = None,
+) -> Iterator[None]:
+    """获取进程内线程锁和跨进程的 fcntl 文件锁
+
+    Args:
+        lock_path: 锁文件路径，为 None 时不加文件锁
+        thread_lock: 进程内的线程锁，fcntl 锁只在进程之间生效
+    """
+    with thread_lock if thread_lock is not None else nullcontext():
+        if lock_path is None or fcntl is None:
+            yield
+            return
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def write_atomic(
+    path: Union[str, Path], data: Union[str, bytes], encoding: str = "utf-8"
+):
+    """先写入同目录下的临时文件再重命名，目标文件要么不变，要么是完整的新内容
+
+    Raises:
+        OSError: 写入失败，临时文件已删除
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent)
+    )
+    try:
+        if isinstance(data, bytes):
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        else:
+            with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+                f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,161 @@
+"""
+asyncio 搜索编排
+
+在单个事件循环上并发执行大量查询：每个在途查询是一个协程而不是一个线程。
+asearch() 原生异步的引擎（如安装了 httpx 时的 Google）不占用线程，
+其它引擎由默认实现退回到线程中执行。
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Sequence
+
+from .batch import (
+    BatchQuery,
+    EngineProvider,
+    batch_error_record,
+    batch_record,
+    resolve_batch_engines,
+)
+from .engines import SearchEngine, SearchResponse, offset_kwargs
+from .metrics import MetricsRegistry
+from .multi import DEFAULT_ENGINE_TIMEOUT, merge_responses
+
+# 异步批量搜索的默认并发数
+DEFAULT_ASYNC_CONCURRENCY = 64
+
+
+async def amulti_search(
+    engines: Sequence[SearchEngine],
+    query: str,
+    limit: int = 10,
+    time_filter: Optional[str] = None,
+    timeout: Optional[float] = DEFAULT_ENGINE_TIMEOUT,
+    weights: Optional[Dict[str, float]] = None,
+    fuse: bool = True,
+    offset: int = 0,
+) -> SearchResponse:
+    """multi_search() 的异步版本：各引擎的 asearch() 作为任务并发执行
+
+    超过 timeout 仍未返回的引擎会被取消并标记为超时。
+
+    Returns:
+        SearchResponse: 合并后的响应，engine_meta 中包含每个引擎的元数据
+    """
+    if not engines:
+        return SearchResponse([])
+
+    started = time.monotonic()
+    responses: Dict[int, SearchResponse] = {}
+    meta: Dict[int, Dict[str, Any]] = {}
+
+    async def run(index: int, engine: SearchEngine):
+        engine_started = time.monotonic()
+        try:
+            response = await engine.asearch(
+                query, limit, time_filter=time_filter, **offset_kwargs(offset)
+            )
+        except Exception as e:
+            meta[index] = {
+                "count": 0,
+                "elapsed": time.monotonic() - engine_started,
+                "error": str(e),
+            }
+            return
+        responses[index] = response
+        meta[index] = {
+            "count": len(response.results),
+            "elapsed": time.monotonic() - engine_started,
+        }
+        if response.error is not None:
+            meta[index]["error"] = response.error.message
+            meta[index]["error_kind"] = response.error.kind
+        if response.rate_limit_info:
+            meta[index]["rate_limit"] = response.rate_limit_info
+
+    tasks = [asyncio.ensure_future(run(i, engine)) for i, engine in enumerate(engines)]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    for i, task in enumerate(tasks):
+        if task in pending:
+            meta[i] = {
+                "count": 0,
+                "elapsed": time.monotonic() - started,
+                "timed_out": True,
+            }
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    return merge_responses(engines, responses, meta, weights, fuse)
+
+
+async def arun_batch(
+    queries: Iterable[BatchQuery],
+    provider: EngineProvider,
+    concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+    weights: Optional[Dict[str, float]] = None,
+    registry: Optional[MetricsRegistry] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """run_batch() 的异步版本，按完成顺序产出结果
+
+    同时在途的查询不超过 concurrency 个。输入在线程中按需读取，
+    等待标准输入时不会阻塞事件循环。weights 为多引擎查询融合排序时的引擎权重；
+    指定 registry 时每个查询的计量数据累计到其中。
+
+    Yields:
+        Dict: 包含 index、query、engine 以及搜索结果或 error 的字典
+    """
+
+    async def execute(batch_query: BatchQuery) -> SearchResponse:
+        engines = resolve_batch_engines(batch_query, provider)
+        if len(engines) == 1:
+            return await engines[0].asearch(
+                batch_query.query,
+                batch_query.limit,
+                time_filter=batch_query.time_filter,
+                **offset_kwargs(batch_query.offset),
+            )
+        return await amulti_search(
+            engines,
+            batch_query.query,
+            batch_query.limit,
+            time_filter=batch_query.time_filter,
+            weights=weights,
+            offset=batch_query.offset,
+        )
+
+    queries = iter(queries)
+    exhausted = False
+    pending: Dict["asyncio.Task[SearchResponse]", BatchQuery] = {}
+    try:
+        while True:
+            while not exhausted and len(pending) < max(1, concurrency):
+                batch_query = await asyncio.to_thread(next, queries, None)
+                if batch_query is None:
+                    exhausted = True
+                elif batch_query.error:
+                    yield batch_error_record(batch_query, batch_query.error)
+                else:
+                    pending[asyncio.ensure_future(execute(batch_query))] = batch_query
+
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                batch_query = pending.pop(task)
+                try:
+                    response = task.result()
+                except Exception as e:
+                    yield batch_error_record(batch_query, e)
+                else:
+                    if registry is not None:
+                        registry.observe(response.stats)
+                    yield {**batch_record(batch_query), **response.to_dict()}
+    finally:
+        # 调用方提前停止迭代时取消仍在进行的查询
+        for task in pending:
+            task.cancel()
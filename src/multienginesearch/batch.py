@@ -0,0 +1,342 @@
+"""
+批量搜索
+
+从文件或标准输入读取多个查询，在同一进程中以有界并发执行，
+并按完成顺序逐条产出结果，避免为每个查询启动一个 mes 进程。
+"""
+
+import json
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from .breaker import CircuitBreakerSearchEngine, default_breaker
+from .cache import CachedSearchEngine, ResultCache
+from .engines import (
+    SearchEngine,
+    SearchEngineFactory,
+    SearchError,
+    SearchResponse,
+    offset_kwargs,
+)
+from .memo import LRUCache, MemoizedSearchEngine, SingleFlight
+from .metrics import MetricsRegistry
+from .multi import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_ENGINE_TIMEOUT,
+    multi_search,
+    parse_engine_names,
+)
+from .ratelimit import RateLimitedSearchEngine, RateLimiter, SharedRateState
+
+# 支持的时间筛选参数
+TIME_FILTERS = ("d", "w", "m", "y")
+
+
+class BatchQuery:
+    """批量搜索中的单个查询"""
+
+    def __init__(
+        self,
+        index: int,
+        query: str,
+        engine: Optional[str] = None,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        error: Optional[str] = None,
+        offset: int = 0,
+    ):
+        self.index = index
+        self.query = query
+        self.engine = engine
+        self.limit = limit
+        self.time_filter = time_filter
+        # 每个引擎跳过排名最前的多少条结果
+        self.offset = offset
+        # 解析失败时的错误信息，该查询不会被执行
+        self.error = error
+
+
+def parse_batch_line(
+    line: str,
+    index: int,
+    engine: Optional[str] = None,
+    limit: int = 10,
+    time_filter: Optional[str] = None,
+) -> Optional[BatchQuery]:
+    """解析一行输入
+
+    支持纯文本查询，或 JSON 对象（可覆盖 engine、limit、time，并可指定 offset）:
+    {"query": "python", "engine": "google", "limit": 5, "time": "w"}
+    空行和以 # 开头的行会被忽略。
+
+    Raises:
+        ValueError: JSON 格式错误或参数无效
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    if not line.startswith("{"):
+        return BatchQuery(index, line, engine, limit, time_filter)
+
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("JSON 行必须包含非空的 query 字段")
+    return batch_query_from_dict(data, index, engine, limit, time_filter)
+
+
+def batch_query_from_dict(
+    data: Dict[str, Any],
+    index: int = 0,
+    engine: Optional[str] = None,
+    limit: int = 10,
+    time_filter: Optional[str] = None,
+) -> BatchQuery:
+    """从 {"query", "engine", "limit", "offset", "time"} 字典构造查询，缺少的字段使用默认值
+
+    Raises:
+        ValueError: 缺少 query 或参数无效
+    """
+    if not str(data.get("query", "")).strip():
+        raise ValueError("必须包含非空的 query 字段")
+
+    try:
+        query_limit = int(data.get("limit", limit))
+    except (TypeError, ValueError):
+        raise ValueError(f"limit 必须是整数: {data.get('limit')}")
+    if not 1 <= query_limit <= 100:
+        raise ValueError(f"limit 必须在 1-100 之间: {query_limit}")
+
+    try:
+        query_offset = int(data.get("offset", 0))
+    except (TypeError, ValueError):
+        raise ValueError(f"offset 必须是整数: {data.get('offset')}")
+    if query_offset < 0:
+        raise ValueError(f"offset 不能为负数: {query_offset}")
+
+    query_time = data.get("time", time_filter)
+    if query_time is not None and query_time not in TIME_FILTERS:
+        raise ValueError(f"无效的时间筛选参数: {query_time}")
+
+    return BatchQuery(
+        index,
+        str(data["query"]).strip(),
+        data.get("engine", engine),
+        query_limit,
+        query_time,
+        offset=query_offset,
+    )
+
+
+def read_batch_queries(
+    lines: Iterable[str],
+    engine: Optional[str] = None,
+    limit: int = 10,
+    time_filter: Optional[str] = None,
+) -> Iterator[BatchQuery]:
+    """逐行读取查询；无法解析的行产出带 error 的 BatchQuery"""
+    index = 0
+    for line in lines:
+        try:
+            batch_query = parse_batch_line(line, index, engine, limit, time_filter)
+        except ValueError as e:
+            batch_query = BatchQuery(index, line.strip(), engine, error=str(e))
+        if batch_query is None:
+            continue
+        yield batch_query
+        index += 1
+
+
+class EngineProvider:
+    """按需创建并复用批量搜索使用的引擎实例
+
+    每个引擎只创建一次，并按以下顺序包装：
+    内存记忆化（合并重复查询） → 磁盘缓存 → 熔断器 → 速率限制 → 引擎本身。
+    命中缓存的查询不会占用速率配额；熔断中的引擎直接返回错误，也不占用速率配额。
+    """
+
+    def __init__(
+        self,
+        cache: Optional[ResultCache] = None,
+        refresh: bool = False,
+        rate_limits: Optional[Dict[str, float]] = None,
+        burst: float = 1.0,
+        shared_rate: Optional[SharedRateState] = None,
+    ):
+        """
+        Args:
+            cache: 磁盘结果缓存，None 表示不使用
+            refresh: 忽略已有缓存，重新搜索并更新缓存
+            rate_limits: 各引擎的速率上限（次/秒），未列出的引擎不限速
+            burst: 限速器的令牌桶容量
+            shared_rate: 跨进程共享的限速器状态，None 表示只在进程内共享
+        """
+        self.cache = cache
+        self.refresh = refresh
+        self.rate_limits = rate_limits or {}
+        self.burst = burst
+        self.shared_rate = shared_rate
+        self._engines: Dict[str, Optional[SearchEngine]] = {}
+        self._lock = threading.Lock()
+        self._memo_cache = LRUCache()
+        self._flight = SingleFlight()
+
+    def get(self, name: str) -> Optional[SearchEngine]:
+        """获取引擎，不支持或创建失败时返回 None"""
+        name = name.lower()
+        with self._lock:
+            if name not in self._engines:
+                self._engines[name] = self._create(name)
+            return self._engines[name]
+
+    def loaded_engines(self) -> List[str]:
+        """已成功创建的引擎名称"""
+        with self._lock:
+            return sorted(n for n, e in self._engines.items() if e is not None)
+
+    def _create(self, name: str) -> Optional[SearchEngine]:
+        engine = SearchEngineFactory.create_engine(name)
+        if engine is None:
+            return None
+        if name in self.rate_limits:
+            limiter = RateLimiter(
+                self.rate_limits[name],
+                burst=self.burst,
+                shared=self.shared_rate,
+                key=name,
+            )
+            engine = RateLimitedSearchEngine(engine, limiter)
+        breaker = default_breaker(name)
+        if breaker is not None:
+            engine = CircuitBreakerSearchEngine(engine, breaker)
+        if self.cache:
+            engine = CachedSearchEngine(engine, self.cache, refresh=self.refresh)
+        return MemoizedSearchEngine(engine, self._memo_cache, self._flight)
+
+
+def resolve_batch_engines(
+    batch_query: BatchQuery, provider: EngineProvider
+) -> List[SearchEngine]:
+    """获取查询使用的全部引擎
+
+    Raises:
+        ValueError: 引擎不支持或无法创建
+    """
+    engines = []
+    for name in parse_engine_names(batch_query.engine):
+        engine = provider.get(name)
+        if engine is None:
+            raise ValueError(f"不支持或无法创建的搜索引擎: {name}")
+        engines.append(engine)
+    return engines
+
+
+def batch_record(batch_query: BatchQuery) -> Dict[str, Any]:
+    """输出记录中标识查询的公共字段"""
+    return {
+        "index": batch_query.index,
+        "query": batch_query.query,
+        "engine": batch_query.engine or "duckduckgo",
+    }
+
+
+def batch_error_record(
+    batch_query: BatchQuery, error: Union[str, BaseException]
+) -> Dict[str, Any]:
+    """出错查询的输出记录，error 字段与搜索响应中的结构化 SearchError 相同
+
+    输入行无法解析（error 为字符串）或引擎不支持、无法创建（ValueError）时
+    错误类型为 request，其它异常按异常类型归类。
+    """
+    record = batch_record(batch_query)
+    if isinstance(error, str):
+        search_error = SearchError(record["engine"], "request", error)
+    else:
+        kind = "request" if isinstance(error, ValueError) else None
+        search_error = SearchError.from_exception(record["engine"], error, kind)
+    return {**record, "error": search_error.to_dict()}
+
+
+def execute_batch_query(
+    batch_query: BatchQuery,
+    provider: EngineProvider,
+    weights: Optional[Dict[str, float]] = None,
+    timeout: Optional[float] = DEFAULT_ENGINE_TIMEOUT,
+) -> SearchResponse:
+    """执行单个查询，多个引擎时并发搜索并融合结果（timeout 为每个引擎的超时）
+
+    Raises:
+        ValueError: 引擎不支持或无法创建
+    """
+    engines = resolve_batch_engines(batch_query, provider)
+    if len(engines) == 1:
+        return engines[0].search(
+            batch_query.query,
+            batch_query.limit,
+            time_filter=batch_query.time_filter,
+            **offset_kwargs(batch_query.offset),
+        )
+    return multi_search(
+        engines,
+        batch_query.query,
+        batch_query.limit,
+        time_filter=batch_query.time_filter,
+        timeout=timeout,
+        weights=weights,
+        offset=batch_query.offset,
+    )
+
+
+def run_batch(
+    queries: Iterable[BatchQuery],
+    provider: EngineProvider,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    weights: Optional[Dict[str, float]] = None,
+    registry: Optional[MetricsRegistry] = None,
+) -> Iterator[Dict[str, Any]]:
+    """以有界并发执行批量查询，按完成顺序产出结果
+
+    输入按需读取，同时在途的查询不超过 concurrency 的两倍，
+    因此可以处理任意长的输入流。weights 为多引擎查询融合排序时的引擎权重；
+    指定 registry 时每个查询的计量数据累计到其中。
+
+    Yields:
+        Dict: 包含 index、query、engine 以及搜索结果或 error 的字典
+    """
+
+    def execute(batch_query: BatchQuery) -> SearchResponse:
+        return execute_batch_query(batch_query, provider, weights)
+
+    window = max(1, concurrency) * 2
+    queries = iter(queries)
+    exhausted = False
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, concurrency), thread_name_prefix="mes-batch"
+    ) as executor:
+        pending = {}
+        while True:
+            while not exhausted and len(pending) < window:
+                batch_query = next(queries, None)
+                if batch_query is None:
+                    exhausted = True
+                elif batch_query.error:
+                    yield batch_error_record(batch_query, batch_query.error)
+                else:
+                    pending[executor.submit(execute, batch_query)] = batch_query
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch_query = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    yield batch_error_record(batch_query, e)
+                else:
+                    if registry is not None:
+                        registry.observe(response.stats)
+                    yield {**batch_record(batch_query), **response.to_dict()}
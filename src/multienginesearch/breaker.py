@@ -0,0 +1,232 @@
+"""
+引擎熔断器
+
+引擎连续失败达到阈值后熔断：冷却期内的搜索不发出网络请求，直接返回
+circuit_open 错误；冷却期结束后放行一次试探请求，成功则恢复，失败则继续熔断。
+
+熔断器状态默认保存在 ~/.mes_breaker.json，多次运行的 mes 共享同一份状态，
+因此批量搜索或连续的命令不会反复请求一个已经不可用的后端。
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from . import metrics
+from .engines import (
+    SearchEngine,
+    SearchError,
+    SearchResponse,
+    SearchResult,
+    offset_kwargs,
+)
+from .ratelimit import SharedRateState
+
+# 连续失败多少次后熔断
+DEFAULT_FAILURE_THRESHOLD = 5
+
+# 熔断后的冷却时间（秒）
+DEFAULT_COOLDOWN = 60.0
+
+# 不计为引擎故障的错误类型：本地配额检查、调用方的请求错误以及熔断本身
+IGNORED_KINDS = frozenset(["quota", "request", "circuit_open"])
+
+
+class CircuitBreaker:
+    """单个引擎的熔断器，线程安全，可通过 SharedRateState 在进程之间共享
+
+    状态为 {"failures": 连续失败次数, "opened_until": 熔断结束的时间戳（0 表示未熔断）}。
+    """
+
+    def __init__(
+        self,
+        threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown: float = DEFAULT_COOLDOWN,
+        shared: Optional[SharedRateState] = None,
+        key: str = "default",
+    ):
+        """
+        Args:
+            threshold: 连续失败多少次后熔断
+            cooldown: 熔断持续的秒数
+            shared: 跨进程共享的状态文件，None 表示只在进程内共享
+            key: 在共享状态文件中的名称（通常为引擎名）
+        """
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.shared = shared
+        self.key = key
+        self._state = self._initial_state()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _initial_state() -> Dict[str, float]:
+        return {"failures": 0, "opened_until": 0.0}
+
+    def _update(self, fn: Callable[[Dict[str, float]], Any]) -> Any:
+        """在锁内修改状态（进程内或共享文件）"""
+        if self.shared is not None:
+            return self.shared.update(self.key, self._initial_state(), fn)
+        with self._lock:
+            return fn(self._state)
+
+    @property
+    def state(self) -> str:
+        """closed（正常）、open（熔断中）或 half_open（冷却结束，等待试探）"""
+
+        def read(state):
+            if not state["opened_until"]:
+                return "closed"
+            return "open" if time.time() < state["opened_until"] else "half_open"
+
+        return self._update(read)
+
+    def check(self) -> float:
+        """搜索前调用：允许时返回 0，熔断中返回距离下次试探的秒数
+
+        冷却结束后只放行一个试探请求，其它请求在试探完成前继续被拒绝。
+        """
+
+        def check(state):
+            if not state["opened_until"]:
+                return 0.0
+            now = time.time()
+            if now < state["opened_until"]:
+                return state["opened_until"] - now
+            # 放行试探请求，并在它完成之前保持熔断
+            state["opened_until"] = now + self.cooldown
+            return 0.0
+
+        return self._update(check)
+
+    def record_success(self):
+        """搜索成功：清零失败次数并恢复"""
+
+        def reset(state):
+            state["failures"] = 0
+            state["opened_until"] = 0.0
+
+        self._update(reset)
+
+    def record_failure(self):
+        """搜索失败：连续失败达到阈值时熔断"""
+
+        def fail(state):
+            state["failures"] += 1
+            if state["failures"] >= self.threshold:
+                state["opened_until"] = time.time() + self.cooldown
+
+        self._update(fail)
+
+
+def default_breaker(name: str) -> Optional[CircuitBreaker]:
+    """按环境变量创建跨进程共享的熔断器
+
+    MES_BREAKER_THRESHOLD 设置连续失败次数（默认 5，0 表示不熔断），
+    MES_BREAKER_COOLDOWN 设置冷却秒数（默认 60），
+    MES_BREAKER_PATH 设置状态文件（默认 ~/.mes_breaker.json）。
+    """
+    threshold = int(os.getenv("MES_BREAKER_THRESHOLD", DEFAULT_FAILURE_THRESHOLD))
+    if threshold <= 0:
+        return None
+    cooldown = float(os.getenv("MES_BREAKER_COOLDOWN", DEFAULT_COOLDOWN))
+    path = os.getenv("MES_BREAKER_PATH") or Path.home() / ".mes_breaker.json"
+    return CircuitBreaker(threshold, cooldown, SharedRateState(Path(path)), key=name)
+
+
+class CircuitBreakerSearchEngine(SearchEngine):
+    """在调用被包装引擎之前先检查熔断器的包装器
+
+    熔断中的搜索直接返回 circuit_open 错误（计入 errors 和 circuit_open 计数），
+    其它搜索根据响应中的错误更新熔断器。
+    """
+
+    def __init__(self, engine: SearchEngine, breaker: CircuitBreaker):
+        self.engine = engine
+        self.breaker = breaker
+
+    @property
+    def name(self) -> str:
+        return self.engine.name
+
+    def cache_params(self) -> Dict[str, Any]:
+        return self.engine.cache_params()
+
+    def resumes_at_offset(self) -> bool:
+        return self.engine.resumes_at_offset()
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        rejected = self._reject()
+        if rejected is not None:
+            return rejected
+        response = self.engine.search(
+            query, limit, time_filter=time_filter, **offset_kwargs(offset)
+        )
+        self._observe(response.error)
+        return response
+
+    async def asearch(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        rejected = self._reject()
+        if rejected is not None:
+            return rejected
+        response = await self.engine.asearch(
+            query, limit, time_filter=time_filter, **offset_kwargs(offset)
+        )
+        self._observe(response.error)
+        return response
+
+    def iter_search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> Iterator[SearchResult]:
+        rejected = self._reject()
+        if rejected is not None:
+            metrics.count("circuit_open")
+            metrics.count("errors")
+            raise rejected.error
+        try:
+            yield from self.engine.iter_search(
+                query, limit, time_filter=time_filter, **offset_kwargs(offset)
+            )
+        except SearchError as e:
+            self._observe(e)
+            raise
+        self._observe(None)
+
+    def _reject(self) -> Optional[SearchResponse]:
+        """熔断中时返回带 circuit_open 错误的空响应"""
+        wait = self.breaker.check()
+        if not wait:
+            return None
+        stats = metrics.SearchStats(self.name)
+        stats.incr("circuit_open")
+        stats.incr("errors")
+        error = SearchError(
+            self.name,
+            "circuit_open",
+            f"连续失败 {self.breaker.threshold} 次，已暂停请求，{wait:.0f} 秒后重试",
+        )
+        return SearchResponse([], stats=stats, error=error)
+
+    def _observe(self, error: Optional[SearchError]):
+        if not isinstance(error, SearchError):
+            self.breaker.record_success()
+        elif error.kind not in IGNORED_KINDS:
+            self.breaker.record_failure()
@@ -0,0 +1,427 @@
+"""
+搜索结果持久化缓存
+
+基于 SQLite 的磁盘缓存，缓存时长随时间筛选参数变化：
+筛选范围越短（如最近一天），结果变化越快，缓存过期越早。
+
+CachedSearchEngine 按排名区间保存结果（ranges 表），与 limit 无关：
+先搜索前 10 条再搜索前 30 条时只请求缺少的第 11-30 条，--offset 翻页同样只请求缺少的部分。
+不能从 offset 处继续搜索的引擎（DuckDuckGo）部分命中时重新取回从第一条开始的整个区间。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import metrics
+from .engines import SearchEngine, SearchResponse, SearchResult, offset_kwargs
+from .serialize import dumps, loads
+
+# 各时间筛选参数对应的缓存有效期（秒），None 表示不限时间范围
+DEFAULT_TTLS: Dict[Optional[str], int] = {
+    "d": 60 * 60,  # 最近一天：1 小时
+    "w": 6 * 60 * 60,  # 最近一周：6 小时
+    "m": 24 * 60 * 60,  # 最近一月：1 天
+    "y": 7 * 24 * 60 * 60,  # 最近一年：7 天
+    None: 7 * 24 * 60 * 60,  # 不限时间：7 天
+}
+
+# 缓存条目上限，超过后按最近访问时间淘汰
+DEFAULT_MAX_ENTRIES = 1000
+
+# 缓存文件的结构版本（PRAGMA user_version）：
+# 1 删除了旧版本按 limit 整体缓存响应的 results 表，结果只按排名区间保存
+SCHEMA_VERSION = 1
+
+
+def default_cache_path() -> Path:
+    """缓存文件路径，可通过环境变量 MES_CACHE_PATH 覆盖"""
+    path = os.getenv("MES_CACHE_PATH")
+    if path:
+        return Path(path).expanduser()
+    return Path.home() / ".mes_cache.sqlite3"
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询字符串：合并空白并转为小写"""
+    return " ".join(query.split()).lower()
+
+
+def _hash_key(parts: List[Any]) -> str:
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """基于 SQLite 的搜索结果缓存，按最近访问时间（LRU）淘汰"""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttls: Optional[Dict[Optional[str], int]] = None,
+    ):
+        self.path = Path(path) if path else default_cache_path()
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+        # 按排名区间保存的结果：start 为区间第一条结果的排名（从 0 开始），
+        # complete 表示引擎在区间之后没有更多结果
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ranges (
+                key TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                engine TEXT NOT NULL,
+                query TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                complete INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (key, start)
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ranges_last_access "
+            "ON ranges (last_access)"
+        )
+        self._conn.commit()
+
+    def _migrate(self):
+        """把旧版本创建的缓存文件升级到 SCHEMA_VERSION"""
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version >= SCHEMA_VERSION:
+            return
+        self._conn.execute("DROP INDEX IF EXISTS idx_results_last_access")
+        self._conn.execute("DROP TABLE IF EXISTS results")
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @staticmethod
+    def make_range_key(
+        engine_name: str,
+        query: str,
+        time_filter: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """构造按排名区间缓存结果的键，与 limit 和 offset 无关"""
+        return _hash_key(
+            ["ranges", engine_name, normalize_query(query), time_filter, params or {}]
+        )
+
+    def ttl_for(self, time_filter: Optional[str]) -> int:
+        """获取时间筛选参数对应的缓存有效期（秒）"""
+        return self.ttls.get(time_filter, self.ttls[None])
+
+    def get_range(
+        self, key: str, offset: int, limit: int
+    ) -> Tuple[List[SearchResult], bool]:
+        """读取从排名 offset 开始的连续缓存结果，最多 limit 条
+
+        Returns:
+            Tuple[List, bool]: (缓存中连续的结果, 引擎在这些结果之后是否已没有更多结果)；
+            结果少于 limit 且不完整时，调用方只需从 offset + len(结果) 开始补齐
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM ranges WHERE key = ? AND expires_at <= ?", (key, now)
+            )
+            rows = self._conn.execute(
+                "SELECT start, payload, complete FROM ranges "
+                "WHERE key = ? ORDER BY start",
+                (key,),
+            ).fetchall()
+
+            position = offset
+            results: List[SearchResult] = []
+            exhausted = False
+            used = []
+            for start, payload, complete in rows:
+                if start > position or len(results) >= limit:
+                    break
+                items = loads(payload)
+                end = start + len(items)
+                if position < end:
+                    taken = items[
+                        position - start : position - start + limit - len(results)
+                    ]
+                    results.extend(SearchResult.from_dict(item) for item in taken)
+                    position += len(taken)
+                    used.append(start)
+                if complete and position >= end:
+                    exhausted = True
+                    used.append(start)
+                    break
+
+            if used:
+                self._conn.executemany(
+                    "UPDATE ranges SET last_access = ? WHERE key = ? AND start = ?",
+                    [(now, key, start) for start in used],
+                )
+            self._conn.commit()
+        return results, exhausted
+
+    def set_range(
+        self,
+        key: str,
+        start: int,
+        results: List[SearchResult],
+        complete: bool,
+        engine_name: str = "",
+        query: str = "",
+        time_filter: Optional[str] = None,
+    ):
+        """写入从排名 start 开始的一段结果"""
+        now = time.time()
+        payload = dumps([result.to_dict() for result in results])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ranges (key, start, engine, query, payload, "
+                "complete, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    start,
+                    engine_name,
+                    normalize_query(query),
+                    payload,
+                    int(complete),
+                    now,
+                    now + self.ttl_for(time_filter),
+                    now,
+                ),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """删除过期条目，并把条目数控制在 max_entries 以内"""
+        self._conn.execute("DELETE FROM ranges WHERE expires_at <= ?", (time.time(),))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM ranges").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM ranges WHERE rowid IN "
+                "(SELECT rowid FROM ranges ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM ranges")
+            self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class CachedSearchEngine(SearchEngine):
+    """为任意搜索引擎加上结果缓存的包装器
+
+    结果按排名区间缓存：请求的区间全部命中时不会调用被包装引擎的 search()，
+    因此也不会消耗 Google API 配额；部分命中时只从第一条缺少的结果开始请求剩余部分。
+    被包装引擎不能从 offset 处继续（resumes_at_offset() 为 False）时，
+    改为请求 [0, offset + limit) 整个区间并整体写回缓存。
+    """
+
+    def __init__(
+        self,
+        engine: SearchEngine,
+        cache: Optional[ResultCache] = None,
+        refresh: bool = False,
+    ):
+        """
+        Args:
+            engine: 被包装的搜索引擎
+            cache: 缓存实例，默认使用 default_cache_path() 下的缓存
+            refresh: 为 True 时忽略已有缓存，强制重新搜索并更新缓存
+        """
+        self.engine = engine
+        self.cache = cache or ResultCache()
+        self.refresh = refresh
+
+    @property
+    def name(self) -> str:
+        return self.engine.name
+
+    def cache_params(self) -> Dict[str, Any]:
+        return self.engine.cache_params()
+
+    def resumes_at_offset(self) -> bool:
+        return self.engine.resumes_at_offset()
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        key = self._key(query, time_filter)
+
+        started = time.perf_counter()
+        cached, exhausted = self._lookup(key, offset, limit)
+        elapsed = time.perf_counter() - started
+        if len(cached) >= limit or exhausted:
+            return self._record(SearchResponse(cached), elapsed, hit=True)
+
+        start, missing, cached = self._plan(offset, limit, cached)
+        response = self.engine.search(
+            query, missing, time_filter=time_filter, **offset_kwargs(start)
+        )
+        started = time.perf_counter()
+        self._store(key, start, missing, response, query, time_filter)
+        elapsed += time.perf_counter() - started
+        response = self._join(cached, response, skip=max(0, offset - start))
+        return self._record(response, elapsed, hit=False)
+
+    async def asearch(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        key = self._key(query, time_filter)
+
+        started = time.perf_counter()
+        cached, exhausted = self._lookup(key, offset, limit)
+        elapsed = time.perf_counter() - started
+        if len(cached) >= limit or exhausted:
+            return self._record(SearchResponse(cached), elapsed, hit=True)
+
+        start, missing, cached = self._plan(offset, limit, cached)
+        response = await self.engine.asearch(
+            query, missing, time_filter=time_filter, **offset_kwargs(start)
+        )
+        started = time.perf_counter()
+        self._store(key, start, missing, response, query, time_filter)
+        elapsed += time.perf_counter() - started
+        response = self._join(cached, response, skip=max(0, offset - start))
+        return self._record(response, elapsed, hit=False)
+
+    def iter_search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> Iterator[SearchResult]:
+        """先产出缓存中的部分，缺少的部分边产出边收集，完整结束后写入缓存"""
+        key = self._key(query, time_filter)
+
+        with metrics.timed("cache"):
+            cached, exhausted = self._lookup(key, offset, limit)
+        if len(cached) >= limit or exhausted:
+            metrics.count("cache_hits")
+            yield from cached
+            return
+
+        metrics.count("cache_misses")
+        start, missing, cached = self._plan(offset, limit, cached)
+        yield from cached
+        skip = max(0, offset - start)
+        results = []
+        for result in self.engine.iter_search(
+            query, missing, time_filter=time_filter, **offset_kwargs(start)
+        ):
+            results.append(result)
+            if len(results) > skip:
+                yield result
+        self._store(key, start, missing, SearchResponse(results), query, time_filter)
+
+    def _record(
+        self, response: SearchResponse, elapsed: float, hit: bool
+    ) -> SearchResponse:
+        """在响应的计量数据中记录缓存耗时和命中情况"""
+        if response.stats is None:
+            response.stats = metrics.SearchStats(self.name)
+        response.stats.add_time("cache", elapsed)
+        response.stats.incr("cache_hits" if hit else "cache_misses")
+        return response
+
+    def _plan(
+        self, offset: int, limit: int, cached: List[SearchResult]
+    ) -> Tuple[int, int, List[SearchResult]]:
+        """计算部分命中时需要请求的区间
+
+        Returns:
+            Tuple[int, int, List]: (请求的起始排名, 请求的条数, 与新结果拼接的缓存结果)
+        """
+        if self.engine.resumes_at_offset():
+            return offset + len(cached), limit - len(cached), cached
+        # 引擎每次都从第一条开始获取，两次搜索的排名不一定一致，
+        # 与之前缓存的前一部分拼接可能出现重复的结果
+        return 0, offset + limit, []
+
+    @staticmethod
+    def _join(
+        cached: List[SearchResult], response: SearchResponse, skip: int = 0
+    ) -> SearchResponse:
+        """把缓存中的前一部分结果和新请求的剩余部分（跳过前 skip 条）拼接为一个响应"""
+        if not cached and not skip:
+            return response
+        return SearchResponse(
+            cached + response.results[skip:],
+            response.rate_limit_info,
+            response.engine_meta,
+            response.stats,
+            response.error,
+        )
+
+    def _key(self, query: str, time_filter: Optional[str]) -> str:
+        return self.cache.make_range_key(
+            self.name, query, time_filter, self.cache_params()
+        )
+
+    def _lookup(
+        self, key: str, offset: int, limit: int
+    ) -> Tuple[List[SearchResult], bool]:
+        if self.refresh:
+            return [], False
+        try:
+            return self.cache.get_range(key, offset, limit)
+        except sqlite3.Error:
+            return [], False
+
+    def _store(
+        self,
+        key: str,
+        start: int,
+        requested: int,
+        response: SearchResponse,
+        query: str,
+        time_filter: Optional[str],
+    ):
+        # 出错或空结果不写入缓存
+        if response.error is not None or not response.results:
+            return
+        # 返回的结果少于请求的条数，说明引擎在这之后没有更多结果
+        complete = len(response.results) < requested
+        try:
+            self.cache.set_range(
+                key,
+                start,
+                response.results,
+                complete,
+                self.name,
+                query,
+                time_filter,
+            )
+        except sqlite3.Error:
+            # 缓存写入失败时不影响搜索结果
+            pass
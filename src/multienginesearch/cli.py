@@ -4,9 +4,31 @@ Multi-Engine Search CLI
 """
 
 import typer
-from typing import Optional
+from time import perf_counter
+from typing import TYPE_CHECKING, List, Optional
 from typing_extensions import Annotated
-from .engines import SearchEngineFactory, format_results
+from .engines import (
+    SearchEngineFactory,
+    SearchError,
+    format_result_ndjson,
+    format_results,
+    offset_kwargs,
+)
+from .merge import parse_engine_weights
+from .metrics import MetricsRegistry, SearchStats, collecting, format_stats
+from .multi import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_ENGINE_TIMEOUT,
+    MAX_THREAD_CONCURRENCY,
+    multi_search,
+    parse_engine_names,
+)
+
+# 批量搜索、缓存、历史、对冲等模块（以及 sqlite3、asyncio）在用到它们的命令中才导入，
+# 使 mes version、mes config 等命令的启动不必加载它们
+if TYPE_CHECKING:
+    from .cache import ResultCache
+    from .history import SearchHistory
 
 app = typer.Typer(
     name="mes",
@@ -21,13 +43,24 @@ def search(
     query: Annotated[str, typer.Argument(help="搜索查询字符串")],
     engine: Annotated[
         Optional[str],
-        typer.Option("--engine", "-e", help="指定搜索引擎 (google, duckduckgo, bing)"),
+        typer.Option(
+            "--engine",
+            "-e",
+            help="指定搜索引擎 (google, duckduckgo)，多个引擎用逗号分隔，all 表示全部",
+        ),
     ] = None,
     limit: Annotated[
         int, typer.Option("--limit", "-l", help="返回结果数量限制", min=1, max=100)
     ] = 10,
+    offset: Annotated[
+        int,
+        typer.Option(
+            "--offset", help="跳过排名最前的多少条结果（多引擎时按引擎计算）", min=0
+        ),
+    ] = 0,
     output: Annotated[
-        Optional[str], typer.Option("--output", "-o", help="输出格式 (json, simple)")
+        Optional[str],
+        typer.Option("--output", "-o", help="输出格式 (json, simple, ndjson)"),
     ] = "simple",
     verbose: Annotated[
         bool, typer.Option("--verbose", "-v", help="显示详细信息")
@@ -40,6 +73,77 @@ def search(
             help="时间筛选范围 (d=最近一天, w=最近一周, m=最近一月, y=最近一年)",
         ),
     ] = None,
+    timeout: Annotated[
+        float,
+        typer.Option("--timeout", help="每个引擎的超时时间（秒）", min=0.1),
+    ] = DEFAULT_ENGINE_TIMEOUT,
+    deadline: Annotated[
+        Optional[str],
+        typer.Option(
+            "--deadline",
+            help="单独设置引擎的截止时间（秒），如 google=5,duckduckgo=3，未设置的引擎使用 --timeout",
+        ),
+    ] = None,
+    hedge: Annotated[
+        bool,
+        typer.Option(
+            "--hedge", help="引擎超过近期 p95 耗时仍未返回时，再发出一次相同的请求"
+        ),
+    ] = False,
+    hedge_to: Annotated[
+        Optional[str],
+        typer.Option("--hedge-to", help="对冲请求改为发给该引擎（隐含 --hedge）"),
+    ] = None,
+    no_cache: Annotated[
+        bool, typer.Option("--no-cache", help="不读取也不写入结果缓存")
+    ] = False,
+    refresh: Annotated[
+        bool, typer.Option("--refresh", help="忽略已有缓存，重新搜索并更新缓存")
+    ] = False,
+    no_history: Annotated[
+        bool, typer.Option("--no-history", help="不把本次搜索记入本地搜索历史")
+    ] = False,
+    weights: Annotated[
+        Optional[str],
+        typer.Option(
+            "--weights", help="多引擎结果融合排序时的引擎权重，如 google=2,duckduckgo=1"
+        ),
+    ] = None,
+    fetch: Annotated[
+        bool,
+        typer.Option(
+            "--fetch", help="并发下载结果页面，提取正文写入每条结果的 content"
+        ),
+    ] = False,
+    fetch_concurrency: Annotated[
+        int,
+        typer.Option("--fetch-concurrency", help="同时抓取的页面数", min=1, max=64),
+    ] = 8,
+    fetch_max_bytes: Annotated[
+        int,
+        typer.Option("--fetch-max-bytes", help="每个页面最多读取的字节数", min=1024),
+    ] = 2
+    * 1024
+    * 1024,
+    stats: Annotated[
+        bool,
+        typer.Option("--stats", help="在标准错误输出各阶段耗时、字节数、重试等统计"),
+    ] = False,
+    stats_file: Annotated[
+        Optional[str],
+        typer.Option(
+            "--stats-file",
+            help="把统计以 Prometheus 文本格式累加到文件中（计数器跨多次运行累计）",
+        ),
+    ] = None,
+    server: Annotated[
+        Optional[str],
+        typer.Option(
+            "--server",
+            envvar="MES_SERVER",
+            help="转发给 mes serve 启动的搜索服务，如 http://127.0.0.1:8765",
+        ),
+    ] = None,
 ):
     """
     执行多引擎搜索
@@ -50,7 +154,18 @@ def search(
     - `mes search "机器学习" --engine google --limit 5`
     - `mes search "AI新闻" --output json --verbose`
     - `mes search "最新技术" --time d --limit 10`
+    - `mes search "开源项目" --engine google,duckduckgo`
+    - `mes search "开源项目" --engine all --weights google=2`
+    - `mes search "python tutorial" --refresh`
+    - `mes search "AI新闻" --limit 50 --output ndjson | jq .url`
+    - `mes search "python tutorial" --limit 10 --offset 10`
+    - `mes search "python" --engine all --stats`
+    - `mes search "python" --engine google --hedge --deadline 5`
+    - `mes search "python asyncio" --fetch --output ndjson`
+    - `mes search "python" --server http://127.0.0.1:8765`
     """
+    from .hedge import parse_engine_deadlines
+
     # 验证时间筛选参数
     if time and time not in ["d", "w", "m", "y"]:
         typer.echo(
@@ -58,10 +173,33 @@ def search(
         )
         raise typer.Exit(1)
 
+    try:
+        engine_weights = parse_engine_weights(weights)
+        deadlines = parse_engine_deadlines(deadline)
+    except ValueError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(1)
+
+    if server:
+        # 这些选项作用于本地的引擎、缓存和对冲请求，服务端不支持
+        local_only = {
+            "--deadline": deadline,
+            "--hedge": hedge,
+            "--hedge-to": hedge_to,
+            "--no-cache": no_cache,
+            "--refresh": refresh,
+        }
+        unsupported = [name for name, value in local_only.items() if value]
+        if unsupported:
+            typer.echo(f"❌ --server 不支持以下选项: {', '.join(unsupported)}")
+            raise typer.Exit(1)
+
     if verbose:
         typer.echo(f"正在搜索: {query}")
         typer.echo(f"搜索引擎: {engine or '默认 (DuckDuckGo)'}")
         typer.echo(f"结果限制: {limit}")
+        if offset:
+            typer.echo(f"跳过结果: {offset}")
         typer.echo(f"输出格式: {output}")
         if time:
             time_labels = {
@@ -72,31 +210,1011 @@ def search(
             }
             typer.echo(f"时间筛选: {time_labels.get(time, time)}")
 
+    fetcher = _page_fetcher(fetch, fetch_concurrency, fetch_max_bytes)
+    history = None if no_history else _open_history()
     # 默认使用 DuckDuckGo
-    engine_name = engine or "duckduckgo"
+    engine_names = parse_engine_names(engine)
 
-    # 创建搜索引擎实例
-    search_engine = SearchEngineFactory.create_engine(engine_name)
+    if server:
+        _search_remote(
+            server,
+            query,
+            engine,
+            limit,
+            offset,
+            time,
+            timeout,
+            output,
+            weights,
+            stats,
+            fetcher,
+            history,
+        )
+        return
 
-    if not search_engine:
-        available_engines = SearchEngineFactory.get_available_engines()
-        typer.echo(f"❌ 不支持的搜索引擎: {engine_name}")
-        typer.echo(f"� 可用的搜索引擎: {', '.join(available_engines)}")
+    cache = None if no_cache else _open_cache()
+    hedging = _Hedging(deadlines, timeout, hedge, hedge_to)
+
+    if len(engine_names) > 1:
+        response = _search_multiple(
+            engine,
+            engine_names,
+            query,
+            limit,
+            offset,
+            time,
+            timeout,
+            verbose,
+            cache,
+            refresh,
+            engine_weights,
+            hedging,
+        )
+    else:
+        engine_name = engine_names[0]
+
+        # 创建搜索引擎实例
+        started = perf_counter()
+        search_engine = SearchEngineFactory.create_engine(engine_name)
+        construct_time = perf_counter() - started
+
+        if not search_engine:
+            available_engines = SearchEngineFactory.get_available_engines()
+            typer.echo(f"❌ 不支持的搜索引擎: {engine_name}")
+            typer.echo(f"� 可用的搜索引擎: {', '.join(available_engines)}")
+            raise typer.Exit(1)
+
+        search_engine = hedging.wrap(
+            search_engine, lambda e: _with_cache(_with_breaker(e), cache, refresh)
+        )
+
+        # 执行搜索
+        if verbose:
+            typer.echo(f"🔍 正在使用 {search_engine.name} 搜索...")
+
+        if output == "ndjson":
+            # 流式输出：每条结果到达后立即写出，下游管道无需等待全部结果
+            search_stats = SearchStats(search_engine.name)
+            search_stats.add_time("construct", construct_time)
+            count = 0
+            error = None
+            seen = []
+            with collecting(search_stats):
+                try:
+                    results = search_engine.iter_search(
+                        query, limit, time_filter=time, **offset_kwargs(offset)
+                    )
+                    if fetcher is not None:
+                        results = fetcher.fetch_results(results)
+                    for result in results:
+                        started = perf_counter()
+                        line = format_result_ndjson(result)
+                        search_stats.add_time("format", perf_counter() - started)
+                        typer.echo(line)
+                        seen.append(result)
+                        count += 1
+                except SearchError as e:
+                    error = e
+            if error is not None:
+                typer.echo(f"❌ {error}", err=True)
+            elif not count:
+                typer.echo("❌ 没有找到搜索结果", err=True)
+            else:
+                _record_history(
+                    history,
+                    query,
+                    _answered_by(seen, search_engine.name),
+                    time,
+                    offset,
+                    seen,
+                )
+            _report_stats(search_stats, stats, stats_file)
+            if error is not None and not count:
+                raise typer.Exit(1)
+            return
+
+        response = search_engine.search(
+            query, limit, time_filter=time, **offset_kwargs(offset)
+        )
+        if response.stats is None:
+            response.stats = SearchStats(search_engine.name)
+        response.stats.add_time("construct", construct_time)
+
+    if fetcher is not None and response.results:
+        with collecting(response.stats):
+            response.results = list(fetcher.fetch_results(response.results))
+
+    if response.error is not None:
+        # 出错与“没有结果”区分开，并以非零状态退出
+        typer.echo(f"❌ {response.error}", err=True)
+    elif not response.results:
+        typer.echo("❌ 没有找到搜索结果", err=output == "ndjson")
+    else:
+        # 格式化并输出结果
+        started = perf_counter()
+        formatted_results = format_results(response, output or "simple")
+        response.stats.add_time("format", perf_counter() - started)
+        typer.echo(formatted_results)
+        label = ",".join(engine_names)
+        if len(engine_names) == 1:
+            label = _answered_by(response.results, label)
+        _record_history(history, query, label, time, offset, response.results)
+
+    _report_stats(response.stats, stats, stats_file)
+    if response.error is not None:
         raise typer.Exit(1)
 
-    # 执行搜索
-    if verbose:
-        typer.echo(f"🔍 正在使用 {search_engine.name} 搜索...")
 
-    response = search_engine.search(query, limit, time_filter=time)
+def _report_stats(search_stats: SearchStats, show: bool, stats_file: Optional[str]):
+    """输出统计，并累加到 Prometheus 文本文件"""
+    if show:
+        typer.echo(format_stats(search_stats), err=True)
+    if stats_file:
+        registry = MetricsRegistry()
+        registry.observe(search_stats)
+        try:
+            registry.write(stats_file, accumulate=True)
+        except OSError as e:
+            typer.echo(f"⚠️ 无法写入统计文件: {e}", err=True)
+
+
+def _search_remote(
+    server,
+    query,
+    engine,
+    limit,
+    offset,
+    time,
+    timeout,
+    output,
+    weights,
+    show_stats,
+    fetcher=None,
+    history=None,
+):
+    """把搜索转发给 mes serve，并按与本地搜索相同的格式输出"""
+    from .engines import SearchResponse
+    from .server import search_via_server
+
+    request = {"query": query, "limit": limit, "timeout": timeout}
+    if engine:
+        request["engine"] = engine
+    if offset:
+        request["offset"] = offset
+    if time:
+        request["time"] = time
+    if weights:
+        request["weights"] = weights
+    if show_stats:
+        request["stats"] = True
+
+    try:
+        # 服务端的多引擎搜索最多等待 timeout 秒，这里多留一些余量
+        data = search_via_server(server, request, timeout=timeout + 5)
+    except ConnectionError as e:
+        typer.echo(f"❌ 无法连接搜索服务 {server}: {e}")
+        raise typer.Exit(1)
+    except ValueError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(1)
+
+    response = SearchResponse.from_dict(data)
+    if fetcher is not None:
+        # 页面在本地抓取，服务端只负责搜索
+        response.results = list(fetcher.fetch_results(response.results))
+    if response.error is not None:
+        typer.echo(f"❌ {response.error}", err=True)
+    elif not response.results:
+        typer.echo("❌ 没有找到搜索结果", err=output == "ndjson")
+    elif output == "ndjson":
+        for result in response.results:
+            typer.echo(format_result_ndjson(result))
+    else:
+        typer.echo(format_results(response, output or "simple"))
+    if response.error is None and response.results:
+        _record_history(
+            history,
+            query,
+            ",".join(parse_engine_names(engine)),
+            time,
+            offset,
+            response.results,
+        )
+
+    if show_stats and data.get("stats"):
+        typer.echo(format_stats(SearchStats.from_dict(data["stats"])), err=True)
+    if response.error is not None:
+        raise typer.Exit(1)
+
+
+class _Hedging:
+    """按命令行参数为引擎加上截止时间和对冲请求"""
+
+    def __init__(self, deadlines, timeout, hedge, hedge_to):
+        self.deadlines = deadlines
+        self.timeout = timeout
+        self.hedge = hedge or bool(hedge_to)
+        self.hedge_to = hedge_to.strip().lower() if hedge_to else None
+        self.tracker = None
+
+    @property
+    def enabled(self) -> bool:
+        """是否指定了 --hedge、--hedge-to 或 --deadline"""
+        return self.hedge or bool(self.deadlines)
+
+    def wrap(self, search_engine, layers):
+        """在缓存和熔断器之外包装引擎
+
+        layers 为引擎加上缓存和熔断器；备用引擎有自己的一套，
+        它返回的结果只按备用引擎缓存，成功也只计入备用引擎的熔断器。
+        没有指定对冲或截止时间参数时只加上 layers，不记录耗时。
+        """
+        name = search_engine.name
+        search_engine = layers(search_engine)
+        if not self.enabled:
+            return search_engine
+
+        from .hedge import HedgedSearchEngine, LatencyTracker
+
+        hedge_engine = None
+        if self.hedge_to and self.hedge_to != name:
+            hedge_engine = SearchEngineFactory.create_engine(self.hedge_to)
+            if hedge_engine is None:
+                typer.echo(f"⚠️ 无法创建对冲引擎 {self.hedge_to}，改为重复请求 {name}")
+            else:
+                hedge_engine = layers(hedge_engine)
+        if self.tracker is None:
+            self.tracker = LatencyTracker.default()
+        return HedgedSearchEngine(
+            search_engine,
+            self.tracker,
+            deadline=self.deadlines.get(name, self.deadlines.get("*", self.timeout)),
+            hedge=self.hedge,
+            hedge_engine=hedge_engine,
+        )
+
+
+def _page_fetcher(fetch, concurrency, max_bytes):
+    """按 --fetch 参数创建页面抓取器，未指定时返回 None"""
+    if not fetch:
+        return None
+    from .fetch import PageFetcher
+
+    return PageFetcher.from_env(concurrency=concurrency, max_bytes=max_bytes)
+
+
+def _with_cache(search_engine, cache, refresh):
+    """加上结果缓存（cache 为 None 时不加）"""
+    if cache is None:
+        return search_engine
+    from .cache import CachedSearchEngine
+
+    return CachedSearchEngine(search_engine, cache, refresh=refresh)
+
+
+def _with_breaker(search_engine):
+    """加上跨进程共享的熔断器（MES_BREAKER_THRESHOLD=0 时不加）"""
+    from .breaker import CircuitBreakerSearchEngine, default_breaker
+
+    breaker = default_breaker(search_engine.name)
+    if breaker is None:
+        return search_engine
+    return CircuitBreakerSearchEngine(search_engine, breaker)
+
+
+def _open_cache() -> Optional["ResultCache"]:
+    """打开结果缓存，失败时（如主目录不可写）不使用缓存"""
+    import sqlite3
+
+    from .cache import ResultCache
+
+    try:
+        return ResultCache()
+    except sqlite3.Error:
+        return None
+
+
+def _open_history() -> Optional["SearchHistory"]:
+    """打开搜索历史，MES_HISTORY=0 或打开失败时不记录"""
+    import sqlite3
 
-    if not response.results:
-        typer.echo("❌ 没有找到搜索结果")
+    from .history import SearchHistory, history_enabled
+
+    if not history_enabled():
+        return None
+    try:
+        return SearchHistory()
+    except sqlite3.Error:
+        return None
+
+
+def _answered_by(results, default):
+    """单引擎搜索实际返回结果的引擎（对冲请求可能由备用引擎回答）"""
+    engines = {result.engine for result in results}
+    return engines.pop() if len(engines) == 1 else default
+
+
+def _record_history(history, query, engine, time, offset, results):
+    """把成功的搜索记入历史；写入失败不影响搜索本身"""
+    if history is None:
         return
+    import sqlite3
+
+    try:
+        history.record(query, engine, results, time_filter=time, offset=offset)
+    except sqlite3.Error:
+        pass
+
+
+def _search_multiple(
+    engine_spec,
+    engine_names,
+    query,
+    limit,
+    offset,
+    time,
+    timeout,
+    verbose,
+    cache,
+    refresh,
+    weights,
+    hedging,
+):
+    """创建多个搜索引擎并并发执行搜索"""
+    # "all" 别名下跳过无法创建的引擎（例如未配置 API 密钥的 Google）
+    skip_unavailable = "all" in [p.strip().lower() for p in engine_spec.split(",")]
+    available_engines = SearchEngineFactory.get_available_engines()
+
+    search_engines = []
+    construct_times = {}
+    for engine_name in engine_names:
+        started = perf_counter()
+        search_engine = SearchEngineFactory.create_engine(engine_name)
+        construct_times[engine_name] = perf_counter() - started
+        if search_engine:
+            search_engine = hedging.wrap(
+                search_engine, lambda e: _with_cache(_with_breaker(e), cache, refresh)
+            )
+            search_engines.append(search_engine)
+        elif skip_unavailable and engine_name in available_engines:
+            if verbose:
+                typer.echo(f"⚠️ 跳过不可用的搜索引擎: {engine_name}")
+        else:
+            typer.echo(f"❌ 不支持的搜索引擎: {engine_name}")
+            typer.echo(f"💡 可用的搜索引擎: {', '.join(available_engines)}")
+            raise typer.Exit(1)
+
+    if not search_engines:
+        typer.echo("❌ 没有可用的搜索引擎")
+        raise typer.Exit(1)
+
+    if verbose:
+        names = ", ".join(e.name for e in search_engines)
+        typer.echo(f"🔍 正在并发使用 {names} 搜索...")
+
+    # 单独设置的截止时间可能比 --timeout 更长
+    timeout = max([timeout, *hedging.deadlines.values()])
+    response = multi_search(
+        search_engines,
+        query,
+        limit,
+        time_filter=time,
+        timeout=timeout,
+        weights=weights,
+        offset=offset,
+    )
+    if response.stats is None:
+        response.stats = SearchStats.combine({})
+    for name, child in response.stats.engines.items():
+        child.add_time("construct", construct_times.get(name, 0.0))
+    return response
+
+
+@app.command()
+def batch(
+    input_file: Annotated[
+        Optional[str],
+        typer.Argument(help="查询文件路径，省略或为 - 时从标准输入读取"),
+    ] = None,
+    engine: Annotated[
+        Optional[str],
+        typer.Option("--engine", "-e", help="默认搜索引擎，多个引擎用逗号分隔"),
+    ] = None,
+    limit: Annotated[
+        int, typer.Option("--limit", "-l", help="默认结果数量限制", min=1, max=100)
+    ] = 10,
+    time: Annotated[
+        Optional[str],
+        typer.Option("--time", "-t", help="默认时间筛选范围 (d, w, m, y)"),
+    ] = None,
+    concurrency: Annotated[
+        Optional[int],
+        typer.Option(
+            "--concurrency",
+            "-c",
+            help="同时执行的查询数（默认 4，--async 时默认 64，最大 1024）",
+            min=1,
+            max=1024,
+        ),
+    ] = None,
+    rate: Annotated[
+        Optional[str],
+        typer.Option(
+            "--rate", help="每个引擎的速率上限（次/秒），如 google=1,duckduckgo=2"
+        ),
+    ] = None,
+    burst: Annotated[
+        float,
+        typer.Option("--burst", help="限速器允许连续发出的请求数（令牌桶容量）", min=1),
+    ] = 1.0,
+    shared_rate: Annotated[
+        bool,
+        typer.Option("--shared-rate", help="与其它 mes 进程共享限速器状态"),
+    ] = False,
+    no_cache: Annotated[
+        bool, typer.Option("--no-cache", help="不读取也不写入结果缓存")
+    ] = False,
+    refresh: Annotated[
+        bool, typer.Option("--refresh", help="忽略已有缓存，重新搜索并更新缓存")
+    ] = False,
+    weights: Annotated[
+        Optional[str],
+        typer.Option("--weights", help="多引擎查询融合排序时的引擎权重"),
+    ] = None,
+    use_async: Annotated[
+        bool,
+        typer.Option("--async", help="在单个事件循环上执行查询，适合数百个并发查询"),
+    ] = False,
+    stats_file: Annotated[
+        Optional[str],
+        typer.Option(
+            "--stats-file",
+            help="结束时把本次的统计以 Prometheus 文本格式累加到文件中（计数器跨多次运行累计）",
+        ),
+    ] = None,
+):
+    """
+    批量搜索：从文件或标准输入读取查询，每完成一个查询输出一行 JSON
+
+    每行一个查询，可以是纯文本，也可以是 JSON 对象以覆盖单个查询的参数:
+    `{"query": "python", "engine": "google", "limit": 5, "time": "w"}`
+
+    **示例用法:**
+
+    - `mes batch queries.txt --concurrency 8`
+    - `cat queries.jsonl | mes batch --engine google --rate google=1`
+    - `mes batch queries.txt --engine google --async --concurrency 200`
+    """
+    if time and time not in ["d", "w", "m", "y"]:
+        typer.echo(
+            "❌ 无效的时间筛选参数。支持的选项: d (一天), w (一周), m (一月), y (一年)"
+        )
+        raise typer.Exit(1)
+
+    import asyncio
+
+    from .aio import DEFAULT_ASYNC_CONCURRENCY
+    from .batch import EngineProvider, read_batch_queries, run_batch
+    from .ratelimit import SharedRateState, parse_rate_limits
+    from .serialize import dumps
+
+    try:
+        rate_limits = parse_rate_limits(rate)
+        engine_weights = parse_engine_weights(weights)
+    except ValueError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(1)
+
+    if concurrency is None:
+        concurrency = DEFAULT_ASYNC_CONCURRENCY if use_async else DEFAULT_CONCURRENCY
+    elif not use_async and concurrency > MAX_THREAD_CONCURRENCY:
+        typer.echo(
+            f"❌ 不使用 --async 时 --concurrency 最大为 {MAX_THREAD_CONCURRENCY}"
+        )
+        raise typer.Exit(1)
+
+    if input_file and input_file != "-":
+        try:
+            stream = open(input_file, "r", encoding="utf-8")
+        except OSError as e:
+            typer.echo(f"❌ 无法读取查询文件: {e}")
+            raise typer.Exit(1)
+    else:
+        stream = typer.get_text_stream("stdin")
+
+    cache = None if no_cache else _open_cache()
+    provider = EngineProvider(
+        cache,
+        refresh=refresh,
+        rate_limits=rate_limits,
+        burst=burst,
+        shared_rate=SharedRateState() if shared_rate else None,
+    )
+
+    # 只累计本次运行的数据，写入时再与文件中已有的数据相加
+    registry = MetricsRegistry() if stats_file else None
+    with stream:
+        queries = read_batch_queries(stream, engine, limit, time)
+        if use_async:
+            asyncio.run(
+                _run_batch_async(
+                    queries, provider, concurrency, engine_weights, registry
+                )
+            )
+        else:
+            for record in run_batch(
+                queries, provider, concurrency, engine_weights, registry
+            ):
+                typer.echo(dumps(record))
+
+    if stats_file:
+        try:
+            registry.write(stats_file, accumulate=True)
+        except OSError as e:
+            typer.echo(f"⚠️ 无法写入统计文件: {e}", err=True)
+
+
+async def _run_batch_async(queries, provider, concurrency, weights, registry=None):
+    """在事件循环上执行批量搜索并逐行输出"""
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .aio import arun_batch
+    from .serialize import dumps
+    from .transport import close_default_async_transport
+
+    # 没有原生异步实现的引擎在线程中执行，线程数与并发数一致
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="mes-batch")
+    )
+    try:
+        async for record in arun_batch(
+            queries, provider, concurrency, weights, registry
+        ):
+            typer.echo(dumps(record))
+    finally:
+        await close_default_async_transport()
+
+
+@app.command()
+def save(
+    queries: Annotated[
+        Optional[List[str]], typer.Argument(help="搜索关键词，可以有多个")
+    ] = None,
+    input_file: Annotated[
+        Optional[str],
+        typer.Option(
+            "--input",
+            "-i",
+            help="从文件读取查询（格式与 mes batch 相同），- 为标准输入",
+        ),
+    ] = None,
+    engine: Annotated[
+        Optional[str],
+        typer.Option("--engine", "-e", help="搜索引擎，多个引擎用逗号分隔"),
+    ] = None,
+    limit: Annotated[
+        int, typer.Option("--limit", "-l", help="每个查询的结果数量", min=1, max=100)
+    ] = 10,
+    time: Annotated[
+        Optional[str],
+        typer.Option("--time", "-t", help="时间筛选范围 (d, w, m, y)"),
+    ] = None,
+    output: Annotated[
+        str, typer.Option("--output", "-o", help="报告格式 (md, jsonl, csv)")
+    ] = "md",
+    directory: Annotated[
+        Optional[str],
+        typer.Option(
+            "--dir",
+            "-d",
+            help="报告保存目录（默认为环境变量 MES_SAVE_PATH 或当前目录）",
+        ),
+    ] = None,
+    combined: Annotated[
+        Optional[str],
+        typer.Option("--file", "-f", help="把全部查询写入这一个文件"),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option(
+            "--concurrency",
+            "-c",
+            help="同时执行的查询数",
+            min=1,
+            max=MAX_THREAD_CONCURRENCY,
+        ),
+    ] = DEFAULT_CONCURRENCY,
+    no_cache: Annotated[
+        bool, typer.Option("--no-cache", help="不读取也不写入结果缓存")
+    ] = False,
+    refresh: Annotated[
+        bool, typer.Option("--refresh", help="忽略已有缓存，重新搜索并更新缓存")
+    ] = False,
+    no_history: Annotated[
+        bool, typer.Option("--no-history", help="不把这些搜索记入本地搜索历史")
+    ] = False,
+    weights: Annotated[
+        Optional[str],
+        typer.Option("--weights", help="多引擎查询融合排序时的引擎权重"),
+    ] = None,
+):
+    """
+    搜索并把结果保存为 Markdown、JSONL 或 CSV 报告
+
+    多个查询在同一进程中并发执行，默认每个查询一份报告，
+    文件名为 search_时间戳_关键词_引擎_时间筛选.md。
+
+    **示例用法:**
+
+    - `mes save "Python教程"`
+    - `mes save "机器学习" "深度学习" --engine google --time m`
+    - `mes save -i keywords.txt -o csv --file report.csv`
+    - `MES_SAVE_PATH=~/notes mes save "AI新闻" --time d`
+    """
+    from pathlib import Path
+
+    from .batch import BatchQuery, EngineProvider, read_batch_queries
+    from .save import REPORT_FORMATS, run_searches, save_reports
+
+    if time and time not in ["d", "w", "m", "y"]:
+        typer.echo(
+            "❌ 无效的时间筛选参数。支持的选项: d (一天), w (一周), m (一月), y (一年)"
+        )
+        raise typer.Exit(1)
+    if output not in REPORT_FORMATS:
+        typer.echo(f"❌ 不支持的报告格式: {output}，可用的格式: md, jsonl, csv")
+        raise typer.Exit(1)
+
+    try:
+        engine_weights = parse_engine_weights(weights)
+    except ValueError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(1)
+
+    # 命令行上的关键词按纯文本处理，文件中的行可以写成 JSON 对象
+    batch_queries = [
+        BatchQuery(index, keyword.strip(), engine, limit, time)
+        for index, keyword in enumerate(queries or [])
+        if keyword.strip()
+    ]
+    if input_file:
+        try:
+            if input_file == "-":
+                lines = list(typer.get_text_stream("stdin"))
+            else:
+                with open(input_file, "r", encoding="utf-8") as f:
+                    lines = list(f)
+        except OSError as e:
+            typer.echo(f"❌ 无法读取查询文件: {e}")
+            raise typer.Exit(1)
+        batch_queries.extend(read_batch_queries(lines, engine, limit, time))
+    if not batch_queries:
+        typer.echo("❌ 请提供搜索关键词")
+        raise typer.Exit(1)
+
+    cache = None if no_cache else _open_cache()
+    provider = EngineProvider(cache, refresh=refresh)
+    searches = run_searches(batch_queries, provider, concurrency, engine_weights)
+
+    try:
+        paths = save_reports(
+            searches,
+            output,
+            directory=Path(directory).expanduser() if directory else None,
+            combined=Path(combined).expanduser() if combined else None,
+        )
+    except OSError as e:
+        typer.echo(f"❌ 无法写入报告: {e}")
+        raise typer.Exit(1)
+
+    history = None if no_history else _open_history()
+    failed = 0
+    for saved in searches:
+        if saved.error is not None:
+            failed += 1
+            typer.echo(f"❌ {saved.query.query}: {saved.error}", err=True)
+        else:
+            _record_history(
+                history,
+                saved.query.query,
+                ",".join(saved.engine_names),
+                saved.query.time_filter,
+                saved.query.offset,
+                saved.response.results,
+            )
+    for path in paths:
+        typer.echo(f"✅ 结果保存到: {path}")
+    if failed:
+        raise typer.Exit(1)
+
+
+@app.command()
+def watch(
+    queries: Annotated[
+        Optional[List[str]], typer.Argument(help="要监测的搜索关键词，可以有多个")
+    ] = None,
+    input_file: Annotated[
+        Optional[str],
+        typer.Option(
+            "--input",
+            "-i",
+            help="从文件读取查询（格式与 mes batch 相同），- 为标准输入",
+        ),
+    ] = None,
+    engine: Annotated[
+        Optional[str],
+        typer.Option("--engine", "-e", help="搜索引擎，多个引擎用逗号分隔"),
+    ] = None,
+    limit: Annotated[
+        int, typer.Option("--limit", "-l", help="每个查询的结果数量", min=1, max=100)
+    ] = 10,
+    time: Annotated[
+        Optional[str],
+        typer.Option("--time", "-t", help="时间筛选范围 (d, w, m, y)"),
+    ] = "d",
+    every: Annotated[
+        str,
+        typer.Option("--every", help="每个查询的执行间隔，如 30m、2h、1d"),
+    ] = "1h",
+    google_reserve: Annotated[
+        int,
+        typer.Option(
+            "--google-reserve", help="每天留给其它搜索的 Google 请求数", min=0
+        ),
+    ] = 0,
+    state: Annotated[
+        Optional[str],
+        typer.Option(
+            "--state",
+            help="已见结果的记录文件（默认为环境变量 MES_WATCH_STATE 或 ~/.mes_watch_seen.bloom）",
+        ),
+    ] = None,
+    prime: Annotated[
+        bool,
+        typer.Option("--prime", help="第一次执行每个查询时只记录结果，不输出"),
+    ] = False,
+    once: Annotated[
+        bool,
+        typer.Option("--once", help="每个查询只执行一次后退出，适合由 cron 调用"),
+    ] = False,
+    timeout: Annotated[
+        float,
+        typer.Option("--timeout", help="每个引擎的超时时间（秒）", min=0.1),
+    ] = DEFAULT_ENGINE_TIMEOUT,
+    weights: Annotated[
+        Optional[str],
+        typer.Option("--weights", help="多引擎查询融合排序时的引擎权重"),
+    ] = None,
+):
+    """
+    定期重新执行查询，只输出以前没有见过的结果（每行一个 JSON）
+
+    见过的结果按规范化后的 URL 记录在大小固定的布隆过滤器中；
+    Google 查询的间隔按剩余配额自动放宽，使请求均匀分布在一天中。
+
+    **示例用法:**
+
+    - `mes watch "AI新闻" "开源大模型" --every 30m`
+    - `mes watch -i topics.txt --engine google --google-reserve 20`
+    - `mes watch "python release" --once --prime`
+    - `mes watch "rust" --every 2h | jq -r .url`
+    """
+    from datetime import datetime
+    from functools import partial
+    from pathlib import Path
+
+    from .batch import BatchQuery, read_batch_queries
+    from .serialize import dumps
+    from .watch import (
+        SeenFilter,
+        WatchScheduler,
+        WatchTask,
+        Watcher,
+        default_seen_path,
+        google_quota,
+        parse_duration,
+    )
+
+    if time and time not in ["d", "w", "m", "y"]:
+        typer.echo(
+            "❌ 无效的时间筛选参数。支持的选项: d (一天), w (一周), m (一月), y (一年)"
+        )
+        raise typer.Exit(1)
+
+    try:
+        interval = parse_duration(every)
+        engine_weights = parse_engine_weights(weights)
+    except ValueError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(1)
+
+    batch_queries = [
+        BatchQuery(index, keyword.strip(), engine, limit, time)
+        for index, keyword in enumerate(queries or [])
+        if keyword.strip()
+    ]
+    if input_file:
+        try:
+            if input_file == "-":
+                lines = list(typer.get_text_stream("stdin"))
+            else:
+                with open(input_file, "r", encoding="utf-8") as f:
+                    lines = list(f)
+        except OSError as e:
+            typer.echo(f"❌ 无法读取查询文件: {e}")
+            raise typer.Exit(1)
+        for batch_query in read_batch_queries(lines, engine, limit, time):
+            if batch_query.error:
+                typer.echo(f"❌ {batch_query.query}: {batch_query.error}")
+                raise typer.Exit(1)
+            batch_queries.append(batch_query)
+    if not batch_queries:
+        typer.echo("❌ 请提供要监测的搜索关键词")
+        raise typer.Exit(1)
+
+    # 每个引擎只创建一次；监测需要最新的结果，因此不经过结果缓存
+    engines = {}
+    for batch_query in batch_queries:
+        for name in parse_engine_names(batch_query.engine):
+            if name not in engines:
+                search_engine = SearchEngineFactory.create_engine(name)
+                if search_engine is None:
+                    available_engines = SearchEngineFactory.get_available_engines()
+                    typer.echo(f"❌ 不支持的搜索引擎: {name}")
+                    typer.echo(f"💡 可用的搜索引擎: {', '.join(available_engines)}")
+                    raise typer.Exit(1)
+                engines[name] = _with_breaker(search_engine)
+
+    def search_query(batch_query):
+        selected = [engines[name] for name in parse_engine_names(batch_query.engine)]
+        if len(selected) == 1:
+            return selected[0].search(
+                batch_query.query,
+                batch_query.limit,
+                time_filter=batch_query.time_filter,
+                **offset_kwargs(batch_query.offset),
+            )
+        return multi_search(
+            selected,
+            batch_query.query,
+            batch_query.limit,
+            time_filter=batch_query.time_filter,
+            timeout=timeout,
+            weights=engine_weights,
+            offset=batch_query.offset,
+        )
+
+    seen_path = Path(state).expanduser() if state else default_seen_path()
+    try:
+        seen = SeenFilter.load(seen_path)
+    except ValueError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(1)
+
+    quota = None
+    if "google" in engines:
+        quota = partial(google_quota, google_reserve)
+    scheduler = WatchScheduler(
+        [WatchTask(batch_query) for batch_query in batch_queries], interval, quota
+    )
+    watcher = Watcher(scheduler, seen, search_query, seen_path, prime=prime)
+
+    try:
+        for task, error, new in watcher.run_once() if once else watcher.run():
+            if error is not None:
+                typer.echo(f"❌ {task.query.query}: {error}", err=True)
+                continue
+            found_at = datetime.now().isoformat(timespec="seconds")
+            for result in new:
+                typer.echo(
+                    dumps(
+                        {
+                            "query": task.query.query,
+                            "found_at": found_at,
+                            **result.to_dict(),
+                        }
+                    )
+                )
+    except KeyboardInterrupt:
+        typer.echo("👋 已停止监测", err=True)
+
+
+@app.command()
+def serve(
+    host: Annotated[
+        Optional[str], typer.Option("--host", help="监听地址（默认 127.0.0.1）")
+    ] = None,
+    port: Annotated[
+        Optional[int],
+        typer.Option("--port", "-p", help="监听端口（默认 8765）", min=0, max=65535),
+    ] = None,
+    preload: Annotated[
+        Optional[str],
+        typer.Option(
+            "--preload", help="启动时预先创建的引擎，多个引擎用逗号分隔，all 表示全部"
+        ),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option(
+            "--concurrency",
+            "-c",
+            help="/batch 请求默认同时执行的查询数",
+            min=1,
+            max=MAX_THREAD_CONCURRENCY,
+        ),
+    ] = DEFAULT_CONCURRENCY,
+    rate: Annotated[
+        Optional[str],
+        typer.Option(
+            "--rate", help="每个引擎的速率上限（次/秒），如 google=1,duckduckgo=2"
+        ),
+    ] = None,
+    burst: Annotated[
+        float,
+        typer.Option("--burst", help="限速器允许连续发出的请求数（令牌桶容量）", min=1),
+    ] = 1.0,
+    shared_rate: Annotated[
+        bool,
+        typer.Option("--shared-rate", help="与其它 mes 进程共享限速器状态"),
+    ] = False,
+    no_cache: Annotated[
+        bool, typer.Option("--no-cache", help="不读取也不写入结果缓存")
+    ] = False,
+    verbose: Annotated[
+        bool, typer.Option("--verbose", "-v", help="输出访问日志")
+    ] = False,
+):
+    """
+    启动本地搜索服务：引擎、连接池、缓存和配额跟踪在请求之间保持复用
+
+    接口: `GET/POST /search`、`POST /batch`（NDJSON）、`GET /metrics`、`GET /health`
+
+    **示例用法:**
+
+    - `mes serve --preload google,duckduckgo`
+    - `curl 'http://127.0.0.1:8765/search?q=python&engine=google'`
+    - `mes search "python" --server http://127.0.0.1:8765`
+    """
+    from .batch import EngineProvider
+    from .ratelimit import SharedRateState, parse_rate_limits
+    from .server import DEFAULT_HOST, DEFAULT_PORT, SearchServer
+
+    try:
+        rate_limits = parse_rate_limits(rate)
+    except ValueError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(1)
+
+    cache = None if no_cache else _open_cache()
+    provider = EngineProvider(
+        cache,
+        rate_limits=rate_limits,
+        burst=burst,
+        shared_rate=SharedRateState() if shared_rate else None,
+    )
+    if preload:
+        for name in parse_engine_names(preload):
+            if provider.get(name) is None:
+                typer.echo(f"⚠️ 无法创建搜索引擎: {name}")
+
+    address = (host or DEFAULT_HOST, DEFAULT_PORT if port is None else port)
+    try:
+        server = SearchServer(address, provider, concurrency, verbose=verbose)
+    except OSError as e:
+        typer.echo(f"❌ 无法监听 {address[0]}:{address[1]}: {e}")
+        raise typer.Exit(1)
 
-    # 格式化并输出结果
-    formatted_results = format_results(response, output or "simple")
-    typer.echo(formatted_results)
+    typer.echo(f"🚀 搜索服务已启动: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        typer.echo("👋 搜索服务已停止")
 
 
 @app.command()
@@ -137,6 +1255,182 @@ def config(
             typer.echo(f"💡 可用的搜索引擎: {', '.join(available_engines)}")
 
 
+history_app = typer.Typer(
+    help="查询本地搜索历史（只读本地数据库，不访问网络）",
+    rich_markup_mode="markdown",
+)
+app.add_typer(history_app, name="history")
+
+_SINCE_HELP = "只包含该时间之后的搜索，如 7d、12h 或 2025-06-01"
+_UNTIL_HELP = "只包含该时间之前的搜索，格式同 --since"
+
+
+def _history_range(since, until):
+    """解析 --since/--until，格式错误时退出"""
+    from .history import parse_time_bound
+
+    try:
+        return (
+            parse_time_bound(since) if since else None,
+            parse_time_bound(until) if until else None,
+        )
+    except ValueError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(1)
+
+
+@history_app.command("search")
+def history_search(
+    keywords: Annotated[
+        Optional[List[str]],
+        typer.Argument(help="关键词，结果的标题、摘要或 URL 需包含全部关键词"),
+    ] = None,
+    since: Annotated[Optional[str], typer.Option("--since", help=_SINCE_HELP)] = None,
+    until: Annotated[Optional[str], typer.Option("--until", help=_UNTIL_HELP)] = None,
+    engine: Annotated[
+        Optional[str], typer.Option("--engine", "-e", help="只查找该引擎返回的结果")
+    ] = None,
+    query: Annotated[
+        Optional[str], typer.Option("--query", "-q", help="只查找该查询的搜索结果")
+    ] = None,
+    limit: Annotated[
+        int, typer.Option("--limit", "-l", help="最多显示的结果数", min=1)
+    ] = 20,
+    show_all: Annotated[
+        bool,
+        typer.Option("--all", help="同一 URL 每次出现都显示（默认只显示最近一次）"),
+    ] = False,
+    output: Annotated[
+        str, typer.Option("--output", "-o", help="输出格式 (json, simple, ndjson)")
+    ] = "simple",
+):
+    """
+    在历史搜索结果中查找关键词，最近的在前
+
+    **示例用法:**
+
+    - `mes history search 机器学习`
+    - `mes history search python asyncio --since 7d`
+    - `mes history search --query "AI新闻" --since 2025-06-01 --until 2025-07-01`
+    - `mes history search rust -e google -o ndjson`
+    """
+    import json
+
+    from .history import SearchHistory, format_hits
+    from .serialize import dumps
+
+    started, ended = _history_range(since, until)
+    history = SearchHistory()
+    try:
+        hits = history.search(
+            " ".join(keywords or []),
+            since=started,
+            until=ended,
+            engine=engine,
+            query=query,
+            limit=limit,
+            unique=not show_all,
+        )
+    finally:
+        history.close()
+
+    if output == "ndjson":
+        for hit in hits:
+            typer.echo(dumps(hit.to_dict()))
+    elif output == "json":
+        typer.echo(
+            json.dumps([hit.to_dict() for hit in hits], ensure_ascii=False, indent=2)
+        )
+    elif hits:
+        typer.echo(format_hits(hits))
+    if not hits:
+        typer.echo("❌ 历史中没有匹配的结果", err=output != "simple")
+
+
+@history_app.command("list")
+def history_list(
+    since: Annotated[Optional[str], typer.Option("--since", help=_SINCE_HELP)] = None,
+    until: Annotated[Optional[str], typer.Option("--until", help=_UNTIL_HELP)] = None,
+    engine: Annotated[
+        Optional[str], typer.Option("--engine", "-e", help="只列出使用该引擎的搜索")
+    ] = None,
+    query: Annotated[
+        Optional[str], typer.Option("--query", "-q", help="只列出该查询的搜索")
+    ] = None,
+    limit: Annotated[
+        int, typer.Option("--limit", "-l", help="最多列出的搜索次数", min=1)
+    ] = 20,
+    output: Annotated[
+        str, typer.Option("--output", "-o", help="输出格式 (json, simple, ndjson)")
+    ] = "simple",
+):
+    """
+    列出最近的搜索记录
+
+    **示例用法:**
+
+    - `mes history list`
+    - `mes history list --since 1d -e google`
+    """
+    import json
+
+    from .history import SearchHistory, format_entries
+    from .serialize import dumps
+
+    started, ended = _history_range(since, until)
+    history = SearchHistory()
+    try:
+        entries = history.searches(
+            since=started, until=ended, engine=engine, query=query, limit=limit
+        )
+    finally:
+        history.close()
+
+    if output == "ndjson":
+        for entry in entries:
+            typer.echo(dumps(entry.to_dict()))
+    elif output == "json":
+        typer.echo(
+            json.dumps(
+                [entry.to_dict() for entry in entries], ensure_ascii=False, indent=2
+            )
+        )
+    elif entries:
+        typer.echo(format_entries(entries))
+    if not entries:
+        typer.echo("❌ 没有搜索记录", err=output != "simple")
+
+
+@history_app.command("clear")
+def history_clear(
+    before: Annotated[
+        Optional[str],
+        typer.Option("--before", help="只删除该时间之前的搜索，如 30d 或 2025-01-01"),
+    ] = None,
+    yes: Annotated[bool, typer.Option("--yes", "-y", help="不再确认")] = False,
+):
+    """
+    删除搜索历史
+
+    **示例用法:**
+
+    - `mes history clear --before 90d`
+    - `mes history clear --yes`
+    """
+    from .history import SearchHistory
+
+    cutoff, _ = _history_range(before, None)
+    if not yes:
+        target = f"{before} 之前的" if before else "全部"
+        typer.confirm(f"确定删除{target}搜索历史吗?", abort=True)
+    history = SearchHistory()
+    try:
+        removed = history.clear(cutoff)
+    finally:
+        history.close()
+    typer.echo(f"🗑️ 已删除 {removed} 次搜索的历史")
+
+
 @app.command()
 def version():
     """
@@ -0,0 +1,117 @@
+"""
+客户端对象池
+
+复用长生命周期的客户端（例如 DDGS），保留其 HTTP 连接、cookies 和令牌状态，
+并在客户端开始出错（如被限流）时将其淘汰、重新创建。
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Type
+
+# 默认池大小
+DEFAULT_POOL_SIZE = 4
+
+# 连续失败多少次后淘汰客户端
+DEFAULT_MAX_FAILURES = 3
+
+
+class ClientPool:
+    """线程安全的客户端池
+
+    每个客户端同一时间只借给一个线程使用。池中客户端数达到上限时，
+    借用者会等待其它线程归还。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_size: int = DEFAULT_POOL_SIZE,
+        max_failures: int = DEFAULT_MAX_FAILURES,
+        recycle_on: Tuple[Type[BaseException], ...] = (),
+    ):
+        """
+        Args:
+            factory: 创建新客户端的函数
+            max_size: 同时存在的客户端数量上限
+            max_failures: 客户端连续失败多少次后被淘汰
+            recycle_on: 遇到这些异常时立即淘汰客户端（例如限流异常）
+        """
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.max_failures = max(1, max_failures)
+        self.recycle_on = recycle_on
+
+        self._idle: List[Any] = []
+        self._failures: Dict[int, int] = {}
+        self._size = 0
+        self._cond = threading.Condition()
+
+        # 统计信息
+        self.created = 0
+        self.recycled = 0
+
+    def acquire(self) -> Any:
+        """借出一个客户端，优先复用最近归还的客户端"""
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._size += 1
+
+        try:
+            client = self.factory()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self.created += 1
+            self._failures[id(client)] = 0
+        return client
+
+    def release(self, client: Any, error: BaseException = None):
+        """归还客户端
+
+        Args:
+            client: 借出的客户端
+            error: 本次使用中发生的异常，None 表示成功
+        """
+        with self._cond:
+            key = id(client)
+            if error is None:
+                self._failures[key] = 0
+                self._idle.append(client)
+            else:
+                self._failures[key] = self._failures.get(key, 0) + 1
+                if (
+                    isinstance(error, self.recycle_on)
+                    or self._failures[key] >= self.max_failures
+                ):
+                    # 淘汰不健康的客户端，下次借用时重新创建
+                    del self._failures[key]
+                    self._size -= 1
+                    self.recycled += 1
+                else:
+                    self._idle.append(client)
+            self._cond.notify()
+
+    @contextmanager
+    def client(self) -> Iterator[Any]:
+        """借用客户端的上下文管理器，根据是否抛出异常更新客户端健康状态"""
+        client = self.acquire()
+        try:
+            yield client
+        except BaseException as e:
+            self.release(client, e)
+            raise
+        else:
+            self.release(client)
+
+    @property
+    def size(self) -> int:
+        """当前存在的客户端数量（包括已借出的）"""
+        return self._size
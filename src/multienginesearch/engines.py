@@ -3,46 +3,259 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Tuple
-from duckduckgo_search import DDGS
-import json
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Dict,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+import asyncio
+import contextvars
+import importlib
 import os
-import requests
-import tempfile
-from datetime import datetime, timedelta
-from pathlib import Path
-import pytz
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from . import metrics
+from .clientpool import ClientPool
+
+# 各引擎的第三方依赖（duckduckgo_search、requests、pytz）在创建引擎时才导入，
+# 使 mes version、mes config 等命令无需加载它们
+if TYPE_CHECKING:
+    from .quota import CredentialPool, GoogleCredential, Reservation
+    from .ratelimit import RateLimiter
+    from .transport import AsyncHttpTransport, HttpTransport
+
+# Google Custom Search API 地址
+GOOGLE_API_URL = "https://www.googleapis.com/customsearch/v1"
+
+# Google Custom Search API 对每个查询最多返回的结果数
+GOOGLE_MAX_RESULTS = 100
+
+# 密钥池中某个密钥返回这些状态码时切换到下一个密钥：
+# 403 表示密钥无效、未启用 API 或配额已用完，429 表示该密钥所属项目被限流
+GOOGLE_FAILOVER_STATUSES = (403, 429)
+
+
+# 错误类型及其显示名称
+ERROR_KINDS = {
+    "network": "网络错误",
+    "timeout": "超时",
+    "throttled": "被限流",
+    "server": "服务端错误",
+    "quota": "配额已用完",
+    "auth": "认证失败",
+    "request": "请求无效",
+    "parse": "响应解析失败",
+    "circuit_open": "熔断中",
+    "unknown": "未知错误",
+}
+
+# 稍后重试可能成功的错误类型
+RETRYABLE_KINDS = frozenset(
+    ["network", "timeout", "throttled", "server", "circuit_open"]
+)
+
+
+def http_error_kind(status: int) -> str:
+    """HTTP 状态码对应的错误类型"""
+    if status == 429:
+        return "throttled"
+    if status in (401, 403):
+        return "auth"
+    if status >= 500:
+        return "server"
+    return "request"
+
+
+def offset_kwargs(offset: int) -> Dict[str, int]:
+    """包装器转发 offset 参数时使用：为 0 时不传，兼容未实现分页的自定义引擎"""
+    return {"offset": offset} if offset else {}
+
+
+class SearchError(Exception):
+    """结构化的搜索错误
+
+    引擎搜索失败时不再打印消息并返回空结果，而是在 SearchResponse.error 中
+    返回该对象，调用方可以区分“出错”和“没有结果”；流式搜索（iter_search）
+    出错时直接抛出。
+    """
+
+    def __init__(
+        self,
+        engine: str,
+        kind: str,
+        message: str,
+        retryable: Optional[bool] = None,
+        status: Optional[int] = None,
+    ):
+        """
+        Args:
+            engine: 出错的引擎名称
+            kind: 错误类型，见 ERROR_KINDS
+            message: 错误消息
+            retryable: 稍后重试是否可能成功，默认按错误类型判断
+            status: HTTP 状态码（如果有）
+        """
+        super().__init__(message)
+        self.engine = engine
+        self.kind = kind
+        self.message = message
+        self.retryable = kind in RETRYABLE_KINDS if retryable is None else retryable
+        self.status = status
+
+    def __str__(self) -> str:
+        return f"{self.engine} 搜索出错（{ERROR_KINDS.get(self.kind, self.kind)}）: {self.message}"
+
+    @classmethod
+    def from_exception(
+        cls, engine: str, error: BaseException, kind: Optional[str] = None
+    ) -> "SearchError":
+        """把引擎内部抛出的异常归类为 SearchError"""
+        if isinstance(error, SearchError):
+            return error
+        if kind is None:
+            kind = _classify_exception(error)
+        return cls(engine, kind, str(error) or type(error).__name__)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式"""
+        data = {
+            "engine": self.engine,
+            "kind": self.kind,
+            "message": self.message,
+            "retryable": self.retryable,
+        }
+        if self.status is not None:
+            data["status"] = self.status
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchError":
+        """从 to_dict() 的输出还原"""
+        return cls(
+            data.get("engine", ""),
+            data.get("kind", "unknown"),
+            data.get("message", ""),
+            data.get("retryable"),
+            data.get("status"),
+        )
+
+
+def _classify_exception(error: BaseException) -> str:
+    """按异常类型判断错误类型
+
+    按类名匹配，不必为了 isinstance 检查导入 requests、httpx、duckduckgo_search 等依赖。
+    """
+    names = [c.__name__ for c in type(error).__mro__]
+    if "QuotaExceededError" in names:
+        return "quota"
+    if "RatelimitException" in names:
+        return "throttled"
+    if any(n.endswith(("Timeout", "TimeoutError", "TimeoutException")) for n in names):
+        return "timeout"
+    if any(n in ("ConnectionError", "TransportError", "NetworkError") for n in names):
+        return "network"
+    if isinstance(error, (ValueError, KeyError, TypeError)):
+        return "parse"
+    return "unknown"
 
 
 class SearchResult:
-    """搜索结果数据类"""
+    """搜索结果数据类
+
+    使用 __slots__ 以减少批量任务中大量结果的内存占用；引擎名称会被驻留（intern），
+    所有结果共享同一个字符串对象。
+    """
 
-    def __init__(self, title: str, url: str, description: str, engine: str):
+    __slots__ = ("title", "url", "description", "engine", "sources", "score", "content")
+
+    def __init__(
+        self,
+        title: str,
+        url: str,
+        description: str,
+        engine: str,
+        sources: Optional[List[Tuple[str, int]]] = None,
+        score: Optional[float] = None,
+        content: Optional[str] = None,
+    ):
         self.title = title
         self.url = url
         self.description = description
-        self.engine = engine
+        self.engine = sys.intern(engine) if type(engine) is str else engine
+        # 多引擎融合后的结果：贡献该结果的 (引擎, 排名) 列表和融合得分
+        self.sources = sources
+        self.score = score
+        # 抓取结果页面后提取的正文（见 fetch.py），未抓取或抓取失败时为 None
+        self.content = content
 
-    def to_dict(self) -> Dict[str, str]:
+    def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
-        return {
+        data = {
             "title": self.title,
             "url": self.url,
             "description": self.description,
             "engine": self.engine,
         }
+        if self.sources is not None:
+            data["sources"] = [
+                {"engine": engine, "rank": rank} for engine, rank in self.sources
+            ]
+            data["score"] = self.score
+        if self.content is not None:
+            data["content"] = self.content
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchResult":
+        """从字典格式还原"""
+        sources = data.get("sources")
+        return cls(
+            title=data.get("title", ""),
+            url=data.get("url", ""),
+            description=data.get("description", ""),
+            engine=data.get("engine", ""),
+            sources=(
+                [(item["engine"], item["rank"]) for item in sources]
+                if sources is not None
+                else None
+            ),
+            score=data.get("score"),
+            content=data.get("content"),
+        )
 
 
 class SearchResponse:
     """搜索响应数据类，包含搜索结果和元数据"""
 
+    __slots__ = ("results", "rate_limit_info", "engine_meta", "stats", "error")
+
     def __init__(
         self,
         results: List[SearchResult],
         rate_limit_info: Optional[Dict[str, Any]] = None,
+        engine_meta: Optional[Dict[str, Dict[str, Any]]] = None,
+        stats: Optional[metrics.SearchStats] = None,
+        error: Optional[SearchError] = None,
     ):
         self.results = results
         self.rate_limit_info = rate_limit_info
+        # 多引擎搜索时每个引擎的元数据（结果数、耗时、错误等）
+        self.engine_meta = engine_meta
+        # 本次搜索的计量数据（耗时、字节数、重试等），不包含在 to_dict() 中
+        self.stats = stats
+        # 搜索失败时的错误，None 表示成功（结果可能为空）
+        self.error = error
 
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
@@ -50,17 +263,42 @@ class SearchResponse:
             "results": [result.to_dict() for result in self.results],
             "count": len(self.results),
         }
+        data.update(self.extra_fields())
+        return data
+
+    def extra_fields(self) -> Dict[str, Any]:
+        """to_dict() 中 results 和 count 之后的可选元数据字段"""
+        data = {}
         if self.rate_limit_info:
             data["rate_limit"] = self.rate_limit_info
+        if self.engine_meta:
+            data["engines"] = self.engine_meta
+        if self.error is not None:
+            data["error"] = self.error.to_dict()
         return data
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchResponse":
+        """从 to_dict() 的输出还原"""
+        error = data.get("error")
+        return cls(
+            [SearchResult.from_dict(item) for item in data.get("results", [])],
+            data.get("rate_limit"),
+            data.get("engines"),
+            error=SearchError.from_dict(error) if isinstance(error, dict) else None,
+        )
+
 
 class SearchEngine(ABC):
     """搜索引擎抽象基类"""
 
     @abstractmethod
     def search(
-        self, query: str, limit: int = 10, time_filter: Optional[str] = None
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
     ) -> SearchResponse:
         """执行搜索并返回结果
 
@@ -68,6 +306,7 @@ class SearchEngine(ABC):
             query: 搜索查询字符串
             limit: 返回结果数量限制
             time_filter: 时间筛选参数 (d=一天, w=一周, m=一月, y=一年)
+            offset: 跳过排名最前的多少条结果，用于分页续取
 
         Returns:
             SearchResponse: 包含搜索结果和元数据的响应对象
@@ -80,20 +319,111 @@ class SearchEngine(ABC):
         """搜索引擎名称"""
         pass
 
+    def iter_search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> Iterator[SearchResult]:
+        """以流的方式逐条产出搜索结果
+
+        默认实现先完成 search() 再逐条产出；支持增量获取的引擎应覆盖此方法，
+        在每一页或每一条结果到达时立即产出。
+
+        Args:
+            query: 搜索查询字符串
+            limit: 返回结果数量限制
+            time_filter: 时间筛选参数 (d=一天, w=一周, m=一月, y=一年)
+            offset: 跳过排名最前的多少条结果
+        """
+        yield from self.search(
+            query, limit, time_filter=time_filter, **offset_kwargs(offset)
+        ).results
+
+    async def asearch(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        """异步执行搜索
+
+        默认实现在线程中运行 search()；支持非阻塞 I/O 的引擎应覆盖此方法，
+        使大量并发查询无需各占用一个线程。
+
+        Args:
+            query: 搜索查询字符串
+            limit: 返回结果数量限制
+            time_filter: 时间筛选参数 (d=一天, w=一周, m=一月, y=一年)
+            offset: 跳过排名最前的多少条结果
+        """
+        return await asyncio.to_thread(
+            self.search, query, limit, time_filter, **offset_kwargs(offset)
+        )
+
+    def cache_params(self) -> Dict[str, Any]:
+        """除查询参数外影响搜索结果的引擎配置，用于构造缓存键"""
+        return {}
+
+    def resumes_at_offset(self) -> bool:
+        """搜索能否从 offset 处继续，而不必重新请求排在前面的结果
+
+        为 False 时每次搜索都从第一条结果开始重新获取，各次的排名不一定一致，
+        缓存不会把之前缓存的前一部分与新取回的后一部分拼接在一起。
+        """
+        return True
+
+    def use_rate_limiter(self, limiter: "RateLimiter") -> bool:
+        """让引擎在每个 HTTP 请求（包括重试）发出之前从限速器取一个令牌
+
+        Returns:
+            bool: 引擎支持逐请求限速时为 True；默认为 False，
+            由 RateLimitedSearchEngine 在每次搜索之前取一个令牌
+        """
+        return False
+
 
 class DuckDuckGoEngine(SearchEngine):
     """DuckDuckGo 搜索引擎实现"""
 
-    def __init__(self, region: str = "wt-wt", safesearch: str = "moderate"):
+    def __init__(
+        self,
+        region: str = "wt-wt",
+        safesearch: str = "moderate",
+        pool: Optional[ClientPool] = None,
+    ):
         self.region = region
         self.safesearch = safesearch
 
+        # 复用 DDGS 客户端，保留其 HTTP 连接和 cookies；被限流的客户端会被淘汰重建
+        if pool is None:
+            from duckduckgo_search import DDGS
+            from duckduckgo_search.exceptions import RatelimitException
+
+            pool = ClientPool(DDGS, recycle_on=(RatelimitException,))
+        self.pool = pool
+        # 视为被限流的异常，计入搜索统计的 throttled
+        self.throttle_errors = pool.recycle_on
+
     @property
     def name(self) -> str:
         return "duckduckgo"
 
+    def cache_params(self) -> Dict[str, Any]:
+        return {"region": self.region, "safesearch": self.safesearch}
+
+    def resumes_at_offset(self) -> bool:
+        # DDGS 不支持从指定位置开始搜索，有 offset 时同样从第一条开始获取
+        return False
+
     def search(
-        self, query: str, limit: int = 10, time_filter: Optional[str] = None
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
     ) -> SearchResponse:
         """使用 DuckDuckGo 执行搜索
 
@@ -101,157 +431,227 @@ class DuckDuckGoEngine(SearchEngine):
             query: 搜索查询字符串
             limit: 返回结果数量限制
             time_filter: 时间筛选参数 (d=一天, w=一周, m=一月, y=一年)
+            offset: 跳过排名最前的多少条结果
+        """
+        stats = metrics.SearchStats(self.name)
+        with metrics.collecting(stats):
+            try:
+                results = list(self._iter_results(query, limit, time_filter, offset))
+                return SearchResponse(results, stats=stats)
+
+            except Exception as e:
+                # 发生错误时返回空结果和结构化的错误，避免程序崩溃
+                return SearchResponse([], stats=stats, error=self._error(e))
+
+    def iter_search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> Iterator[SearchResult]:
+        """以流的方式逐条产出 DuckDuckGo 搜索结果
+
+        Raises:
+            SearchError: 搜索出错
         """
         try:
-            ddgs = DDGS()
+            yield from self._iter_results(query, limit, time_filter, offset)
+        except Exception as e:
+            raise self._error(e) from e
+
+    def _error(self, error: Exception) -> SearchError:
+        """记录错误计数并归类异常"""
+        metrics.count("errors")
+        if isinstance(error, self.throttle_errors):
+            metrics.count("throttled")
+            return SearchError.from_exception(self.name, error, "throttled")
+        return SearchError.from_exception(self.name, error)
+
+    def _iter_results(
+        self, query: str, limit: int, time_filter: Optional[str], offset: int = 0
+    ) -> Iterator[SearchResult]:
+        """执行搜索并逐条产出结果，出错时抛出异常
+
+        DDGS 不支持从指定位置开始搜索，有 offset 时请求 offset + limit 条再丢弃前面的结果。
+        """
+        stats = metrics.current_stats()
+        started = time.perf_counter()
+        with self.pool.client() as ddgs:
             results = ddgs.text(
                 keywords=query,
                 region=self.region,
                 safesearch=self.safesearch,
                 timelimit=time_filter,  # 传递时间筛选参数
-                max_results=limit,
+                max_results=offset + limit,
             )
-
-            search_results = []
-            for result in results:
-                search_result = SearchResult(
+        if stats is not None:
+            # DDGS 内部的请求不可见，整个调用按一页计
+            stats.add_page(time.perf_counter() - started)
+            stats.incr("requests")
+
+        with metrics.timed("parse"):
+            search_results = [
+                SearchResult(
                     title=result.get("title", ""),
                     url=result.get("href", ""),
                     description=result.get("body", ""),
                     engine=self.name,
                 )
-                search_results.append(search_result)
-
-            return SearchResponse(search_results)
-
-        except Exception as e:
-            # 发生错误时返回空列表，避免程序崩溃
-            print(f"DuckDuckGo 搜索出错: {e}")
-            return SearchResponse([])
+                for result in results[offset:]
+            ]
+        yield from search_results
 
 
 class GoogleEngine(SearchEngine):
     """Google Custom Search API 搜索引擎实现"""
 
-    def __init__(self):
-        # 从环境变量获取 API 密钥和搜索引擎 ID
-        self.api_key = os.getenv("MES_GOOGLE_API_KEY")
-        self.search_engine_id = os.getenv("MES_GOOGLE_SEARCH_ENGINE_ID")
+    # 分页请求的默认并发数
+    DEFAULT_PAGE_CONCURRENCY = 5
+
+    # 逐请求限速使用的限速器，见 use_rate_limiter()
+    rate_limiter: Optional["RateLimiter"] = None
 
-        # 初始化限流配置
+    def __init__(
+        self,
+        page_concurrency: Optional[int] = None,
+        transport: Optional["HttpTransport"] = None,
+        async_transport: Optional["AsyncHttpTransport"] = None,
+        credentials: Optional["CredentialPool"] = None,
+    ):
+
+        # 分页请求并发数，可通过参数或环境变量 MES_GOOGLE_PAGE_CONCURRENCY 配置
+        if page_concurrency is None:
+            page_concurrency = int(
+                os.getenv("MES_GOOGLE_PAGE_CONCURRENCY", self.DEFAULT_PAGE_CONCURRENCY)
+            )
+        self.page_concurrency = max(1, page_concurrency)
+
+        # 共享的 HTTP 连接池，带超时和重试
+        if transport is None:
+            from .transport import get_default_transport
+
+            transport = get_default_transport()
+        self.transport = transport
+        # asearch() 使用的异步传输，默认取当前事件循环共享的实例（需要 httpx）
+        self.async_transport = async_transport
+
+        # 初始化限流配置（每个密钥的默认每日限额）
         self.daily_limit = 100
 
-        # 初始化持久化配额跟踪
-        self._init_quota_tracking()
+        # 初始化密钥池和持久化配额跟踪
+        self._init_quota_tracking(credentials)
+
+    def _init_quota_tracking(self, credentials: Optional["CredentialPool"] = None):
+        """初始化密钥池和持久化配额跟踪
 
-        if not self.api_key or not self.search_engine_id:
+        密钥来自环境变量 MES_GOOGLE_API_KEY / MES_GOOGLE_SEARCH_ENGINE_ID、
+        编号的 MES_GOOGLE_API_KEY_<N> 以及 ~/.mes_google_keys.json，
+        每个密钥有各自的配额文件。
+        """
+        from .quota import load_credential_pool
+
+        if credentials is None:
+            credentials = load_credential_pool(self.daily_limit)
+        if credentials is None:
             raise ValueError(
                 "Google Search API 需要设置环境变量: "
                 "MES_GOOGLE_API_KEY 和 MES_GOOGLE_SEARCH_ENGINE_ID"
+                "（或在 ~/.mes_google_keys.json 中配置密钥池）"
             )
+        self.credentials = credentials
 
-    def _init_quota_tracking(self):
-        """初始化持久化配额跟踪"""
-        # 使用用户主目录下的配置文件
-        home_dir = Path.home()
-        self.quota_file = home_dir / ".mes_google_quota.json"
+        # 第一个密钥的配置，与只支持单个密钥时的属性保持一致
+        primary = credentials.primary
+        self.api_key = primary.api_key
+        self.search_engine_id = primary.search_engine_id
+        self.quota_store = primary.store
+        self.quota_file = primary.store.path
 
-        # 如果文件不存在或者是新的一天，初始化配额
+        # 只读取当前配额，不写文件；新的一天在首次请求时才写入
         self._load_or_reset_quota()
 
     def _get_pacific_time(self) -> datetime:
         """获取太平洋时间（Google API 配额重置时区）"""
-        pacific_tz = pytz.timezone("US/Pacific")
-        return datetime.now(pacific_tz)
+        from .quota import pacific_now
+
+        return pacific_now()
 
     def _get_next_reset_time(self) -> datetime:
         """获取下次配额重置时间（太平洋时间的明天午夜）"""
-        pacific_tz = pytz.timezone("US/Pacific")
-        now_pacific = self._get_pacific_time()
-        # 明天午夜（太平洋时间）
-        next_reset = (now_pacific + timedelta(days=1)).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        return next_reset
+        from .quota import next_reset_time
 
-    def _load_or_reset_quota(self):
-        """加载或重置配额信息"""
-        # 使用太平洋时间作为基准
-        pacific_now = self._get_pacific_time()
-        today_pacific = pacific_now.date().isoformat()
-
-        default_quota = {
-            "date": today_pacific,
-            "requests_used": 0,
-            "daily_limit": self.daily_limit,
-            "reset_time": self._get_next_reset_time().isoformat(),
-            "timezone": "US/Pacific",
-        }
+        return next_reset_time()
 
-        try:
-            if self.quota_file.exists():
-                with open(self.quota_file, "r", encoding="utf-8") as f:
-                    quota_data = json.load(f)
-
-                # 检查是否是新的一天（基于太平洋时间）
-                if quota_data.get("date") != today_pacific:
-                    # 新的一天，重置配额
-                    quota_data = default_quota
-                    self._save_quota(quota_data)
-                else:
-                    # 更新重置时间（以防时区变化）
-                    quota_data["reset_time"] = self._get_next_reset_time().isoformat()
-                    quota_data["timezone"] = "US/Pacific"
-                    self._save_quota(quota_data)
-            else:
-                # 文件不存在，创建新文件
-                quota_data = default_quota
-                self._save_quota(quota_data)
+    def _load_or_reset_quota(self):
+        """加载所有密钥的配额信息（文件不存在、损坏或已过期时视为新的一天）"""
+        self.quota_data = self.credentials.snapshot()
 
-            self.quota_data = quota_data
+    def _reserve_quota(
+        self, exclude: Sequence["GoogleCredential"] = ()
+    ) -> Tuple["GoogleCredential", "Reservation"]:
+        """发送请求前选择一个密钥并原子地预占一次配额
 
-        except (json.JSONDecodeError, KeyError, IOError):
-            # 文件损坏或格式错误，重置
-            self.quota_data = default_quota
-            self._save_quota(default_quota)
+        Args:
+            exclude: 本次请求已经失败、不再尝试的密钥
 
-    def _save_quota(self, quota_data):
-        """保存配额信息到文件"""
+        Raises:
+            QuotaExceededError: 所有可用密钥都已达到每日配额限制
+        """
         try:
-            with open(self.quota_file, "w", encoding="utf-8") as f:
-                json.dump(quota_data, f, indent=2, ensure_ascii=False)
-        except IOError:
-            # 如果保存失败，继续使用内存中的数据
-            pass
-
-    def _update_quota_usage(self):
-        """更新配额使用情况"""
-        self.quota_data["requests_used"] += 1
-        self._save_quota(self.quota_data)
+            return self.credentials.reserve(exclude)
+        finally:
+            self._load_or_reset_quota()
+
+    def _update_quota_usage(self, reservation: Optional["Reservation"] = None):
+        """确认一次被计费的请求并刷新配额信息"""
+        if reservation is None:
+            reservation = self.quota_store.reserve()
+        reservation.commit()
+        self._load_or_reset_quota()
 
     def _get_quota_info(self) -> Dict[str, Any]:
-        """获取当前配额信息"""
+        """获取当前配额信息（密钥池有多个密钥时为合计值，并附带每个密钥的用量）"""
+        keys = []
+        for key in self.quota_data["keys"]:
+            remaining = (
+                0 if key["disabled"] else key["daily_limit"] - key["requests_used"]
+            )
+            keys.append({**key, "requests_remaining": max(0, remaining)})
+
         requests_used = self.quota_data["requests_used"]
         daily_limit = self.quota_data["daily_limit"]
-        requests_remaining = max(0, daily_limit - requests_used)
+        requests_remaining = sum(k["requests_remaining"] for k in keys)
 
         # 确保重置时间是最新的
         reset_time = self._get_next_reset_time().isoformat()
 
-        return {
+        info = {
             "daily_limit": daily_limit,
             "requests_used": requests_used,
             "requests_remaining": requests_remaining,
-            "limit_exceeded": requests_used >= daily_limit,
+            "limit_exceeded": requests_remaining == 0,
             "reset_time": reset_time,
             "timezone": "US/Pacific",
             "source": "persistent_tracking",
         }
+        if len(keys) > 1:
+            info["keys"] = keys
+        return info
 
     @property
     def name(self) -> str:
         return "google"
 
+    def cache_params(self) -> Dict[str, Any]:
+        # 不同的可编程搜索引擎（CX）搜索范围不同，结果不能共用缓存
+        return {"cx": self.search_engine_id}
+
+    @property
+    def api_url(self) -> str:
+        """API 地址，可通过环境变量 MES_GOOGLE_API_URL 指向代理或本地模拟服务"""
+        return os.getenv("MES_GOOGLE_API_URL") or GOOGLE_API_URL
+
     def _build_payload(
         self,
         query: str,
@@ -260,10 +660,9 @@ class GoogleEngine(SearchEngine):
         date_restrict: Optional[str] = None,
     ) -> Dict[str, Any]:
         """构建 Google Search API 请求参数"""
+        # key 和 cx 在发送请求时按选中的密钥填入
         payload = {
-            "key": self.api_key,
             "q": query,
-            "cx": self.search_engine_id,
             "start": start,
             "num": num,
         }
@@ -288,33 +687,220 @@ class GoogleEngine(SearchEngine):
         Returns:
             Tuple[Dict, Dict]: (响应数据, 限流信息)
         """
-        # 检查是否已达到配额限制
-        if self.quota_data["requests_used"] >= self.quota_data["daily_limit"]:
-            rate_limit_info = self._get_quota_info()
-            raise Exception(
-                f"Google API 配额已达到每日限制 {self.quota_data['daily_limit']} 次。"
-                f"将在 {rate_limit_info['reset_time']} 重置。"
-            )
-
-        response = requests.get(
-            "https://www.googleapis.com/customsearch/v1", params=payload
-        )
-
-        if response.status_code != 200:
-            raise Exception(
-                f"Google Search API 请求失败，状态码: {response.status_code}"
-            )
+        failed: List["GoogleCredential"] = []
+        while True:
+            # 发送前先预占配额，并发的分页请求和其它 mes 进程不会超出每日限额
+            credential, reservation = self._reserve_quota(failed)
+
+            # 429/5xx 由传输层退避重试；Google 只对成功的请求计费，
+            # 因此无论重试多少次，只在最终返回 200 时计入一次配额，否则退还预占
+            started = time.perf_counter()
+            try:
+                response = self.transport.get(
+                    self.api_url,
+                    params=self._with_credential(payload, credential),
+                    **self._pacing(self._pace),
+                )
+            except Exception:
+                reservation.cancel()
+                raise
+            self._record_page(started, response)
 
-        # 更新配额使用情况
-        self._update_quota_usage()
+            if self._settle(response, credential, reservation, failed):
+                break
 
         # 获取当前配额信息
         rate_limit_info = self._get_quota_info()
 
-        return response.json(), rate_limit_info
+        with metrics.timed("parse"):
+            data = response.json()
+        return data, rate_limit_info
+
+    def _pacing(self, pace: Callable[[], Any]) -> Dict[str, Any]:
+        """配置了限速器时传给传输层的 before_request 参数"""
+        if self.rate_limiter is None:
+            return {}
+        return {"before_request": pace}
+
+    @staticmethod
+    def _with_credential(
+        payload: Dict[str, Any], credential: "GoogleCredential"
+    ) -> Dict[str, Any]:
+        """在请求参数中填入选中密钥的 key 和 cx"""
+        return {
+            "key": credential.api_key,
+            "cx": credential.search_engine_id,
+            **payload,
+        }
+
+    def _settle(
+        self,
+        response: Any,
+        credential: "GoogleCredential",
+        reservation: "Reservation",
+        failed: List["GoogleCredential"],
+    ) -> bool:
+        """根据响应确认或退还配额
+
+        Returns:
+            bool: 请求成功时为 True；密钥被拒绝或限流且密钥池中还有其它密钥时
+            为 False，调用方换一个密钥重试
+
+        Raises:
+            SearchError: 请求失败且无法切换密钥
+        """
+        if response.status_code == 200:
+            # 更新配额使用情况
+            self._update_quota_usage(reservation)
+            return True
+
+        reservation.cancel()
+        # 只有一个密钥时无处切换，保持直接报错
+        if len(self.credentials) > 1 and response.status_code in (
+            GOOGLE_FAILOVER_STATUSES
+        ):
+            if response.status_code == 403:
+                # 密钥无效或配额已用完，当天不再使用
+                self.credentials.disable(credential)
+                self._load_or_reset_quota()
+            failed.append(credential)
+            if self.credentials.has_available(failed):
+                metrics.count("key_failovers")
+                return False
+        raise SearchError(
+            self.name,
+            http_error_kind(response.status_code),
+            f"Google Search API 请求失败，状态码: {response.status_code}",
+            status=response.status_code,
+        )
+
+    def _record_page(self, started: float, response: Any):
+        """记录一页请求的网络耗时和接收字节数"""
+        stats = metrics.current_stats()
+        if stats is not None:
+            stats.add_page(time.perf_counter() - started)
+            stats.incr("requests")
+            stats.incr("bytes_received", len(response.content))
+
+    async def _amake_request(
+        self, payload: Dict[str, Any], transport: "AsyncHttpTransport"
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """_make_request() 的异步版本"""
+        failed: List["GoogleCredential"] = []
+        while True:
+            credential, reservation = self._reserve_quota(failed)
+            started = time.perf_counter()
+            try:
+                response = await transport.get(
+                    self.api_url,
+                    params=self._with_credential(payload, credential),
+                    **self._pacing(self._apace),
+                )
+            except asyncio.CancelledError:
+                # 请求可能已经到达 Google 并被计费，保留预占的配额
+                reservation.commit()
+                raise
+            except Exception:
+                reservation.cancel()
+                raise
+            self._record_page(started, response)
+
+            if self._settle(response, credential, reservation, failed):
+                break
+
+        with metrics.timed("parse"):
+            data = response.json()
+        return data, self._get_quota_info()
+
+    def use_rate_limiter(self, limiter: "RateLimiter") -> bool:
+        # 分页请求并发发出，每页和每次重试各取一个令牌
+        self.rate_limiter = limiter
+        return True
+
+    def _pace(self):
+        """从限速器取一个令牌，等待时间记为 ratelimit 阶段"""
+        with metrics.timed("ratelimit"):
+            self.rate_limiter.acquire()
+
+    async def _apace(self):
+        """_pace() 的异步版本"""
+        with metrics.timed("ratelimit"):
+            await self.rate_limiter.aacquire()
+
+    def _plan_pages(self, limit: int, offset: int = 0) -> List[Tuple[int, int]]:
+        """计算分页请求计划
+
+        Google API 每次最多返回 10 条结果，需要分页请求；有 offset 时
+        直接从第 offset + 1 条开始请求，不重复请求前面的结果。
+
+        Returns:
+            List[Tuple[int, int]]: 每页的 (start 索引, 请求条数)
+        """
+        pages = []
+        start = offset + 1
+        # Google API 对每个查询最多返回前 100 条结果
+        remaining = min(limit, GOOGLE_MAX_RESULTS - offset)
+        while remaining > 0:
+            # 最后一页可能不需要完整的 10 条结果
+            num = min(10, remaining)
+            pages.append((start, num))
+            start += num
+            remaining -= num
+        return pages
+
+    def _iter_pages(
+        self,
+        query: str,
+        limit: int,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> Iterator[Tuple[int, List[Dict[str, Any]], Dict[str, Any]]]:
+        """按排名顺序逐页产出搜索结果
+
+        所有分页的 start 索引事先已知，因此在并发数允许的范围内同时发出请求，
+        再按页码顺序产出。调用方提前停止迭代（遇到不满的一页）时，
+        尚未发出的请求会被取消，已发出的请求结果被丢弃。
+
+        Yields:
+            Tuple[int, List, Dict]: (请求条数, 结果条目, 限流信息)
+        """
+        payloads = [
+            self._build_payload(
+                query=query, start=start, num=num, date_restrict=time_filter
+            )
+            for start, num in self._plan_pages(limit, offset)
+        ]
+
+        if len(payloads) == 1 or self.page_concurrency == 1:
+            for payload in payloads:
+                response_data, rate_limit_info = self._make_request(payload)
+                yield payload["num"], response_data.get("items", []), rate_limit_info
+            return
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.page_concurrency, len(payloads)),
+            thread_name_prefix="mes-google-page",
+        )
+        # 在当前上下文的副本中请求，工作线程记录的计量数据归入本次搜索
+        futures = [
+            executor.submit(contextvars.copy_context().run, self._make_request, p)
+            for p in payloads
+        ]
+        try:
+            for payload, future in zip(payloads, futures):
+                response_data, rate_limit_info = future.result()
+                yield payload["num"], response_data.get("items", []), rate_limit_info
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
 
     def search(
-        self, query: str, limit: int = 10, time_filter: Optional[str] = None
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
     ) -> SearchResponse:
         """使用 Google Custom Search API 执行搜索
 
@@ -322,80 +908,237 @@ class GoogleEngine(SearchEngine):
             query: 搜索查询字符串
             limit: 返回结果数量限制 (1-100)
             time_filter: 时间筛选参数 (d=一天, w=一周, m=一月, y=一年)
+            offset: 跳过排名最前的多少条结果（offset + limit 不超过 100）
         """
-        try:
-            search_results = []
-            rate_limit_info = None
+        stats = metrics.SearchStats(self.name)
+        with metrics.collecting(stats):
+            try:
+                search_results = list(
+                    self._iter_results(query, limit, time_filter, offset)
+                )
 
-            # Google API 每次最多返回 10 条结果，需要分页请求
-            pages_needed = (limit - 1) // 10 + 1
+                # 分页并发完成，限流信息以最终的计数为准
+                rate_limit_info = self._get_quota_info()
+
+                return SearchResponse(search_results, rate_limit_info, stats=stats)
+
+            except Exception as e:
+                # 发生错误时返回空结果和结构化的错误，避免程序崩溃
+                stats.incr("errors")
+                error = SearchError.from_exception(self.name, e)
+                return SearchResponse([], stats=stats, error=error)
 
-            for page in range(pages_needed):
-                start_index = page * 10 + 1
+    def iter_search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> Iterator[SearchResult]:
+        """以流的方式产出 Google 搜索结果，每一页到达后立即产出该页的结果
+
+        Raises:
+            SearchError: 搜索出错
+        """
+        try:
+            yield from self._iter_results(query, limit, time_filter, offset)
+        except Exception as e:
+            metrics.count("errors")
+            raise SearchError.from_exception(self.name, e) from e
+
+    def _iter_results(
+        self, query: str, limit: int, time_filter: Optional[str], offset: int = 0
+    ) -> Iterator[SearchResult]:
+        """按排名顺序逐条产出结果，出错时抛出异常"""
+        count = 0
+        pages = self._iter_pages(query, limit, time_filter, offset)
+        try:
+            for num_results, items, _ in pages:
+                if not items:
+                    break
 
-                # 最后一页可能不需要完整的 10 条结果
-                if page == pages_needed - 1:
-                    remaining = limit - len(search_results)
-                    num_results = min(10, remaining)
-                else:
-                    num_results = 10
+                for item in items:
+                    if count >= limit:
+                        break
+                    count += 1
+                    yield SearchResult(
+                        title=item.get("title", ""),
+                        url=item.get("link", ""),
+                        description=item.get("snippet", ""),
+                        engine=self.name,
+                    )
 
-                if num_results <= 0:
+                # 如果这次请求返回的结果少于预期，说明没有更多结果了
+                if len(items) < num_results:
                     break
+        finally:
+            # 提前结束时取消尚未发出的分页请求
+            pages.close()
 
-                payload = self._build_payload(
-                    query=query,
-                    start=start_index,
-                    num=num_results,
-                    date_restrict=time_filter,
+    async def asearch(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        """异步执行 Google 搜索
+
+        安装了 httpx 时，所有分页作为同一事件循环上的任务并发请求（受
+        page_concurrency 限制），不占用线程；否则退回到在线程中运行 search()。
+        """
+        transport = self.async_transport
+        if transport is None:
+            from .transport import get_default_async_transport
+
+            transport = get_default_async_transport()
+            if transport is None:
+                return await super().asearch(query, limit, time_filter, offset)
+
+        stats = metrics.SearchStats(self.name)
+        with metrics.collecting(stats):
+            try:
+                search_results = [
+                    result
+                    async for result in self._aiter_results(
+                        query, limit, time_filter, transport, offset
+                    )
+                ]
+                return SearchResponse(
+                    search_results, self._get_quota_info(), stats=stats
+                )
+            except Exception as e:
+                stats.incr("errors")
+                error = SearchError.from_exception(self.name, e)
+                return SearchResponse([], stats=stats, error=error)
+
+    async def _aiter_pages(
+        self,
+        query: str,
+        limit: int,
+        time_filter: Optional[str],
+        transport: "AsyncHttpTransport",
+        offset: int = 0,
+    ) -> AsyncIterator[Tuple[int, List[Dict[str, Any]], Dict[str, Any]]]:
+        """_iter_pages() 的异步版本，提前结束时取消未完成的分页任务"""
+        payloads = [
+            self._build_payload(
+                query=query, start=start, num=num, date_restrict=time_filter
+            )
+            for start, num in self._plan_pages(limit, offset)
+        ]
+
+        if len(payloads) == 1 or self.page_concurrency == 1:
+            for payload in payloads:
+                response_data, rate_limit_info = await self._amake_request(
+                    payload, transport
                 )
+                yield payload["num"], response_data.get("items", []), rate_limit_info
+            return
 
-                response_data, current_rate_limit = self._make_request(payload)
-                rate_limit_info = current_rate_limit  # 保存最新的限流信息
+        semaphore = asyncio.Semaphore(self.page_concurrency)
 
-                # 处理搜索结果
-                items = response_data.get("items", [])
+        async def fetch(payload):
+            async with semaphore:
+                return await self._amake_request(payload, transport)
+
+        tasks = [asyncio.ensure_future(fetch(payload)) for payload in payloads]
+        try:
+            for payload, task in zip(payloads, tasks):
+                response_data, rate_limit_info = await task
+                yield payload["num"], response_data.get("items", []), rate_limit_info
+        finally:
+            for task in tasks:
+                task.cancel()
+            # 等待被取消的任务结束，避免遗留未读取的异常
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _aiter_results(
+        self,
+        query: str,
+        limit: int,
+        time_filter: Optional[str],
+        transport: "AsyncHttpTransport",
+        offset: int = 0,
+    ) -> AsyncIterator[SearchResult]:
+        """_iter_results() 的异步版本"""
+        count = 0
+        pages = self._aiter_pages(query, limit, time_filter, transport, offset)
+        try:
+            async for num_results, items, _ in pages:
                 if not items:
                     break
 
                 for item in items:
-                    if len(search_results) >= limit:
+                    if count >= limit:
                         break
-
-                    search_result = SearchResult(
+                    count += 1
+                    yield SearchResult(
                         title=item.get("title", ""),
                         url=item.get("link", ""),
                         description=item.get("snippet", ""),
                         engine=self.name,
                     )
-                    search_results.append(search_result)
 
-                # 如果这次请求返回的结果少于预期，说明没有更多结果了
                 if len(items) < num_results:
                     break
+        finally:
+            await pages.aclose()
 
-            return SearchResponse(search_results, rate_limit_info)
 
-        except Exception as e:
-            # 发生错误时返回空列表，避免程序崩溃
-            print(f"Google 搜索出错: {e}")
-            return SearchResponse([])
+class SearchEngineFactory:
+    """搜索引擎工厂类
 
+    引擎以 "模块:类名" 字符串登记，只在创建时才导入对应模块及其依赖。
+    第三方包可以通过入口点组 multienginesearch.engines 注册新的搜索引擎，例如在
+    pyproject.toml 中声明:
 
-class SearchEngineFactory:
-    """搜索引擎工厂类"""
+        [project.entry-points."multienginesearch.engines"]
+        bing = "mes_bing:BingEngine"
+    """
+
+    ENTRY_POINT_GROUP = "multienginesearch.engines"
 
-    _engines = {
-        "duckduckgo": DuckDuckGoEngine,
-        "google": GoogleEngine,
+    _engines: Dict[str, Union[str, type]] = {
+        "duckduckgo": "multienginesearch.engines:DuckDuckGoEngine",
+        "google": "multienginesearch.engines:GoogleEngine",
     }
+    _entry_points_loaded = False
+
+    @classmethod
+    def _load_entry_points(cls):
+        """发现通过入口点注册的第三方搜索引擎（只读取元数据，不导入模块）"""
+        if cls._entry_points_loaded:
+            return
+        cls._entry_points_loaded = True
+
+        from importlib.metadata import entry_points
+
+        try:
+            discovered = entry_points(group=cls.ENTRY_POINT_GROUP)
+        except Exception:
+            return
+        for entry_point in discovered:
+            # 内置引擎和显式注册的引擎优先
+            cls._engines.setdefault(entry_point.name.lower(), entry_point.value)
+
+    @classmethod
+    def _resolve(cls, engine_name: str) -> type:
+        """导入并返回引擎类"""
+        engine_class = cls._engines[engine_name]
+        if isinstance(engine_class, str):
+            module_name, _, attr = engine_class.partition(":")
+            engine_class = getattr(importlib.import_module(module_name), attr)
+            cls._engines[engine_name] = engine_class
+        return engine_class
 
     @classmethod
     def create_engine(cls, engine_name: str) -> Optional[SearchEngine]:
         """创建指定的搜索引擎实例"""
+        cls._load_entry_points()
         if engine_name.lower() in cls._engines:
             try:
-                return cls._engines[engine_name.lower()]()
+                return cls._resolve(engine_name.lower())()
             except Exception as e:
                 print(f"创建搜索引擎 {engine_name} 失败: {e}")
                 return None
@@ -404,14 +1147,33 @@ class SearchEngineFactory:
     @classmethod
     def get_available_engines(cls) -> List[str]:
         """获取所有可用的搜索引擎名称"""
+        cls._load_entry_points()
         return list(cls._engines.keys())
 
     @classmethod
-    def register_engine(cls, name: str, engine_class: type):
-        """注册新的搜索引擎"""
+    def register_engine(cls, name: str, engine_class: Union[str, type]):
+        """注册新的搜索引擎
+
+        Args:
+            name: 引擎名称
+            engine_class: 引擎类，或 "模块:类名" 形式的导入路径（延迟导入）
+        """
         cls._engines[name.lower()] = engine_class
 
 
+def format_result_ndjson(result: SearchResult) -> str:
+    """将单条结果格式化为一行 JSON（NDJSON 格式）"""
+    from .serialize import result_json
+
+    return result_json(result)
+
+
+def _preview(text: str, width: int = 200) -> str:
+    """正文的单行预览"""
+    text = " ".join(text.split())
+    return text if len(text) <= width else text[:width] + "…"
+
+
 # 搜索结果格式化函数
 def format_results(response: SearchResponse, output_format: str = "simple") -> str:
     """格式化搜索结果"""
@@ -419,7 +1181,13 @@ def format_results(response: SearchResponse, output_format: str = "simple") -> s
         return "❌ 没有找到搜索结果"
 
     if output_format == "json":
-        return json.dumps(response.to_dict(), ensure_ascii=False, indent=2)
+        from .serialize import response_json_pretty
+
+        return response_json_pretty(response)
+    elif output_format == "ndjson":
+        from .serialize import result_json
+
+        return "\n".join(map(result_json, response.results))
     else:  # simple format
         output = []
         output.append(f"🔍 找到 {len(response.results)} 个搜索结果:\n")
@@ -428,7 +1196,13 @@ def format_results(response: SearchResponse, output_format: str = "simple") -> s
             output.append(f"{i:2d}. {result.title}")
             output.append(f"    🔗 {result.url}")
             output.append(f"    📄 {result.description}")
-            output.append(f"    🔍 来源: {result.engine}")
+            if result.sources:
+                sources = ", ".join(f"{e} #{rank}" for e, rank in result.sources)
+                output.append(f"    🔍 来源: {sources}")
+            else:
+                output.append(f"    🔍 来源: {result.engine}")
+            if result.content:
+                output.append(f"    📃 正文: {_preview(result.content)}")
             output.append("")
 
         # 添加限流信息到 simple 格式
@@ -438,6 +1212,12 @@ def format_results(response: SearchResponse, output_format: str = "simple") -> s
             output.append(f"    • 每日限额: {rate_info['daily_limit']} 次")
             output.append(f"    • 已使用: {rate_info['requests_used']} 次")
             output.append(f"    • 剩余: {rate_info['requests_remaining']} 次")
+            for key in rate_info.get("keys", []):
+                status = " (已停用)" if key["disabled"] else ""
+                output.append(
+                    f"      - 密钥 {key['label']}: {key['requests_used']}/"
+                    f"{key['daily_limit']} 次{status}"
+                )
 
             if "reset_time" in rate_info:
                 from datetime import datetime
@@ -473,4 +1253,18 @@ def format_results(response: SearchResponse, output_format: str = "simple") -> s
             output.append(f"    • 数据来源: {source_text}")
             output.append("")
 
+        # 多引擎搜索时显示每个引擎的情况
+        if response.engine_meta:
+            output.append("📡 引擎统计:")
+            for engine_name, meta in response.engine_meta.items():
+                line = f"    • {engine_name}: {meta.get('count', 0)} 条结果"
+                if meta.get("elapsed") is not None:
+                    line += f", 耗时 {meta['elapsed']:.2f}s"
+                if meta.get("timed_out"):
+                    line += " (超时)"
+                elif meta.get("error"):
+                    line += f" (出错: {meta['error']})"
+                output.append(line)
+            output.append("")
+
         return "\n".join(output)
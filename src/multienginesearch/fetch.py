@@ -0,0 +1,343 @@
+"""
+结果页面抓取
+
+PageFetcher 在线程池中并发下载搜索结果的页面，复用带连接池的 HttpTransport，
+并限制每个主机的同时连接数、每个页面读取的字节数和耗时。页面以流的方式读取，
+边下载边用 HTMLParser 提取正文，超过上限时立即停止读取，不在内存中保存完整的页面。
+
+fetch_results() 按输入顺序逐条产出结果，同时在途的页面不超过 concurrency 的两倍，
+因此配合 iter_search() 时无论抓取多少条结果，内存占用都保持有界。
+"""
+
+import codecs
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from . import metrics
+from .engines import SearchResult
+
+if TYPE_CHECKING:
+    from .transport import HttpTransport
+
+# 同时抓取的页面数
+DEFAULT_FETCH_CONCURRENCY = 8
+
+# 每个主机的同时连接数
+DEFAULT_PER_HOST = 2
+
+# 每个页面最多读取的字节数
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+
+# 每个页面最多保留的正文字符数
+DEFAULT_MAX_CHARS = 20000
+
+# 每个页面的总耗时上限（秒）
+DEFAULT_FETCH_TIMEOUT = 10.0
+
+# 每次从连接读取的字节数
+CHUNK_SIZE = 16 * 1024
+
+# 不包含正文的标签，其中的文本被忽略
+SKIP_TAGS = frozenset(
+    ["script", "style", "noscript", "template", "svg", "head", "iframe", "canvas"]
+)
+
+# 块级标签，前后换行
+BLOCK_TAGS = frozenset(
+    [
+        "p",
+        "div",
+        "br",
+        "li",
+        "ul",
+        "ol",
+        "tr",
+        "table",
+        "section",
+        "article",
+        "header",
+        "footer",
+        "nav",
+        "aside",
+        "main",
+        "blockquote",
+        "pre",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "dt",
+        "dd",
+        "hr",
+    ]
+)
+
+_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+
+class FetchError(Exception):
+    """页面抓取失败（状态码错误或内容类型不支持）"""
+
+
+class TextExtractor(HTMLParser):
+    """增量提取 HTML 正文：忽略脚本和样式，块级标签换行，最多保留 max_chars 个字符"""
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self._parts: List[str] = []
+        self._size = 0
+        self._skip = 0
+
+    @property
+    def full(self) -> bool:
+        """已达到字符上限，之后的输入都会被丢弃"""
+        return self._size >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag in BLOCK_TAGS:
+            self._newline()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in BLOCK_TAGS:
+            self._newline()
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._append(re.sub(r"\s+", " ", data))
+
+    def _newline(self):
+        # 连续的换行只保留一个，换行不计入字符数
+        if self._parts and self._parts[-1] != "\n" and not self.full:
+            self._parts.append("\n")
+
+    def _append(self, text: str):
+        if not text or self.full:
+            return
+        text = text[: self.max_chars - self._size]
+        self._parts.append(text)
+        self._size += len(text)
+
+    def text(self) -> str:
+        """提取到的正文，每个文本块一行"""
+        lines = (" ".join(line.split()) for line in "".join(self._parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+
+class PlainTextExtractor:
+    """纯文本页面：与 TextExtractor 相同的接口，不解析标签"""
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS):
+        self.max_chars = max_chars
+        self._parts: List[str] = []
+        self._size = 0
+
+    @property
+    def full(self) -> bool:
+        return self._size >= self.max_chars
+
+    def feed(self, text: str):
+        if not self.full:
+            text = text[: self.max_chars - self._size]
+            self._parts.append(text)
+            self._size += len(text)
+
+    def close(self):
+        pass
+
+    def text(self) -> str:
+        return "".join(self._parts).strip()
+
+
+def _charset(content_type: str, head: bytes) -> str:
+    """页面编码：优先使用 Content-Type，其次是页面开头的 <meta charset>，默认 UTF-8"""
+    match = re.search(r"charset=([\w-]+)", content_type, re.IGNORECASE)
+    if match is None:
+        match = _CHARSET_PATTERN.search(head)
+    if match is not None:
+        charset = match.group(1)
+        charset = charset.decode("ascii") if isinstance(charset, bytes) else charset
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class PageFetcher:
+    """并发抓取搜索结果页面并提取正文，线程安全"""
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+        per_host: int = DEFAULT_PER_HOST,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_chars: int = DEFAULT_MAX_CHARS,
+        timeout: float = DEFAULT_FETCH_TIMEOUT,
+        transport: Optional["HttpTransport"] = None,
+    ):
+        """
+        Args:
+            concurrency: 同时抓取的页面数
+            per_host: 每个主机的同时连接数
+            max_bytes: 每个页面最多读取的字节数，超过后停止读取
+            max_chars: 每个页面最多保留的正文字符数
+            timeout: 每个页面的总耗时上限（秒），超过后保留已读取部分的正文
+            transport: HTTP 传输对象，默认创建一个连接池大小为 concurrency 的实例
+        """
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.timeout = timeout
+        if transport is None:
+            from .transport import RETRY_STATUSES, HttpTransport
+
+            # 抓取页面是尽力而为，只重试一次；429/503 的 Retry-After 往往比
+            # 页面的耗时上限还长，不等待也不重试，退避等待同样不超过耗时上限
+            transport = HttpTransport(
+                pool_size=max(self.concurrency, self.per_host),
+                read_timeout=timeout,
+                max_retries=1,
+                backoff_max=timeout,
+                retry_statuses=RETRY_STATUSES - {429, 503},
+            )
+        self.transport = transport
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "PageFetcher":
+        """按环境变量 MES_FETCH_PER_HOST、MES_FETCH_TIMEOUT 创建（参数优先）"""
+        kwargs.setdefault(
+            "per_host", int(os.getenv("MES_FETCH_PER_HOST", DEFAULT_PER_HOST))
+        )
+        kwargs.setdefault(
+            "timeout", float(os.getenv("MES_FETCH_TIMEOUT", DEFAULT_FETCH_TIMEOUT))
+        )
+        return cls(**kwargs)
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._hosts_lock:
+            slot = self._hosts.get(host)
+            if slot is None:
+                slot = self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
+
+    def fetch(self, url: str) -> str:
+        """下载一个页面并提取正文
+
+        Raises:
+            FetchError: 状态码不是 200 或内容不是 HTML/纯文本
+            Exception: 网络错误（由 requests 抛出）
+        """
+        with self._host_slot(url):
+            started = time.monotonic()
+            response = self.transport.get(url, stream=True)
+            try:
+                return self._extract(response, started)
+            finally:
+                response.close()
+
+    def _extract(self, response, started: float) -> str:
+        if response.status_code != 200:
+            raise FetchError(f"状态码 {response.status_code}")
+        content_type = response.headers.get("Content-Type", "text/html")
+        if "html" in content_type or "xml" in content_type:
+            extractor = TextExtractor(self.max_chars)
+        elif content_type.startswith("text/"):
+            extractor = PlainTextExtractor(self.max_chars)
+        else:
+            raise FetchError(f"不支持的内容类型 {content_type.split(';')[0]}")
+
+        decoder = None
+        received = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(
+                    _charset(content_type, chunk[:CHUNK_SIZE])
+                )(errors="replace")
+            chunk = chunk[: self.max_bytes - received]
+            received += len(chunk)
+            extractor.feed(decoder.decode(chunk))
+            # 正文已够长、超过字节上限或超时后停止读取，保留已提取的部分
+            if (
+                extractor.full
+                or received >= self.max_bytes
+                or time.monotonic() - started >= self.timeout
+            ):
+                break
+        if decoder is not None:
+            extractor.feed(decoder.decode(b"", final=True))
+        extractor.close()
+        metrics.count("fetch_bytes", received)
+        return extractor.text()
+
+    def _fetch_into(self, result: SearchResult) -> SearchResult:
+        """抓取一条结果的页面，写入 result.content；失败时保持为 None"""
+        try:
+            result.content = self.fetch(result.url)
+            metrics.count("pages_fetched")
+        except Exception:
+            metrics.count("fetch_errors")
+        return result
+
+    def fetch_results(self, results: Iterable[SearchResult]) -> Iterator[SearchResult]:
+        """并发抓取结果页面，按输入顺序产出写入了 content 的结果
+
+        输入按需读取，同时在途的页面不超过 concurrency 的两倍；
+        没有 URL 的结果原样产出。抓取耗时计入当前搜索的 fetch 阶段。
+        """
+        stats = metrics.current_stats()
+        started = time.perf_counter()
+        executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="mes-fetch"
+        )
+        pending: Deque["Future[SearchResult]"] = deque()
+        window = self.concurrency * 2
+        try:
+            for result in results:
+                if not result.url:
+                    pending.append(_done(result))
+                else:
+                    # 在当前上下文的副本中抓取，计数归入本次搜索
+                    pending.append(
+                        executor.submit(
+                            contextvars.copy_context().run, self._fetch_into, result
+                        )
+                    )
+                while len(pending) >= window or (pending and pending[0].done()):
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            if stats is not None:
+                stats.add_time("fetch", time.perf_counter() - started)
+
+    def close(self):
+        """关闭连接池"""
+        self.transport.close()
+
+
+def _done(result: SearchResult) -> "Future[SearchResult]":
+    future: "Future[SearchResult]" = Future()
+    future.set_result(result)
+    return future
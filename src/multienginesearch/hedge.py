@@ -0,0 +1,354 @@
+"""
+对冲请求和单引擎截止时间
+
+交互式搜索的总耗时取决于最慢的那次请求。HedgedSearchEngine 为被包装的引擎
+加上截止时间，并可在引擎超过其近期 p95 耗时仍未返回时，再发出一次相同的请求
+（或发给配置的备用引擎），取先返回结果的那一个，以降低尾部延迟。
+
+近期耗时由 LatencyTracker 按引擎记录，可保存在 JSON 文件中（默认 ~/.mes_latency.json），
+使每次运行的 mes 都能利用之前的历史。对冲的 Google 请求和普通请求一样先预占配额，
+落后的请求如果最终被 Google 计费，同样计入配额。
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from . import metrics
+from ._fileutil import write_atomic
+from .engines import (
+    SearchEngine,
+    SearchError,
+    SearchResponse,
+    SearchResult,
+    offset_kwargs,
+)
+from .multi import submit_daemon
+
+# 每个引擎保留的最近耗时样本数
+DEFAULT_WINDOW = 100
+
+# 估计分位数所需的最少样本数，不足时不发出对冲请求
+MIN_SAMPLES = 5
+
+# 超过该分位数的耗时后发出对冲请求
+DEFAULT_PERCENTILE = 0.95
+
+
+def parse_engine_deadlines(spec: Optional[str]) -> Dict[str, float]:
+    """解析 "google=5,duckduckgo=3" 形式的每引擎截止时间（秒）
+
+    单独的数字（如 "5"）表示所有引擎，保存在键 "*" 下。
+
+    Raises:
+        ValueError: 格式错误或截止时间不是正数
+    """
+    deadlines: Dict[str, float] = {}
+    if not spec:
+        return deadlines
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.rpartition("=")
+        name = name.strip().lower() if sep else "*"
+        try:
+            seconds = float(value)
+        except ValueError:
+            raise ValueError(f"无效的截止时间: {part}（应为 秒数 或 引擎=秒数）")
+        if seconds <= 0:
+            raise ValueError(f"截止时间必须大于 0: {part}")
+        deadlines[name] = seconds
+    return deadlines
+
+
+class LatencyTracker:
+    """按引擎记录最近的搜索耗时，估计分位数，线程安全
+
+    指定 path 时样本保存在 JSON 文件中并在创建时读取；多个进程同时写入时
+    以最后写入的为准，偶尔丢失个别样本不影响分位数的估计。
+    """
+
+    def __init__(self, path: Optional[Path] = None, window: int = DEFAULT_WINDOW):
+        """
+        Args:
+            path: 样本文件路径，None 表示只保存在内存中
+            window: 每个引擎保留的最近样本数
+        """
+        self.path = Path(path) if path is not None else None
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        if self.path is not None:
+            for engine, samples in self._read().items():
+                self._samples[engine] = deque(samples, maxlen=window)
+
+    @classmethod
+    def default(cls) -> "LatencyTracker":
+        """使用环境变量 MES_LATENCY_PATH 或 ~/.mes_latency.json 保存样本"""
+        return cls(os.getenv("MES_LATENCY_PATH") or Path.home() / ".mes_latency.json")
+
+    def _read(self) -> Dict[str, List[float]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {
+            engine: [s for s in samples if isinstance(s, (int, float))]
+            for engine, samples in data.items()
+            if isinstance(samples, list)
+        }
+
+    def _write(self, data: Dict[str, List[float]]):
+        try:
+            write_atomic(self.path, json.dumps(data))
+        except OSError:
+            pass
+
+    def record(self, engine: str, seconds: float):
+        """记录一次搜索的耗时"""
+        with self._lock:
+            samples = self._samples.setdefault(engine, deque(maxlen=self.window))
+            samples.append(round(seconds, 4))
+            if self.path is None:
+                return
+            # 合并其它进程写入的样本，本引擎以内存中的为准
+            data = self._read()
+            data[engine] = list(samples)
+            self._write(data)
+
+    def samples(self, engine: str) -> List[float]:
+        with self._lock:
+            return list(self._samples.get(engine, ()))
+
+    def percentile(self, engine: str, q: float = DEFAULT_PERCENTILE) -> Optional[float]:
+        """最近耗时的 q 分位数（最近秩法），样本不足 MIN_SAMPLES 时返回 None"""
+        samples = sorted(self.samples(engine))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))
+        return samples[index]
+
+
+class HedgedSearchEngine(SearchEngine):
+    """为被包装的引擎加上截止时间和对冲请求的包装器
+
+    search() 在守护线程中发出请求；超过 hedge_delay() 仍未返回时再发出一次对冲请求
+    （发给 hedge_engine，未指定时重复请求同一个引擎），取先返回结果的那一个。
+    所有请求都没有在截止时间前返回时，返回空结果和 timeout 错误。
+    落后的请求不会被中断，其结果被丢弃。
+    """
+
+    def __init__(
+        self,
+        engine: SearchEngine,
+        tracker: LatencyTracker,
+        deadline: Optional[float] = None,
+        hedge: bool = False,
+        hedge_engine: Optional[SearchEngine] = None,
+        percentile: float = DEFAULT_PERCENTILE,
+    ):
+        """
+        Args:
+            engine: 被包装的引擎
+            tracker: 记录和估计耗时的 LatencyTracker
+            deadline: 截止时间（秒），None 表示不限制
+            hedge: 是否发出对冲请求
+            hedge_engine: 对冲请求发给的备用引擎，None 表示重复请求 engine
+            percentile: 超过近期耗时的该分位数后发出对冲请求
+        """
+        self.engine = engine
+        self.tracker = tracker
+        self.deadline = deadline
+        self.hedge = hedge or hedge_engine is not None
+        self.hedge_engine = hedge_engine
+        self.percentile = percentile
+
+    @property
+    def name(self) -> str:
+        return self.engine.name
+
+    def cache_params(self) -> Dict[str, Any]:
+        return self.engine.cache_params()
+
+    def resumes_at_offset(self) -> bool:
+        return self.engine.resumes_at_offset()
+
+    def hedge_delay(self) -> Optional[float]:
+        """发出对冲请求前等待的秒数，不对冲或历史样本不足时为 None"""
+        if not self.hedge:
+            return None
+        return self.tracker.percentile(self.engine.name, self.percentile)
+
+    def _record(self, engine: SearchEngine, response: SearchResponse, elapsed: float):
+        """记录一次请求的耗时；出错或命中缓存的请求不代表引擎的真实耗时"""
+        stats = response.stats
+        if stats is not None and (
+            stats.total_count("errors")
+            or stats.total_count("cache_hits")
+            or stats.total_count("memo_hits")
+        ):
+            return
+        self.tracker.record(engine.name, elapsed)
+
+    def _timed_out(self, started: float) -> SearchResponse:
+        """所有请求都超过截止时间：记录超时，并把截止时间作为一次耗时样本"""
+        self.tracker.record(self.engine.name, time.monotonic() - started)
+        stats = metrics.SearchStats(self.name)
+        stats.incr("timeouts")
+        stats.incr("errors")
+        error = SearchError(
+            self.name, "timeout", f"超过截止时间 {self.deadline:g} 秒仍未返回"
+        )
+        return SearchResponse([], stats=stats, error=error)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        if self.deadline is None and not self.hedge:
+            return self.engine.search(
+                query, limit, time_filter=time_filter, **offset_kwargs(offset)
+            )
+
+        def attempt(engine: SearchEngine):
+            attempt_started = time.monotonic()
+            response = engine.search(
+                query, limit, time_filter=time_filter, **offset_kwargs(offset)
+            )
+            return response, time.monotonic() - attempt_started
+
+        started = time.monotonic()
+        deadline = started + self.deadline if self.deadline is not None else None
+        delay = self.hedge_delay()
+        hedge_at = started + delay if delay is not None else None
+
+        def submit(engine: SearchEngine):
+            # 守护线程不会在进程退出时被等待，落后的请求不会拖住退出
+            return submit_daemon(
+                contextvars.copy_context().run, attempt, engine, name="mes-hedge"
+            )
+
+        attempts = {submit(self.engine): self.engine}
+        hedged = False
+        while attempts:
+            now = time.monotonic()
+            if hedge_at is not None and not hedged and now >= hedge_at:
+                hedged = True
+                target = self.hedge_engine or self.engine
+                attempts[submit(target)] = target
+
+            timeouts = [t - now for t in (deadline,) if t is not None]
+            if hedge_at is not None and not hedged:
+                timeouts.append(hedge_at - now)
+            timeout = max(0.0, min(timeouts)) if timeouts else None
+            if deadline is not None and now >= deadline:
+                break
+
+            done, _ = wait(attempts, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                engine = attempts.pop(future)
+                try:
+                    response, elapsed = future.result()
+                except Exception:
+                    # 还有其它请求在进行中时等待它们
+                    if attempts:
+                        continue
+                    raise
+                self._record(engine, response, elapsed)
+                # 返回了结果，或者已经没有其它请求在进行中
+                if response.results or not attempts:
+                    return self._finish(response, hedged)
+        return self._timed_out(started)
+
+    async def asearch(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        if self.deadline is None and not self.hedge:
+            return await self.engine.asearch(
+                query, limit, time_filter=time_filter, **offset_kwargs(offset)
+            )
+
+        async def attempt(engine: SearchEngine):
+            attempt_started = time.monotonic()
+            response = await engine.asearch(
+                query, limit, time_filter=time_filter, **offset_kwargs(offset)
+            )
+            return engine, response, time.monotonic() - attempt_started
+
+        started = time.monotonic()
+        deadline = started + self.deadline if self.deadline is not None else None
+        delay = self.hedge_delay()
+        hedge_at = started + delay if delay is not None else None
+
+        pending = {asyncio.ensure_future(attempt(self.engine))}
+        hedged = False
+        try:
+            while pending:
+                now = time.monotonic()
+                if hedge_at is not None and not hedged and now >= hedge_at:
+                    hedged = True
+                    target = self.hedge_engine or self.engine
+                    pending.add(asyncio.ensure_future(attempt(target)))
+
+                timeouts = [t - now for t in (deadline,) if t is not None]
+                if hedge_at is not None and not hedged:
+                    timeouts.append(hedge_at - now)
+                timeout = max(0.0, min(timeouts)) if timeouts else None
+                if deadline is not None and now >= deadline:
+                    break
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        engine, response, elapsed = task.result()
+                    except Exception:
+                        if pending:
+                            continue
+                        raise
+                    self._record(engine, response, elapsed)
+                    if response.results or not pending:
+                        return self._finish(response, hedged)
+        finally:
+            # 取消落后的请求；已经发出的 Google 请求保留预占的配额
+            for task in pending:
+                task.cancel()
+        return self._timed_out(started)
+
+    def _finish(self, response: SearchResponse, hedged: bool) -> SearchResponse:
+        if hedged:
+            if response.stats is None:
+                response.stats = metrics.SearchStats(self.name)
+            response.stats.incr("hedges")
+        return response
+
+    def iter_search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> Iterator[SearchResult]:
+        # 流式搜索在第一条结果到达后就开始输出，不做对冲
+        yield from self.engine.iter_search(
+            query, limit, time_filter=time_filter, **offset_kwargs(offset)
+        )
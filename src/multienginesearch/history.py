@@ -0,0 +1,468 @@
+"""
+本地搜索历史
+
+每次 mes search 的结果保存到本地 SQLite（默认 ~/.mes_history.sqlite3），
+searches 表按查询、引擎和时间记录每次搜索，results 表保存结果，
+FTS5 全文索引覆盖结果的标题、摘要和 URL。mes history 按关键词和时间范围查询时
+只读本地数据库，不访问网络。
+
+索引使用 trigram 分词器，中文等不以空格分词的文本也能按任意子串匹配；
+少于 3 个字符的关键词无法使用 trigram 索引，改为 LIKE 匹配。
+SQLite 不支持 trigram 时退回 unicode61 分词器，没有 FTS5 时全部使用 LIKE。
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .cache import normalize_query
+from .engines import SearchResult
+
+# 相对时间的单位（秒），如 12h、7d、2w
+_RELATIVE_UNITS = {"m": 60, "h": 60 * 60, "d": 24 * 60 * 60, "w": 7 * 24 * 60 * 60}
+
+_RELATIVE_PATTERN = re.compile(r"^(\d+)([mhdw])$")
+
+
+def default_history_path() -> Path:
+    """历史数据库路径，可通过环境变量 MES_HISTORY_PATH 覆盖"""
+    path = os.getenv("MES_HISTORY_PATH")
+    if path:
+        return Path(path).expanduser()
+    return Path.home() / ".mes_history.sqlite3"
+
+
+def history_enabled() -> bool:
+    """是否记录搜索历史，环境变量 MES_HISTORY=0 时关闭"""
+    return os.getenv("MES_HISTORY", "1").strip().lower() not in ("0", "false", "no")
+
+
+def parse_time_bound(value: str, now: Optional[float] = None) -> float:
+    """解析时间范围的边界，返回 Unix 时间戳
+
+    支持相对时间（30m、12h、7d、2w，表示多久以前）和本地时间的
+    ISO 日期或日期时间（2025-06-01、2025-06-01T08:30）。
+
+    Raises:
+        ValueError: 无法解析
+    """
+    text = value.strip().lower()
+    match = _RELATIVE_PATTERN.match(text)
+    if match:
+        amount, unit = match.groups()
+        now = time.time() if now is None else now
+        return now - int(amount) * _RELATIVE_UNITS[unit]
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError:
+        raise ValueError(
+            f"无效的时间: {value}，应为 30m、12h、7d、2w 或 2025-06-01 这样的日期"
+        )
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class HistoryEntry:
+    """一次搜索的记录"""
+
+    __slots__ = ("id", "query", "engine", "time_filter", "searched_at", "count")
+
+    def __init__(
+        self,
+        id: int,
+        query: str,
+        engine: str,
+        time_filter: Optional[str],
+        searched_at: float,
+        count: int,
+    ):
+        self.id = id
+        self.query = query
+        self.engine = engine
+        self.time_filter = time_filter
+        self.searched_at = searched_at
+        self.count = count
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式"""
+        return {
+            "id": self.id,
+            "query": self.query,
+            "engine": self.engine,
+            "time_filter": self.time_filter,
+            "searched_at": _iso(self.searched_at),
+            "count": self.count,
+        }
+
+
+class HistoryHit:
+    """历史中匹配关键词的一条结果，以及它出现的那次搜索"""
+
+    __slots__ = ("result", "rank", "query", "time_filter", "searched_at")
+
+    def __init__(
+        self,
+        result: SearchResult,
+        rank: int,
+        query: str,
+        time_filter: Optional[str],
+        searched_at: float,
+    ):
+        self.result = result
+        self.rank = rank
+        self.query = query
+        self.time_filter = time_filter
+        self.searched_at = searched_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式：结果字段之后是排名、查询和搜索时间"""
+        data = self.result.to_dict()
+        data.update(
+            {
+                "rank": self.rank,
+                "query": self.query,
+                "time_filter": self.time_filter,
+                "searched_at": _iso(self.searched_at),
+            }
+        )
+        return data
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+
+class SearchHistory:
+    """基于 SQLite 和 FTS5 的本地搜索历史，线程安全"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else default_history_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                id INTEGER PRIMARY KEY,
+                query TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                time_filter TEXT,
+                searched_at REAL NOT NULL,
+                count INTEGER NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_searches_time ON searches (searched_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_searches_query "
+            "ON searches (query, searched_at)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY,
+                search_id INTEGER NOT NULL REFERENCES searches (id),
+                rank INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                url TEXT NOT NULL,
+                description TEXT NOT NULL,
+                engine TEXT NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_results_search ON results (search_id)"
+        )
+        self.tokenizer = self._create_index()
+        self._conn.commit()
+
+    def _create_index(self) -> Optional[str]:
+        """创建全文索引，返回使用的分词器；SQLite 没有 FTS5 时返回 None"""
+        row = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'results_fts'"
+        ).fetchone()
+        if row is not None:
+            return "trigram" if "trigram" in row[0] else "unicode61"
+        # 索引只保存分词结果，原文从 results 表读取（external content）
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE results_fts USING fts5("
+                    "title, description, url, content='results', content_rowid='id', "
+                    f"tokenize='{tokenizer}')"
+                )
+                return tokenizer
+            except sqlite3.OperationalError:
+                continue
+        return None
+
+    def record(
+        self,
+        query: str,
+        engine: str,
+        results: Iterable[SearchResult],
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+        searched_at: Optional[float] = None,
+    ) -> int:
+        """保存一次搜索及其结果，返回这次搜索的 id
+
+        Args:
+            query: 搜索查询字符串（会被规范化）
+            engine: 搜索使用的引擎，多引擎搜索时为逗号分隔的引擎名
+            results: 搜索结果，排名从 offset 开始计
+            time_filter: 时间筛选参数
+            offset: 第一条结果的排名（从 0 开始）
+            searched_at: 搜索时间，默认为当前时间
+        """
+        results = list(results)
+        searched_at = time.time() if searched_at is None else searched_at
+        rows = [
+            (offset + i, r.title, r.url, r.description, r.engine)
+            for i, r in enumerate(results)
+        ]
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO searches (query, engine, time_filter, searched_at, count) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        normalize_query(query),
+                        engine,
+                        time_filter,
+                        searched_at,
+                        len(rows),
+                    ),
+                )
+                search_id = cursor.lastrowid
+                # 逐行插入以拿到 rowid，一次搜索最多 100 条结果
+                for row in rows:
+                    result_id = self._conn.execute(
+                        "INSERT INTO results "
+                        "(search_id, rank, title, url, description, engine) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (search_id,) + row,
+                    ).lastrowid
+                    if self.tokenizer is not None:
+                        self._conn.execute(
+                            "INSERT INTO results_fts (rowid, title, description, url) "
+                            "VALUES (?, ?, ?, ?)",
+                            (result_id, row[1], row[3], row[2]),
+                        )
+        return search_id
+
+    def _time_conditions(
+        self,
+        since: Optional[float],
+        until: Optional[float],
+        engine: Optional[str],
+        query: Optional[str],
+    ) -> Tuple[List[str], List[Any]]:
+        conditions: List[str] = []
+        params: List[Any] = []
+        if since is not None:
+            conditions.append("s.searched_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("s.searched_at < ?")
+            params.append(until)
+        if engine:
+            conditions.append("r.engine = ?")
+            params.append(engine)
+        if query:
+            conditions.append("s.query = ?")
+            params.append(normalize_query(query))
+        return conditions, params
+
+    def search(
+        self,
+        keywords: str = "",
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        engine: Optional[str] = None,
+        query: Optional[str] = None,
+        limit: int = 20,
+        unique: bool = True,
+    ) -> List[HistoryHit]:
+        """在历史结果中查找关键词，最近的搜索在前
+
+        Args:
+            keywords: 空格分隔的关键词，结果的标题、摘要或 URL 需包含全部关键词；
+                为空时返回时间范围内的全部结果
+            since: 只查找该时间（Unix 时间戳）之后的搜索
+            until: 只查找该时间之前的搜索
+            engine: 只查找该引擎返回的结果
+            query: 只查找该查询的搜索结果
+            limit: 最多返回的条数
+            unique: 同一 URL 只返回最近一次出现
+        """
+        conditions, params = self._time_conditions(since, until, engine, query)
+        joins = ""
+        fts_terms = []
+        for term in keywords.split():
+            if self.tokenizer == "trigram" and len(term) >= 3:
+                fts_terms.append('"' + term.replace('"', '""') + '"')
+            elif self.tokenizer == "unicode61" and term.isascii() and term.isalnum():
+                fts_terms.append('"' + term + '"*')
+            else:
+                conditions.append(
+                    "(r.title LIKE ? ESCAPE '\\' OR r.description LIKE ? ESCAPE '\\' "
+                    "OR r.url LIKE ? ESCAPE '\\')"
+                )
+                params.extend([_like_pattern(term)] * 3)
+        if fts_terms:
+            joins = "JOIN results_fts ON results_fts.rowid = r.id "
+            conditions.insert(0, "results_fts MATCH ?")
+            params.insert(0, " ".join(fts_terms))
+
+        sql = (
+            "SELECT r.title, r.url, r.description, r.engine, r.rank, "
+            "s.query, s.time_filter, s.searched_at "
+            "FROM results r JOIN searches s ON s.id = r.search_id " + joins
+        )
+        if conditions:
+            sql += "WHERE " + " AND ".join(conditions) + " "
+        sql += "ORDER BY s.searched_at DESC, r.rank"
+        if not unique:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        hits: List[HistoryHit] = []
+        seen = set()
+        with self._lock:
+            # 去重时逐行读取，凑够 limit 条不同的 URL 即停止
+            for (
+                title,
+                url,
+                description,
+                result_engine,
+                rank,
+                q,
+                tf,
+                at,
+            ) in self._conn.execute(sql, params):
+                if unique:
+                    if url in seen:
+                        continue
+                    seen.add(url)
+                hits.append(
+                    HistoryHit(
+                        SearchResult(title, url, description, result_engine),
+                        rank,
+                        q,
+                        tf,
+                        at,
+                    )
+                )
+                if len(hits) >= limit:
+                    break
+        return hits
+
+    def searches(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        engine: Optional[str] = None,
+        query: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[HistoryEntry]:
+        """列出时间范围内的搜索记录，最近的在前
+
+        engine 匹配多引擎搜索中的任意一个引擎。
+        """
+        conditions, params = self._time_conditions(since, until, None, query)
+        if engine:
+            conditions.append("(',' || s.engine || ',') LIKE ?")
+            params.append(f"%,{engine},%")
+        sql = (
+            "SELECT s.id, s.query, s.engine, s.time_filter, s.searched_at, s.count "
+            "FROM searches s "
+        )
+        if conditions:
+            sql += "WHERE " + " AND ".join(conditions) + " "
+        sql += "ORDER BY s.searched_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def clear(self, before: Optional[float] = None) -> int:
+        """删除搜索记录，before 为 None 时全部删除，返回删除的搜索次数"""
+        with self._lock:
+            with self._conn:
+                if before is None:
+                    (count,) = self._conn.execute(
+                        "SELECT COUNT(*) FROM searches"
+                    ).fetchone()
+                    self._conn.execute("DELETE FROM results")
+                    self._conn.execute("DELETE FROM searches")
+                    if self.tokenizer is not None:
+                        self._conn.execute(
+                            "INSERT INTO results_fts (results_fts) VALUES ('delete-all')"
+                        )
+                    return count
+
+                ids = [
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT id FROM searches WHERE searched_at < ?", (before,)
+                    )
+                ]
+                for search_id in ids:
+                    if self.tokenizer is not None:
+                        # external content 索引需要用原文删除对应的分词
+                        self._conn.execute(
+                            "INSERT INTO results_fts "
+                            "(results_fts, rowid, title, description, url) "
+                            "SELECT 'delete', id, title, description, url "
+                            "FROM results WHERE search_id = ?",
+                            (search_id,),
+                        )
+                    self._conn.execute(
+                        "DELETE FROM results WHERE search_id = ?", (search_id,)
+                    )
+                self._conn.execute(
+                    "DELETE FROM searches WHERE searched_at < ?", (before,)
+                )
+                return len(ids)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+def format_hits(hits: List[HistoryHit]) -> str:
+    """以 simple 格式输出历史中匹配的结果"""
+    output = [f"🕘 历史中找到 {len(hits)} 个结果:\n"]
+    for i, hit in enumerate(hits, 1):
+        result = hit.result
+        output.append(f"{i:2d}. {result.title}")
+        output.append(f"    🔗 {result.url}")
+        output.append(f"    📄 {result.description}")
+        searched_at = datetime.fromtimestamp(hit.searched_at)
+        output.append(
+            f"    🔍 {searched_at:%Y-%m-%d %H:%M} {result.engine} #{hit.rank + 1}"
+            f" · 查询: {hit.query}"
+        )
+        output.append("")
+    return "\n".join(output)
+
+
+def format_entries(entries: List[HistoryEntry]) -> str:
+    """以 simple 格式输出搜索记录"""
+    output = [f"🕘 最近 {len(entries)} 次搜索:\n"]
+    for entry in entries:
+        searched_at = datetime.fromtimestamp(entry.searched_at)
+        time_filter = f" [{entry.time_filter}]" if entry.time_filter else ""
+        output.append(
+            f"  {searched_at:%Y-%m-%d %H:%M}  {entry.engine}{time_filter}  "
+            f"{entry.query}  ({entry.count} 个结果)"
+        )
+    return "\n".join(output)
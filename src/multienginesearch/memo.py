@@ -0,0 +1,298 @@
+"""
+进程内搜索结果记忆化
+
+在内存中缓存最近的 SearchResponse，并合并并发的相同请求（single-flight）：
+多个线程同时搜索同一个查询时，只有一个线程真正访问上游搜索引擎，
+其它线程等待并共享它的结果。asyncio 中并发的相同请求同样会被合并。
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from .cache import DEFAULT_TTLS, _hash_key, normalize_query
+from .metrics import SearchStats
+from .engines import SearchEngine, SearchResponse, offset_kwargs
+
+# 内存缓存默认容量
+DEFAULT_MEMO_SIZE = 256
+
+
+def make_key(
+    engine_name: str,
+    query: str,
+    limit: int,
+    time_filter: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    offset: int = 0,
+) -> str:
+    """构造记忆化的键
+
+    Args:
+        engine_name: 搜索引擎名称
+        query: 搜索查询字符串（会被规范化）
+        limit: 返回结果数量限制
+        time_filter: 时间筛选参数
+        params: 影响结果的引擎配置（如 region、safesearch）
+        offset: 跳过的结果数（为 0 时与不分页的键相同）
+    """
+    parts = [engine_name, normalize_query(query), limit, time_filter, params or {}]
+    if offset:
+        parts.append(offset)
+    return _hash_key(parts)
+
+
+class LRUCache:
+    """线程安全的有界 LRU 缓存，条目可设置过期时间"""
+
+    def __init__(self, maxsize: int = DEFAULT_MEMO_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取缓存，不存在或已过期时返回 None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """写入缓存，超过容量时淘汰最久未访问的条目"""
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _Call:
+    """一次正在进行中的调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """合并并发的相同调用
+
+    同一个 key 的调用正在进行时，后来的调用者不会重复执行，
+    而是等待第一个调用完成并得到相同的结果（或异常）。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """执行 fn，或等待同一 key 正在进行的调用并返回其结果"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """SingleFlight 的 asyncio 版本，合并同一事件循环中并发的相同调用
+
+    某个等待者被取消时不会取消正在进行的调用，其它等待者仍能得到结果。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, Hashable], "asyncio.Task[Any]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行 fn()，或等待同一 key 正在进行的调用并返回其结果"""
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        task = self._calls.get(call_key)
+        if task is None:
+            task = loop.create_task(fn())
+            self._calls[call_key] = task
+            task.add_done_callback(lambda _: self._calls.pop(call_key, None))
+        return await asyncio.shield(task)
+
+
+# 进程内共享的默认缓存和请求合并器，使不同的包装器实例也能共享结果
+_default_cache = LRUCache()
+_default_flight = SingleFlight()
+_default_async_flight = AsyncSingleFlight()
+
+
+class MemoizedSearchEngine(SearchEngine):
+    """为搜索引擎加上内存 LRU 缓存和并发请求合并的包装器
+
+    适合作为库在多线程中使用：N 个线程同时搜索相同的
+    (引擎, 查询, limit, time_filter) 时只会产生一次上游请求。
+    返回的是结果列表的浅拷贝，调用方可以安全地修改列表本身。
+    """
+
+    def __init__(
+        self,
+        engine: SearchEngine,
+        cache: Optional[LRUCache] = None,
+        flight: Optional[SingleFlight] = None,
+        ttls: Optional[Dict[Optional[str], float]] = None,
+        async_flight: Optional[AsyncSingleFlight] = None,
+    ):
+        """
+        Args:
+            engine: 被包装的搜索引擎
+            cache: 内存缓存，默认使用进程内共享的缓存
+            flight: 请求合并器，默认使用进程内共享的合并器
+            ttls: 各时间筛选参数对应的缓存有效期（秒），默认与磁盘缓存一致
+            async_flight: asearch() 使用的请求合并器，默认使用进程内共享的合并器
+        """
+        self.engine = engine
+        self.cache = cache if cache is not None else _default_cache
+        self.flight = flight if flight is not None else _default_flight
+        self.async_flight = (
+            async_flight if async_flight is not None else _default_async_flight
+        )
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+    @property
+    def name(self) -> str:
+        return self.engine.name
+
+    def cache_params(self) -> Dict[str, Any]:
+        return self.engine.cache_params()
+
+    def resumes_at_offset(self) -> bool:
+        return self.engine.resumes_at_offset()
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        key = make_key(
+            self.name, query, limit, time_filter, self.cache_params(), offset
+        )
+
+        leader = []
+        response = self.cache.get(key)
+        if response is None:
+
+            def run():
+                leader.append(True)
+                return self._search_and_store(key, query, limit, time_filter, offset)
+
+            response = self.flight.do(key, run)
+
+        return self._copy(response, bool(leader))
+
+    async def asearch(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        key = make_key(
+            self.name, query, limit, time_filter, self.cache_params(), offset
+        )
+
+        leader = []
+        response = self.cache.get(key)
+        if response is None:
+
+            def run():
+                leader.append(True)
+                return self._asearch_and_store(key, query, limit, time_filter, offset)
+
+            response = await self.async_flight.do(key, run)
+
+        return self._copy(response, bool(leader))
+
+    def _copy(self, response: SearchResponse, leader: bool) -> SearchResponse:
+        """复制共享的响应；只有真正执行了搜索的调用者得到上游的计量数据"""
+        if leader and response.stats is not None:
+            stats = response.stats
+        else:
+            stats = SearchStats(self.name)
+            if not leader:
+                stats.incr("memo_hits")
+        return SearchResponse(
+            list(response.results),
+            response.rate_limit_info,
+            response.engine_meta,
+            stats,
+            response.error,
+        )
+
+    def _search_and_store(
+        self,
+        key: str,
+        query: str,
+        limit: int,
+        time_filter: Optional[str],
+        offset: int = 0,
+    ) -> SearchResponse:
+        response = self.engine.search(
+            query, limit, time_filter=time_filter, **offset_kwargs(offset)
+        )
+        self._store(key, response, time_filter)
+        return response
+
+    async def _asearch_and_store(
+        self,
+        key: str,
+        query: str,
+        limit: int,
+        time_filter: Optional[str],
+        offset: int = 0,
+    ) -> SearchResponse:
+        response = await self.engine.asearch(
+            query, limit, time_filter=time_filter, **offset_kwargs(offset)
+        )
+        self._store(key, response, time_filter)
+        return response
+
+    def _store(self, key: str, response: SearchResponse, time_filter: Optional[str]):
+        # 空结果通常意味着出错，不写入缓存
+        if response.results:
+            ttl = self.ttls.get(time_filter, self.ttls[None])
+            self.cache.set(key, response, ttl)
@@ -0,0 +1,190 @@
+"""
+多引擎结果合并
+
+对各引擎返回的结果做 URL 规范化和去重，并使用倒数排名融合（RRF）重新排序：
+
+    score(页面) = Σ 引擎权重 / (k + 该页面在引擎结果中的排名)
+
+同一页面被多个引擎返回时得分累加，因此会排在只被一个引擎返回的页面之前。
+去重基于规范化 URL 的哈希，时间复杂度为 O(n)，排序为 O(n log n)。
+"""
+
+import functools
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .engines import SearchResult
+
+# RRF 平滑常数，k 越大排名差异的影响越小
+RRF_K = 60
+
+# 不影响页面内容的跟踪参数
+TRACKING_PARAMS = frozenset(
+    {
+        "gclid",
+        "dclid",
+        "fbclid",
+        "msclkid",
+        "yclid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "_ga",
+        "_gl",
+        "ref_src",
+        "spm",
+    }
+)
+TRACKING_PREFIXES = ("utm_",)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+@functools.lru_cache(maxsize=8192)
+def canonicalize_url(url: str) -> str:
+    """返回 URL 的规范形式，用于判断两个结果是否指向同一页面
+
+    - http 与 https 视为相同（统一为 https）
+    - 主机名小写，去掉 www. 前缀和默认端口
+    - 去掉片段（#...）、跟踪参数（utm_*、gclid 等）和路径末尾的斜杠
+    - 其余查询参数按名称排序
+
+    非 http(s) 或无法解析的 URL 只去掉首尾空白后返回。
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = parts.hostname
+    if scheme not in _DEFAULT_PORTS or not host:
+        return url
+
+    if host.startswith("www."):
+        host = host[4:]
+    if ":" in host:  # IPv6 地址
+        host = f"[{host}]"
+    if port is not None and port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+
+    query = ""
+    if parts.query:
+        params = [
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not _is_tracking_param(name)
+        ]
+        params.sort()
+        query = urlencode(params)
+
+    return urlunsplit(("https", host, parts.path.rstrip("/"), query, ""))
+
+
+def parse_engine_weights(
+    spec: Union[None, str, Mapping[str, Any]],
+) -> Dict[str, float]:
+    """解析 "google=2,duckduckgo=1" 形式的引擎权重，也接受 {"google": 2} 形式的映射
+
+    Raises:
+        ValueError: 格式错误、权重不是数字或权重为负数
+    """
+    weights: Dict[str, float] = {}
+    if not spec:
+        return weights
+    pairs: List[Tuple[str, Any]] = []
+    if isinstance(spec, Mapping):
+        pairs = [(str(name), value) for name, value in spec.items()]
+    else:
+        for part in spec.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            name, sep, value = part.partition("=")
+            if not sep:
+                raise ValueError(f"无效的权重设置: {part}（应为 引擎=权重）")
+            pairs.append((name, value))
+    for name, value in pairs:
+        try:
+            weight = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"无效的权重设置: {name}={value}")
+        if weight < 0:
+            raise ValueError(f"权重不能为负数: {name}={value}")
+        weights[name.strip().lower()] = weight
+    return weights
+
+
+def fuse_results(
+    ranked_lists: Iterable[Sequence[SearchResult]],
+    weights: Optional[Dict[str, float]] = None,
+    k: int = RRF_K,
+) -> List[SearchResult]:
+    """去重并用倒数排名融合合并多个引擎的结果列表
+
+    Args:
+        ranked_lists: 每个引擎按排名排列的结果列表
+        weights: 引擎名到权重的映射，未列出的引擎权重为 1
+        k: RRF 平滑常数
+
+    Returns:
+        List[SearchResult]: 新的结果列表（不修改输入），按融合得分从高到低排列，
+        得分相同时保持首次出现的顺序。每条结果的 sources 按出现顺序记录
+        贡献它的 (引擎, 排名)，标题和摘要取自排名贡献最大的那个引擎。
+    """
+    weights = weights or {}
+    fused: Dict[Hashable, SearchResult] = {}
+    best: Dict[Hashable, float] = {}
+
+    for results in ranked_lists:
+        # 同一个列表中重复出现的页面只计最靠前的排名
+        seen = set()
+        for rank, result in enumerate(results, 1):
+            key = canonicalize_url(result.url) if result.url else id(result)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            contribution = weights.get(result.engine, 1.0) / (k + rank)
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = SearchResult(
+                    result.title,
+                    result.url,
+                    result.description,
+                    result.engine,
+                    sources=[(result.engine, rank)],
+                    score=contribution,
+                )
+                best[key] = contribution
+                continue
+
+            entry.sources.append((result.engine, rank))
+            entry.score += contribution
+            if contribution > best[key]:
+                best[key] = contribution
+                entry.title = result.title
+                entry.url = result.url
+                entry.description = result.description
+                entry.engine = result.engine
+
+    # sorted 是稳定排序，得分相同的结果保持首次出现的顺序
+    return sorted(fused.values(), key=lambda r: r.score, reverse=True)
@@ -0,0 +1,385 @@
+"""
+搜索计量
+
+每次搜索记录各阶段耗时（引擎构建、每页网络请求、解析、缓存、格式化）、
+接收字节数、请求和重试次数、缓存命中/未命中以及错误次数，附加在
+SearchResponse.stats 上；MetricsRegistry 在进程内累计这些数据，
+并渲染为 Prometheus 文本格式。
+
+引擎内部通过 current_stats() 获取当前搜索的计量对象（基于 contextvars），
+因此传输层等底层代码无需层层传参；没有正在计量的搜索时记录操作不做任何事。
+"""
+
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 各阶段的显示名称
+PHASE_LABELS = {
+    "construct": "构建",
+    "cache": "缓存",
+    "ratelimit": "限速等待",
+    "network": "网络",
+    "parse": "解析",
+    "merge": "融合",
+    "fetch": "抓取",
+    "format": "格式化",
+}
+
+# 各计数器的显示名称和 Prometheus 说明
+COUNTER_LABELS = {
+    "requests": "请求",
+    "retries": "重试",
+    "throttled": "限流",
+    "key_failovers": "密钥切换",
+    "hedges": "对冲请求",
+    "timeouts": "超时",
+    "circuit_open": "熔断拒绝",
+    "bytes_received": "接收字节",
+    "cache_hits": "缓存命中",
+    "cache_misses": "缓存未命中",
+    "memo_hits": "内存缓存命中",
+    "errors": "错误",
+    "pages_fetched": "抓取页面",
+    "fetch_errors": "抓取失败",
+    "fetch_bytes": "抓取字节",
+}
+
+
+class SearchStats:
+    """一次搜索的计量数据，线程安全
+
+    多引擎搜索时 engines 中保存每个引擎各自的计量数据，
+    顶层只记录不属于任何单个引擎的阶段（如格式化）。
+    """
+
+    __slots__ = ("engine", "timings", "counters", "pages", "engines", "_lock")
+
+    def __init__(self, engine: str = ""):
+        self.engine = engine
+        # 阶段 -> 累计秒数
+        self.timings: Dict[str, float] = {}
+        # 计数器名 -> 数值
+        self.counters: Dict[str, int] = {}
+        # 每页网络请求的耗时（秒），按完成顺序
+        self.pages: List[float] = []
+        self.engines: Dict[str, "SearchStats"] = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, phase: str, seconds: float):
+        """累加某个阶段的耗时"""
+        with self._lock:
+            self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        """统计 with 代码块的耗时"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - started)
+
+    def add_page(self, seconds: float):
+        """记录一页网络请求的耗时"""
+        with self._lock:
+            self.pages.append(seconds)
+            self.timings["network"] = self.timings.get("network", 0.0) + seconds
+
+    def incr(self, name: str, amount: int = 1):
+        """增加计数器"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @classmethod
+    def combine(cls, per_engine: Dict[str, "SearchStats"], engine: str = "multi"):
+        """把多个引擎的计量数据组合为一个（不复制，子项仍是原对象）"""
+        stats = cls(engine)
+        stats.engines = dict(per_engine)
+        return stats
+
+    def total_time(self, phase: str) -> float:
+        """某个阶段的总耗时（包括各引擎）"""
+        return self.timings.get(phase, 0.0) + sum(
+            child.total_time(phase) for child in self.engines.values()
+        )
+
+    def total_count(self, name: str) -> int:
+        """某个计数器的总数（包括各引擎）"""
+        return self.counters.get(name, 0) + sum(
+            child.total_count(name) for child in self.engines.values()
+        )
+
+    def to_dict(self) -> Dict:
+        """转换为字典格式（耗时单位为毫秒）"""
+        data = {
+            "engine": self.engine,
+            "timings_ms": {k: round(v * 1000, 3) for k, v in self.timings.items()},
+            "counters": dict(self.counters),
+        }
+        if self.pages:
+            data["pages_ms"] = [round(p * 1000, 3) for p in self.pages]
+        if self.engines:
+            data["engines"] = {k: v.to_dict() for k, v in self.engines.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SearchStats":
+        """从 to_dict() 的输出还原"""
+        stats = cls(data.get("engine", ""))
+        stats.timings = {k: v / 1000 for k, v in data.get("timings_ms", {}).items()}
+        stats.counters = dict(data.get("counters", {}))
+        stats.pages = [p / 1000 for p in data.get("pages_ms", [])]
+        stats.engines = {
+            k: cls.from_dict(v) for k, v in data.get("engines", {}).items()
+        }
+        return stats
+
+
+_current: contextvars.ContextVar[Optional[SearchStats]] = contextvars.ContextVar(
+    "mes_search_stats", default=None
+)
+
+
+def current_stats() -> Optional[SearchStats]:
+    """获取当前上下文中正在计量的搜索，没有时返回 None"""
+    return _current.get()
+
+
+@contextmanager
+def collecting(stats: SearchStats) -> Iterator[SearchStats]:
+    """在 with 代码块内把 stats 设为当前计量对象"""
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """如果有正在计量的搜索，统计 with 代码块的耗时"""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    with stats.timer(phase):
+        yield
+
+
+def count(name: str, amount: int = 1):
+    """如果有正在计量的搜索，增加计数器"""
+    stats = _current.get()
+    if stats is not None:
+        stats.incr(name, amount)
+
+
+def format_stats(stats: SearchStats) -> str:
+    """格式化为 mes search --stats 的文本输出"""
+    lines = ["📈 搜索统计:"]
+    for child in stats.engines.values() or [stats]:
+        lines.extend(_format_engine(child))
+    if stats.engines:
+        own = _format_timings(stats)
+        if own:
+            lines.append(f"    • 其它: {own}")
+    return "\n".join(lines)
+
+
+def _format_engine(stats: SearchStats) -> List[str]:
+    lines = [
+        f"    • {stats.engine or '搜索'}: {_format_timings(stats) or '无耗时记录'}"
+    ]
+    if stats.pages:
+        pages = "/".join(f"{p * 1000:.1f}" for p in stats.pages)
+        lines.append(f"      分页: {len(stats.pages)} 页 ({pages} ms)")
+    counters = [
+        f"{label} {_format_count(name, stats.counters[name])}"
+        for name, label in COUNTER_LABELS.items()
+        if stats.counters.get(name)
+    ]
+    if counters:
+        lines.append(f"      {', '.join(counters)}")
+    return lines
+
+
+def _format_timings(stats: SearchStats) -> str:
+    # 已知阶段按执行顺序排列，其它阶段排在后面
+    order = list(PHASE_LABELS)
+    phases = sorted(
+        stats.timings,
+        key=lambda p: order.index(p) if p in order else len(order),
+    )
+    return ", ".join(
+        f"{PHASE_LABELS.get(phase, phase)} {stats.timings[phase] * 1000:.1f}ms"
+        for phase in phases
+    )
+
+
+def _format_count(name: str, value: int) -> str:
+    if name in ("bytes_received", "fetch_bytes") and value >= 1024:
+        return f"{value / 1024:.1f} KB"
+    return str(value)
+
+
+class MetricsRegistry:
+    """进程内累计的搜索指标，可渲染为 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._searches: Dict[str, int] = {}
+        self._counters: Dict[Tuple[str, str], int] = {}
+        # (引擎, 阶段) -> [累计秒数, 次数]
+        self._timings: Dict[Tuple[str, str], List[float]] = {}
+        self._pages: Dict[str, List[float]] = {}
+
+    def observe(self, stats: Optional[SearchStats]):
+        """累计一次搜索的计量数据（多引擎搜索按引擎分别累计）"""
+        if stats is None:
+            return
+        with self._lock:
+            self._observe(stats)
+
+    def _observe(self, stats: SearchStats):
+        engine = stats.engine or "unknown"
+        if not stats.engines:
+            self._searches[engine] = self._searches.get(engine, 0) + 1
+        for phase, seconds in stats.timings.items():
+            entry = self._timings.setdefault((engine, phase), [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+        for name, value in stats.counters.items():
+            key = (engine, name)
+            self._counters[key] = self._counters.get(key, 0) + value
+        if stats.pages:
+            entry = self._pages.setdefault(engine, [0.0, 0])
+            entry[0] += sum(stats.pages)
+            entry[1] += len(stats.pages)
+        for child in stats.engines.values():
+            self._observe(child)
+
+    def render(self) -> str:
+        """渲染为 Prometheus 文本格式（text/plain; version=0.0.4）"""
+        with self._lock:
+            lines = [
+                "# HELP mes_searches_total Number of searches per engine.",
+                "# TYPE mes_searches_total counter",
+            ]
+            for engine, value in sorted(self._searches.items()):
+                lines.append(f'mes_searches_total{{engine="{engine}"}} {value}')
+
+            lines += [
+                "# HELP mes_phase_seconds Time spent per search phase.",
+                "# TYPE mes_phase_seconds summary",
+            ]
+            for (engine, phase), (total, n) in sorted(self._timings.items()):
+                labels = f'engine="{engine}",phase="{phase}"'
+                lines.append(f"mes_phase_seconds_sum{{{labels}}} {total:.6f}")
+                lines.append(f"mes_phase_seconds_count{{{labels}}} {n}")
+
+            lines += [
+                "# HELP mes_page_seconds Network time per result page.",
+                "# TYPE mes_page_seconds summary",
+            ]
+            for engine, (total, n) in sorted(self._pages.items()):
+                lines.append(f'mes_page_seconds_sum{{engine="{engine}"}} {total:.6f}')
+                lines.append(f'mes_page_seconds_count{{engine="{engine}"}} {n}')
+
+            for name in COUNTER_LABELS:
+                metric = f"mes_{name}_total"
+                lines += [
+                    f"# HELP {metric} Total {name.replace('_', ' ')}.",
+                    f"# TYPE {metric} counter",
+                ]
+                for (engine, counter), value in sorted(self._counters.items()):
+                    if counter == name:
+                        lines.append(f'{metric}{{engine="{engine}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def merge(self, other: "MetricsRegistry"):
+        """把另一个注册表累计的数据加到本注册表"""
+        with other._lock:
+            searches = dict(other._searches)
+            counters = dict(other._counters)
+            timings = {k: list(v) for k, v in other._timings.items()}
+            pages = {k: list(v) for k, v in other._pages.items()}
+        with self._lock:
+            for engine, value in searches.items():
+                self._searches[engine] = self._searches.get(engine, 0) + value
+            for key, value in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for target, source in ((self._timings, timings), (self._pages, pages)):
+                for key, (total, n) in source.items():
+                    entry = target.setdefault(key, [0.0, 0])
+                    entry[0] += total
+                    entry[1] += n
+
+    @classmethod
+    def parse(cls, text: str) -> "MetricsRegistry":
+        """从 render() 输出的文本还原注册表，无法识别的行被忽略"""
+        registry = cls()
+        for line in text.splitlines():
+            match = _SAMPLE.match(line)
+            if match is None:
+                continue
+            name, labels, value = match.groups()
+            labels = dict(_LABEL.findall(labels))
+            engine = labels.get("engine")
+            try:
+                number = float(value)
+            except ValueError:
+                continue
+            if engine is None:
+                continue
+            if name == "mes_searches_total":
+                registry._searches[engine] = int(number)
+            elif name.startswith("mes_phase_seconds_") and "phase" in labels:
+                entry = registry._timings.setdefault(
+                    (engine, labels["phase"]), [0.0, 0]
+                )
+                entry[0 if name.endswith("_sum") else 1] = number
+            elif name.startswith("mes_page_seconds_"):
+                entry = registry._pages.setdefault(engine, [0.0, 0])
+                entry[0 if name.endswith("_sum") else 1] = number
+            elif name.startswith("mes_") and name.endswith("_total"):
+                counter = name[len("mes_") : -len("_total")]
+                if counter in COUNTER_LABELS:
+                    registry._counters[(engine, counter)] = int(number)
+        for entries in (registry._timings, registry._pages):
+            for entry in entries.values():
+                entry[1] = int(entry[1])
+        return registry
+
+    def write(self, path: str, accumulate: bool = False):
+        """原子地写入 Prometheus 文本文件（可供 node_exporter 的 textfile 收集器读取）
+
+        accumulate 为 True 时先读取文件中已有的数据再加上本注册表的数据，
+        使 *_total 计数器在多次运行 mes 之间单调递增；读取和写入在文件锁内进行，
+        同时运行的多个 mes 进程不会互相覆盖。
+        """
+        from ._fileutil import locked, write_atomic
+
+        with locked(path + ".lock" if accumulate else None):
+            registry = self
+            if accumulate:
+                registry = MetricsRegistry()
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        registry = MetricsRegistry.parse(f.read())
+                except FileNotFoundError:
+                    pass
+                registry.merge(self)
+
+            write_atomic(path, registry.render())
+
+
+# render() 输出中的一行样本：指标名{标签} 值
+_SAMPLE = re.compile(r"^(\w+)\{([^}]*)\}\s+(\S+)$")
+_LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+# 进程内共享的默认指标注册表
+REGISTRY = MetricsRegistry()
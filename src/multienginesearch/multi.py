@@ -0,0 +1,259 @@
+"""
+多引擎并发搜索
+
+将同一个查询同时分发给多个搜索引擎，在有界线程池中并发执行，
+并把各引擎的结果去重、融合排序后合并成一个 SearchResponse。
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .engines import (
+    SearchEngine,
+    SearchEngineFactory,
+    SearchError,
+    SearchResponse,
+    offset_kwargs,
+)
+from .merge import fuse_results
+from .metrics import SearchStats
+
+# 线程池最大并发数
+MAX_WORKERS = 8
+
+# 单个引擎的默认超时时间（秒）
+DEFAULT_ENGINE_TIMEOUT = 30.0
+
+# 批量搜索的默认并发数
+DEFAULT_CONCURRENCY = 4
+
+# 批量搜索在线程模式下允许的最大并发数
+MAX_THREAD_CONCURRENCY = 64
+
+
+def submit_daemon(
+    fn: Callable[..., Any],
+    *args: Any,
+    slots: Optional[threading.BoundedSemaphore] = None,
+    name: str = "mes-engine",
+) -> "Future[Any]":
+    """在守护线程中执行 fn(*args)，返回它的 Future
+
+    解释器退出时会等待 ThreadPoolExecutor 的工作线程结束，超时后被丢弃的请求
+    仍会让进程多活到请求返回为止；守护线程不会被等待，因此 --timeout 和 --deadline
+    同样限制了整个命令的运行时间。指定 slots 时同时运行的线程数不超过其容量。
+    """
+    future: "Future[Any]" = Future()
+
+    def target():
+        # 先等到空位再标记为运行中，排队期间的 Future 仍可被取消
+        if slots is not None:
+            slots.acquire()
+        try:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+        finally:
+            if slots is not None:
+                slots.release()
+
+    threading.Thread(target=target, name=name, daemon=True).start()
+    return future
+
+
+def parse_engine_names(spec: Optional[str], default: str = "duckduckgo") -> List[str]:
+    """解析 --engine 参数
+
+    支持逗号分隔的多个引擎（如 "google,duckduckgo"）以及 "all" 别名。
+    重复的引擎名只保留第一次出现的位置。
+
+    Args:
+        spec: 命令行传入的引擎参数
+        default: 未指定时使用的默认引擎
+
+    Returns:
+        List[str]: 小写的引擎名称列表
+    """
+    if not spec:
+        return [default]
+
+    names: List[str] = []
+    for part in spec.split(","):
+        name = part.strip().lower()
+        if not name:
+            continue
+        if name == "all":
+            candidates = SearchEngineFactory.get_available_engines()
+        else:
+            candidates = [name]
+        for candidate in candidates:
+            if candidate not in names:
+                names.append(candidate)
+
+    return names or [default]
+
+
+def multi_search(
+    engines: Sequence[SearchEngine],
+    query: str,
+    limit: int = 10,
+    time_filter: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = DEFAULT_ENGINE_TIMEOUT,
+    weights: Optional[Dict[str, float]] = None,
+    fuse: bool = True,
+    offset: int = 0,
+) -> SearchResponse:
+    """并发执行多引擎搜索并合并结果
+
+    每个引擎的 search() 在线程池中并发运行，总耗时取决于最慢的引擎，
+    而不是所有引擎耗时之和。超过 timeout 仍未返回的引擎会被标记为超时，
+    其结果被丢弃。
+
+    Args:
+        engines: 搜索引擎实例列表
+        query: 搜索查询字符串
+        limit: 每个引擎返回结果数量限制
+        time_filter: 时间筛选参数 (d=一天, w=一周, m=一月, y=一年)
+        max_workers: 线程池大小，默认为引擎数量（不超过 MAX_WORKERS）
+        timeout: 每个引擎的超时时间（秒），None 表示不限制
+        weights: 融合排序时各引擎的权重，默认均为 1
+        fuse: 为 False 时不去重，按引擎顺序直接拼接结果
+        offset: 每个引擎跳过排名最前的多少条结果（与 limit 一样按引擎计算）
+
+    Returns:
+        SearchResponse: 合并后的响应，engine_meta 中包含每个引擎的元数据
+    """
+    if not engines:
+        return SearchResponse([])
+
+    workers = max_workers or min(len(engines), MAX_WORKERS)
+    started = time.monotonic()
+    deadline = started + timeout if timeout is not None else None
+
+    def run(engine: SearchEngine):
+        engine_started = time.monotonic()
+        response = engine.search(
+            query, limit, time_filter=time_filter, **offset_kwargs(offset)
+        )
+        return response, time.monotonic() - engine_started
+
+    responses: Dict[int, SearchResponse] = {}
+    meta: Dict[int, Dict[str, Any]] = {}
+
+    # 引擎在守护线程中运行，超时的引擎不会阻止进程退出
+    slots = threading.BoundedSemaphore(workers)
+    futures = {
+        submit_daemon(run, engine, slots=slots): i for i, engine in enumerate(engines)
+    }
+    try:
+        pending = set(futures)
+        while pending:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+            done, pending = wait(
+                pending, timeout=remaining, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                index = futures[future]
+                try:
+                    response, elapsed = future.result()
+                except Exception as e:
+                    meta[index] = {
+                        "count": 0,
+                        "elapsed": time.monotonic() - started,
+                        "error": str(e),
+                    }
+                    continue
+                responses[index] = response
+                meta[index] = {"count": len(response.results), "elapsed": elapsed}
+                if response.error is not None:
+                    meta[index]["error"] = response.error.message
+                    meta[index]["error_kind"] = response.error.kind
+                if response.rate_limit_info:
+                    meta[index]["rate_limit"] = response.rate_limit_info
+
+        # 超时的引擎：结果直接丢弃，不等待其线程结束
+        for future in pending:
+            future.cancel()
+            meta[futures[future]] = {
+                "count": 0,
+                "elapsed": time.monotonic() - started,
+                "timed_out": True,
+            }
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return merge_responses(engines, responses, meta, weights, fuse)
+
+
+def merge_responses(
+    engines: Sequence[SearchEngine],
+    responses: Dict[int, SearchResponse],
+    meta: Dict[int, Dict[str, Any]],
+    weights: Optional[Dict[str, float]] = None,
+    fuse: bool = True,
+) -> SearchResponse:
+    """合并各引擎的结果
+
+    默认按规范化 URL 去重并用倒数排名融合排序（见 merge.fuse_results）；
+    fuse 为 False 时按引擎传入顺序直接拼接。
+
+    Args:
+        engines: 搜索引擎实例列表
+        responses: 按引擎下标索引的成功响应
+        meta: 按引擎下标索引的元数据，每个引擎都必须有一项
+        weights: 融合排序时各引擎的权重
+        fuse: 是否去重并融合排序
+    """
+    merge_started = time.perf_counter()
+    ranked_lists = []
+    rate_limit_info = None
+    errors: List[SearchError] = []
+    per_engine: Dict[str, SearchStats] = {}
+    for i, engine in enumerate(engines):
+        response = responses.get(i)
+        stats = response.stats if response is not None else None
+        if stats is None:
+            stats = SearchStats(engine.name)
+            # 抛出异常或超时的引擎没有计量数据，只记一次错误
+            if response is None:
+                stats.incr("errors")
+        per_engine[engine.name] = stats
+        if response is None:
+            error = meta[i].get("error")
+            if meta[i].get("timed_out"):
+                errors.append(
+                    SearchError(engine.name, "timeout", "超过超时时间仍未返回")
+                )
+            elif error is not None:
+                errors.append(SearchError(engine.name, "unknown", str(error)))
+            continue
+        if response.error is not None:
+            errors.append(response.error)
+        ranked_lists.append(response.results)
+        if response.rate_limit_info and rate_limit_info is None:
+            rate_limit_info = response.rate_limit_info
+
+    if fuse:
+        results = fuse_results(ranked_lists, weights)
+    else:
+        results = [result for ranked in ranked_lists for result in ranked]
+
+    engine_meta = {engine.name: meta[i] for i, engine in enumerate(engines)}
+    stats = SearchStats.combine(per_engine)
+    stats.add_time("merge", time.perf_counter() - merge_started)
+    # 所有引擎都失败时，以第一个引擎的错误作为整体的错误
+    error = errors[0] if len(errors) == len(engines) else None
+    return SearchResponse(results, rate_limit_info, engine_meta, stats, error)
@@ -0,0 +1,102 @@
+"""
+分页续取令牌
+
+search_page() 返回一页结果和指向下一页的令牌，把令牌传回 search_page() 即可继续向后翻页。
+令牌中记录了引擎、查询、时间筛选和下一页的位置，调用方无需自己保存这些参数。
+配合 CachedSearchEngine 使用时，已经取过的结果直接从缓存读取，每次只请求新的一页。
+"""
+
+import base64
+import json
+from typing import Optional, Tuple
+
+from .engines import SearchEngine, SearchResponse, offset_kwargs
+
+# 令牌格式版本，格式变化后旧令牌会被拒绝
+TOKEN_VERSION = 1
+
+
+class PageToken:
+    """某个查询下一页结果的位置"""
+
+    __slots__ = ("engine", "query", "offset", "time_filter")
+
+    def __init__(
+        self, engine: str, query: str, offset: int, time_filter: Optional[str] = None
+    ):
+        self.engine = engine
+        self.query = query
+        self.offset = offset
+        self.time_filter = time_filter
+
+    def encode(self) -> str:
+        """编码为可放在 URL 或命令行参数中的字符串"""
+        raw = json.dumps(
+            [TOKEN_VERSION, self.engine, self.query, self.offset, self.time_filter],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "PageToken":
+        """从 encode() 的输出还原
+
+        Raises:
+            ValueError: 令牌格式错误或版本不符
+        """
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode("ascii"))
+            version, engine, query, offset, time_filter = json.loads(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"无效的分页令牌: {token}")
+        if (
+            version != TOKEN_VERSION
+            or not isinstance(engine, str)
+            or not isinstance(query, str)
+            or not isinstance(offset, int)
+            or offset < 0
+        ):
+            raise ValueError(f"无效的分页令牌: {token}")
+        return cls(engine, query, offset, time_filter)
+
+
+def search_page(
+    engine: SearchEngine,
+    query: Optional[str] = None,
+    limit: int = 10,
+    time_filter: Optional[str] = None,
+    token: Optional[str] = None,
+) -> Tuple[SearchResponse, Optional[str]]:
+    """搜索一页结果
+
+    第一页传入 query（和 time_filter），之后传入上一页返回的令牌，
+    此时查询和时间筛选以令牌中的为准。
+
+    Returns:
+        Tuple[SearchResponse, Optional[str]]: (本页的响应, 下一页的令牌)；
+        出错或引擎已没有更多结果时令牌为 None
+
+    Raises:
+        ValueError: 令牌无效或属于其它引擎，或者 query 和 token 都没有提供
+    """
+    if token is not None:
+        page = PageToken.decode(token)
+        if page.engine != engine.name:
+            raise ValueError(f"分页令牌属于引擎 {page.engine}，不能用于 {engine.name}")
+    elif query is not None:
+        page = PageToken(engine.name, query, 0, time_filter)
+    else:
+        raise ValueError("必须提供 query 或 token")
+
+    response = engine.search(
+        page.query, limit, time_filter=page.time_filter, **offset_kwargs(page.offset)
+    )
+    # 返回的结果不满一页，说明没有下一页了
+    if response.error is not None or len(response.results) < limit:
+        return response, None
+    next_page = PageToken(
+        page.engine, page.query, page.offset + len(response.results), page.time_filter
+    )
+    return response, next_page.encode()
@@ -0,0 +1,424 @@
+"""
+Google API 配额持久化存储
+
+配额计数保存在 JSON 文件中（默认 ~/.mes_google_quota.json），
+多个 mes 进程和线程可以同时安全地读写：
+
+- 写入通过 fcntl 文件锁串行化，并以“临时文件 + 重命名”的方式原子替换；
+- 采用先预占再确认（reserve-then-commit）的方式：发送请求前先原子地占用配额，
+  请求未被计费（如失败）时再退还，因此并发请求不会超出每日限额；
+- 只读操作（查询剩余配额）不会写文件。
+
+CredentialPool 管理多组 API 密钥/搜索引擎 ID，每个密钥有各自的配额文件和每日限额，
+请求时选择剩余配额最多的密钥（或轮询），某个密钥用完或被拒绝时切换到下一个。
+被拒绝的日期同样记在配额文件中，之后运行的 mes 当天也不再使用该密钥。
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+import pytz
+
+from ._fileutil import locked, write_atomic
+
+# Google API 配额重置所用的时区
+QUOTA_TIMEZONE = "US/Pacific"
+
+
+def pacific_now() -> datetime:
+    """获取太平洋时间（Google API 配额重置时区）"""
+    return datetime.now(pytz.timezone(QUOTA_TIMEZONE))
+
+
+def next_reset_time() -> datetime:
+    """获取下次配额重置时间（太平洋时间的明天午夜）"""
+    return (pacific_now() + timedelta(days=1)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+class QuotaExceededError(Exception):
+    """已达到每日配额限制"""
+
+
+class Reservation:
+    """一次配额预占
+
+    预占时配额已经计入；请求被计费时调用 commit()，
+    未被计费（例如请求失败）时调用 cancel() 退还。
+    """
+
+    def __init__(self, store: "QuotaStore", date: str, count: int):
+        self.store = store
+        self.date = date
+        self.count = count
+        self.settled = False
+
+    def commit(self):
+        """确认配额已被使用"""
+        self.settled = True
+
+    def cancel(self):
+        """退还未被使用的配额"""
+        if not self.settled:
+            self.settled = True
+            self.store._refund(self)
+
+
+class QuotaStore:
+    """跨进程、线程安全的每日配额计数器"""
+
+    # 进程内共享的线程锁（按文件路径），fcntl 锁只在进程之间生效
+    _thread_locks: Dict[str, threading.Lock] = {}
+    _thread_locks_guard = threading.Lock()
+
+    def __init__(self, path: Optional[Path] = None, daily_limit: int = 100):
+        """
+        Args:
+            path: 配额文件路径，默认 ~/.mes_google_quota.json
+            daily_limit: 每日请求限额
+        """
+        self.path = Path(path) if path else Path.home() / ".mes_google_quota.json"
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.daily_limit = daily_limit
+
+        with self._thread_locks_guard:
+            key = str(self.path.resolve())
+            self._thread_lock = self._thread_locks.setdefault(key, threading.Lock())
+
+    def _default(self, today: str) -> Dict[str, Any]:
+        return {
+            "date": today,
+            "requests_used": 0,
+            "daily_limit": self.daily_limit,
+            "reset_time": next_reset_time().isoformat(),
+            "timezone": QUOTA_TIMEZONE,
+        }
+
+    def _read(self) -> Dict[str, Any]:
+        """读取当天的配额数据；文件不存在、损坏或已过期时返回新一天的默认值"""
+        today = pacific_now().date().isoformat()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("date") != today or not isinstance(
+                data.get("requests_used"), int
+            ):
+                return self._default(today)
+        except (OSError, ValueError, AttributeError):
+            return self._default(today)
+
+        data["daily_limit"] = self.daily_limit
+        data["reset_time"] = next_reset_time().isoformat()
+        data["timezone"] = QUOTA_TIMEZONE
+        return data
+
+    def _write(self, data: Dict[str, Any]):
+        """原子地写入配额文件：先写临时文件，再重命名覆盖"""
+        write_atomic(self.path, json.dumps(data, ensure_ascii=False))
+
+    def _locked(self):
+        """获取进程内线程锁和跨进程文件锁"""
+        return locked(self.lock_path, self._thread_lock)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """读取当前配额数据（只读，不写文件）"""
+        return self._read()
+
+    def is_disabled(self) -> bool:
+        """当天是否已被停用（只读）"""
+        data = self._read()
+        return data.get("disabled_on") == data["date"]
+
+    def disable(self):
+        """记录当天停用，配额重置后自动恢复"""
+        with self._locked():
+            data = self._read()
+            data["disabled_on"] = data["date"]
+            try:
+                self._write(data)
+            except OSError:
+                pass
+
+    def reserve(self, count: int = 1) -> Reservation:
+        """原子地预占配额
+
+        Raises:
+            QuotaExceededError: 剩余配额不足
+        """
+        with self._locked():
+            data = self._read()
+            if data["requests_used"] + count > self.daily_limit:
+                raise QuotaExceededError(
+                    f"Google API 配额已达到每日限制 {self.daily_limit} 次。"
+                    f"将在 {data['reset_time']} 重置。"
+                )
+            data["requests_used"] += count
+            try:
+                self._write(data)
+            except OSError:
+                # 保存失败时仍允许请求，与以前只在内存中计数的行为一致
+                pass
+        return Reservation(self, data["date"], count)
+
+    def _refund(self, reservation: Reservation):
+        """退还预占的配额（跨天后不再退还）"""
+        with self._locked():
+            data = self._read()
+            if data["date"] != reservation.date:
+                return
+            data["requests_used"] = max(0, data["requests_used"] - reservation.count)
+            try:
+                self._write(data)
+            except OSError:
+                pass
+
+
+# 密钥选择策略
+KEY_STRATEGIES = ("most_remaining", "round_robin")
+
+# 默认的密钥池配置文件
+DEFAULT_KEYS_FILE = "~/.mes_google_keys.json"
+
+
+class GoogleCredential:
+    """一组 Google API 密钥和搜索引擎 ID，带有各自的配额计数"""
+
+    def __init__(
+        self,
+        api_key: str,
+        search_engine_id: str,
+        store: QuotaStore,
+        label: Optional[str] = None,
+    ):
+        self.api_key = api_key
+        self.search_engine_id = search_engine_id
+        self.store = store
+        # 显示名称，默认只显示密钥的末尾几位
+        self.label = label or f"...{api_key[-4:]}"
+        # 被 Google 拒绝（403）的日期，当天不再使用；同时记在配额文件中
+        self.disabled_on: Optional[str] = None
+
+    @property
+    def daily_limit(self) -> int:
+        return self.store.daily_limit
+
+    def is_disabled(self) -> bool:
+        if self.disabled_on == pacific_now().date().isoformat():
+            return True
+        return self.store.is_disabled()
+
+
+class CredentialPool:
+    """多个 Google API 密钥组成的密钥池，线程安全"""
+
+    def __init__(
+        self, credentials: List[GoogleCredential], strategy: str = "most_remaining"
+    ):
+        """
+        Args:
+            credentials: 密钥列表，至少一个
+            strategy: 选择策略，most_remaining（剩余配额最多）或 round_robin（轮询）
+        """
+        if not credentials:
+            raise ValueError("密钥池至少需要一个 API 密钥")
+        if strategy not in KEY_STRATEGIES:
+            raise ValueError(
+                f"无效的密钥选择策略: {strategy}，可选: {', '.join(KEY_STRATEGIES)}"
+            )
+        self.credentials = credentials
+        self.strategy = strategy
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    @property
+    def primary(self) -> GoogleCredential:
+        return self.credentials[0]
+
+    def _candidates(
+        self, exclude: Collection[GoogleCredential]
+    ) -> List[GoogleCredential]:
+        """按选择策略排列当前可用的密钥"""
+        if self.strategy == "round_robin":
+            with self._lock:
+                start = self._next
+                self._next = (self._next + 1) % len(self.credentials)
+            ordered = self.credentials[start:] + self.credentials[:start]
+        else:
+            ordered = sorted(
+                self.credentials,
+                key=lambda c: c.daily_limit - c.store.snapshot()["requests_used"],
+                reverse=True,
+            )
+        return [c for c in ordered if c not in exclude and not c.is_disabled()]
+
+    def has_available(self, exclude: Collection[GoogleCredential] = ()) -> bool:
+        """除 exclude 外是否还有未被禁用的密钥"""
+        return any(c not in exclude and not c.is_disabled() for c in self.credentials)
+
+    def reserve(
+        self, exclude: Collection[GoogleCredential] = ()
+    ) -> Tuple[GoogleCredential, Reservation]:
+        """选择一个密钥并预占一次配额，配额用完的密钥自动跳过
+
+        Raises:
+            QuotaExceededError: 所有可用密钥的配额都已用完
+        """
+        error = None
+        for credential in self._candidates(exclude):
+            try:
+                return credential, credential.store.reserve()
+            except QuotaExceededError as e:
+                error = e
+        if len(self.credentials) == 1 and error is not None:
+            raise error
+        raise QuotaExceededError(
+            f"Google API 密钥池的 {len(self.credentials)} 个密钥均已达到每日限制"
+            f"或不可用。将在 {next_reset_time().isoformat()} 重置。"
+        )
+
+    def disable(self, credential: GoogleCredential):
+        """当天停用被 Google 拒绝的密钥（配额重置后恢复）"""
+        credential.disabled_on = pacific_now().date().isoformat()
+        credential.store.disable()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """读取所有密钥的配额数据（只读），返回合计值和每个密钥的用量"""
+        keys = []
+        for credential in self.credentials:
+            data = credential.store.snapshot()
+            keys.append(
+                {
+                    "label": credential.label,
+                    "daily_limit": data["daily_limit"],
+                    "requests_used": data["requests_used"],
+                    "disabled": credential.is_disabled(),
+                }
+            )
+        return {
+            "daily_limit": sum(k["daily_limit"] for k in keys),
+            "requests_used": sum(k["requests_used"] for k in keys),
+            "keys": keys,
+        }
+
+
+def _quota_path(api_key: str) -> Path:
+    """密钥的配额文件路径，按密钥摘要区分
+
+    MES_GOOGLE_API_KEY 沿用原来的 ~/.mes_google_quota.json，
+    与密钥在密钥池中的位置无关，增减其它密钥不会让计数串到别的密钥上。
+    """
+    if api_key == os.getenv("MES_GOOGLE_API_KEY"):
+        return Path.home() / ".mes_google_quota.json"
+    digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+    return Path.home() / f".mes_google_quota.{digest}.json"
+
+
+def _read_keys_file(path: Path) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """读取密钥池配置文件，返回 (密钥条目, 选择策略)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"无法读取 Google 密钥池配置 {path}: {e}")
+
+    strategy = None
+    if isinstance(data, dict):
+        strategy = data.get("strategy")
+        data = data.get("keys", [])
+    if not isinstance(data, list):
+        raise ValueError(f"Google 密钥池配置格式错误: {path}")
+
+    entries = []
+    for i, item in enumerate(data, 1):
+        if not isinstance(item, dict) or not item.get("api_key"):
+            raise ValueError(f"Google 密钥池配置第 {i} 项缺少 api_key: {path}")
+        limit = item.get("daily_limit")
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise ValueError(f"Google 密钥池配置第 {i} 项的 daily_limit 无效: {limit}")
+        entries.append(item)
+    return entries, strategy
+
+
+def load_credential_pool(daily_limit: int = 100) -> Optional[CredentialPool]:
+    """从环境变量和配置文件加载 Google API 密钥池，没有配置任何密钥时返回 None
+
+    密钥来源（按顺序，重复的密钥只保留第一个）：
+
+    - MES_GOOGLE_API_KEY / MES_GOOGLE_SEARCH_ENGINE_ID
+    - MES_GOOGLE_API_KEY_<N> / MES_GOOGLE_SEARCH_ENGINE_ID_<N>（未设置时沿用不带编号的 ID）
+    - MES_GOOGLE_KEYS_FILE 指定的 JSON 文件（默认 ~/.mes_google_keys.json），格式为
+      {"strategy": "round_robin", "keys": [{"api_key": ..., "search_engine_id": ...,
+      "daily_limit": 100, "label": ...}]}，也可以直接是 keys 列表
+
+    选择策略可通过 MES_GOOGLE_KEY_STRATEGY 覆盖配置文件中的设置。
+
+    Args:
+        daily_limit: 未单独配置限额的密钥使用的每日限额
+
+    Raises:
+        ValueError: 配置文件或选择策略无效
+    """
+    default_cx = os.getenv("MES_GOOGLE_SEARCH_ENGINE_ID")
+    entries: List[Dict[str, Any]] = []
+    if os.getenv("MES_GOOGLE_API_KEY") and default_cx:
+        entries.append(
+            {"api_key": os.getenv("MES_GOOGLE_API_KEY"), "search_engine_id": default_cx}
+        )
+
+    numbered = []
+    for name, value in os.environ.items():
+        match = re.fullmatch(r"MES_GOOGLE_API_KEY_(\d+)", name)
+        if match and value:
+            numbered.append((int(match.group(1)), value))
+    for index, api_key in sorted(numbered):
+        cx = os.getenv(f"MES_GOOGLE_SEARCH_ENGINE_ID_{index}") or default_cx
+        if cx:
+            entries.append({"api_key": api_key, "search_engine_id": cx})
+
+    strategy = None
+    keys_file = Path(
+        os.path.expanduser(os.getenv("MES_GOOGLE_KEYS_FILE") or DEFAULT_KEYS_FILE)
+    )
+    if os.getenv("MES_GOOGLE_KEYS_FILE") or keys_file.exists():
+        file_entries, strategy = _read_keys_file(keys_file)
+        for item in file_entries:
+            item.setdefault("search_engine_id", default_cx)
+            if not item["search_engine_id"]:
+                raise ValueError(
+                    f"Google 密钥池配置中的密钥 ...{item['api_key'][-4:]} "
+                    "缺少 search_engine_id"
+                )
+        entries.extend(file_entries)
+
+    credentials: List[GoogleCredential] = []
+    seen = set()
+    for item in entries:
+        key = (item["api_key"], item["search_engine_id"])
+        if key in seen:
+            continue
+        seen.add(key)
+        limit = item.get("daily_limit")
+        store = QuotaStore(
+            _quota_path(item["api_key"]),
+            daily_limit if limit is None else limit,
+        )
+        credentials.append(
+            GoogleCredential(
+                item["api_key"], item["search_engine_id"], store, item.get("label")
+            )
+        )
+
+    if not credentials:
+        return None
+    strategy = os.getenv("MES_GOOGLE_KEY_STRATEGY") or strategy or "most_remaining"
+    return CredentialPool(credentials, strategy)
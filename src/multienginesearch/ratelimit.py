@@ -0,0 +1,329 @@
+"""
+客户端请求限速
+
+每个引擎一个令牌桶限速器，在线程之间（可选地在进程之间）共享，
+并根据搜索的计量数据中的限流信号（HTTP 429、DDGS 限流异常）自适应调整速率。
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from . import metrics
+from ._fileutil import locked, write_atomic
+from .engines import (
+    SearchEngine,
+    SearchError,
+    SearchResponse,
+    SearchResult,
+    offset_kwargs,
+)
+
+
+def parse_rate_limits(spec: Optional[str]) -> Dict[str, float]:
+    """解析 "google=1,duckduckgo=0.5" 形式的每引擎速率（次/秒）
+
+    Raises:
+        ValueError: 格式错误或速率不是正数
+    """
+    limits: Dict[str, float] = {}
+    if not spec:
+        return limits
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"无效的速率设置: {part}（应为 引擎=次数每秒）")
+        rate = float(value)
+        if rate <= 0:
+            raise ValueError(f"速率必须大于 0: {part}")
+        limits[name.strip().lower()] = rate
+    return limits
+
+
+# 遇到限流时速率乘以的系数
+DEFAULT_DECREASE = 0.5
+
+# 每次成功请求恢复的速率（占配置速率的比例）
+DEFAULT_INCREASE = 0.05
+
+# 自适应调整时速率下限（占配置速率的比例）
+DEFAULT_MIN_RATIO = 1 / 16
+
+
+class SharedRateState:
+    """保存在 JSON 文件中的限速器状态（默认 ~/.mes_ratelimit.json）
+
+    多个 mes 进程使用同一个文件时共同遵守同一个速率，某个进程遇到限流后
+    降低的速率对其它进程同样生效。读写通过 fcntl 文件锁串行化，
+    并以“临时文件 + 重命名”的方式原子替换。熔断器（breaker.py）也用它保存状态。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: 状态文件路径，默认为环境变量 MES_RATELIMIT_PATH 或 ~/.mes_ratelimit.json
+        """
+        if path is None:
+            path = (
+                os.getenv("MES_RATELIMIT_PATH") or Path.home() / ".mes_ratelimit.json"
+            )
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._thread_lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def update(
+        self, key: str, default: Dict[str, float], fn: Callable[[Dict[str, float]], Any]
+    ) -> Any:
+        """在锁内读取 key 的状态（不存在或损坏时使用 default），调用 fn 修改后写回"""
+        with locked(self.lock_path, self._thread_lock):
+            data = self._read()
+            state = data.get(key)
+            if not isinstance(state, dict) or not all(
+                isinstance(state.get(k), (int, float)) for k in default
+            ):
+                state = dict(default)
+            before = data.get(key)
+            if isinstance(before, dict):
+                before = dict(before)
+            result = fn(state)
+            # 只读的调用（状态没有变化）不写文件
+            if state == before:
+                return result
+            data[key] = state
+            try:
+                write_atomic(self.path, json.dumps(data))
+            except OSError:
+                # 写入失败时本次仍按计算结果放行
+                pass
+        return result
+
+
+class RateLimiter:
+    """令牌桶限速器，线程安全，可根据限流信号自适应调整速率
+
+    桶中最多 burst 个令牌，按当前速率持续补充，每个 HTTP 请求消耗一个令牌；
+    令牌不足时等待。启用 adaptive 时采用加性增、乘性减（AIMD）：
+    遇到限流调用 penalize() 将速率乘以 decrease（不低于下限），
+    之后每次成功请求调用 reward() 恢复配置速率的 increase 倍，直到回到配置速率。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 1.0,
+        adaptive: bool = True,
+        min_rate: Optional[float] = None,
+        decrease: float = DEFAULT_DECREASE,
+        increase: float = DEFAULT_INCREASE,
+        shared: Optional[SharedRateState] = None,
+        key: str = "default",
+    ):
+        """
+        Args:
+            rate: 每秒允许的请求数（也是自适应调整的上限）
+            burst: 令牌桶容量，即空闲后允许连续发出的请求数
+            adaptive: 是否根据 penalize()/reward() 调整速率
+            min_rate: 自适应调整的速率下限，默认为 rate 的 1/16
+            decrease: 遇到限流时速率乘以的系数
+            increase: 每次成功请求恢复的速率占 rate 的比例
+            shared: 跨进程共享的状态文件，None 表示只在进程内共享
+            key: 在共享状态文件中的名称（通常为引擎名）
+        """
+        self.max_rate = rate
+        self.burst = max(1.0, burst)
+        self.adaptive = adaptive
+        self.min_rate = min(rate, min_rate or rate * DEFAULT_MIN_RATIO)
+        self.decrease = decrease
+        self.increase = increase
+        self.shared = shared
+        self.key = key
+
+        # 跨进程共享时使用墙上时钟，否则使用单调时钟
+        self._clock = time.time if shared is not None else time.monotonic
+        self._state = self._initial_state()
+        self._lock = threading.Lock()
+
+    def _initial_state(self) -> Dict[str, float]:
+        return {"tokens": self.burst, "updated": self._clock(), "rate": self.max_rate}
+
+    def _update(self, fn: Callable[[Dict[str, float]], Any]) -> Any:
+        """在锁内修改状态（进程内或共享文件）"""
+        if self.shared is not None:
+            return self.shared.update(self.key, self._initial_state(), fn)
+        with self._lock:
+            return fn(self._state)
+
+    @property
+    def rate(self) -> float:
+        """当前速率（每秒请求数）"""
+        return self._update(lambda state: state["rate"])
+
+    @property
+    def interval(self) -> float:
+        """按当前速率两个请求之间的最小间隔（秒）"""
+        return 1.0 / self.rate
+
+    def _take(self, state: Dict[str, float]) -> float:
+        """补充令牌并取走一个，返回需要等待的秒数
+
+        令牌可以为负，表示已经预约了未来的放行时间点。
+        """
+        now = self._clock()
+        elapsed = max(0.0, now - state["updated"])
+        state["tokens"] = min(self.burst, state["tokens"] + elapsed * state["rate"])
+        state["updated"] = now
+        state["tokens"] -= 1
+        if state["tokens"] >= 0:
+            return 0.0
+        return -state["tokens"] / state["rate"]
+
+    def _reserve(self) -> float:
+        """占用下一个令牌，返回需要等待的秒数"""
+        return self._update(self._take)
+
+    def acquire(self) -> float:
+        """阻塞直到允许发出下一个请求，返回等待的秒数"""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self) -> float:
+        """acquire() 的异步版本，等待期间不阻塞事件循环"""
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self):
+        """遇到限流：降低速率"""
+        if not self.adaptive:
+            return
+
+        def decrease(state):
+            state["rate"] = max(self.min_rate, state["rate"] * self.decrease)
+
+        self._update(decrease)
+
+    def reward(self):
+        """请求成功：逐步恢复速率"""
+        if not self.adaptive:
+            return
+
+        def increase(state):
+            if state["rate"] < self.max_rate:
+                state["rate"] = min(
+                    self.max_rate, state["rate"] + self.max_rate * self.increase
+                )
+
+        self._update(increase)
+
+
+class RateLimitedSearchEngine(SearchEngine):
+    """经过限速器调用被包装引擎的包装器
+
+    支持逐请求限速的引擎（见 SearchEngine.use_rate_limiter()，如 Google）
+    在每个 HTTP 请求及其重试发出之前各取一个令牌；其它引擎每次搜索之前取一个令牌。
+    根据响应的计量数据反馈限速器：遇到限流（throttled 计数）时降低速率，
+    没有错误的搜索逐步恢复速率。限速等待的时间记为 ratelimit 阶段。
+    """
+
+    def __init__(self, engine: SearchEngine, limiter: RateLimiter):
+        self.engine = engine
+        self.limiter = limiter
+        # 引擎自行逐请求取令牌时，包装器不再在搜索之前取令牌
+        self._per_request = engine.use_rate_limiter(limiter)
+
+    @property
+    def name(self) -> str:
+        return self.engine.name
+
+    def cache_params(self) -> Dict[str, Any]:
+        return self.engine.cache_params()
+
+    def resumes_at_offset(self) -> bool:
+        return self.engine.resumes_at_offset()
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        waited = 0.0 if self._per_request else self.limiter.acquire()
+        response = self.engine.search(
+            query, limit, time_filter=time_filter, **offset_kwargs(offset)
+        )
+        return self._feedback(response, waited)
+
+    async def asearch(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> SearchResponse:
+        waited = 0.0 if self._per_request else await self.limiter.aacquire()
+        response = await self.engine.asearch(
+            query, limit, time_filter=time_filter, **offset_kwargs(offset)
+        )
+        return self._feedback(response, waited)
+
+    def iter_search(
+        self,
+        query: str,
+        limit: int = 10,
+        time_filter: Optional[str] = None,
+        offset: int = 0,
+    ) -> Iterator[SearchResult]:
+        waited = 0.0 if self._per_request else self.limiter.acquire()
+        # 流式搜索没有响应对象，只能根据调用方正在计量的数据判断
+        stats = metrics.current_stats()
+        if stats is not None:
+            if waited:
+                stats.add_time("ratelimit", waited)
+            throttled = stats.total_count("throttled")
+            errors = stats.total_count("errors")
+        try:
+            yield from self.engine.iter_search(
+                query, limit, time_filter=time_filter, **offset_kwargs(offset)
+            )
+        except SearchError as e:
+            # 流式搜索的错误以异常抛出，不经过计量数据
+            if e.kind == "throttled":
+                self.limiter.penalize()
+            raise
+        if stats is None:
+            return
+        if stats.total_count("throttled") > throttled:
+            self.limiter.penalize()
+        elif stats.total_count("errors") == errors:
+            self.limiter.reward()
+
+    def _feedback(self, response: SearchResponse, waited: float) -> SearchResponse:
+        stats = response.stats
+        if stats is None:
+            return response
+        if not self._per_request:
+            stats.add_time("ratelimit", waited)
+        if stats.total_count("throttled"):
+            self.limiter.penalize()
+        elif not stats.total_count("errors"):
+            self.limiter.reward()
+        return response
@@ -0,0 +1,222 @@
+"""
+保存搜索报告
+
+mes save 在同一进程中并发执行一个或多个查询，把结果写成 Markdown、JSONL 或 CSV 报告。
+Markdown 报告沿用 examples/mesobs.sh 的模板（标题、搜索时间、引擎、时间筛选和
+simple 格式的结果），文件名同样为 search_时间戳_关键词_引擎_时间筛选.md。
+
+每份报告先在内存中完整生成，再一次写入同目录下的临时文件并重命名为目标文件，
+搜索失败或写入中断时不会留下写了一半的报告。
+"""
+
+import csv
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from ._fileutil import write_atomic
+from .batch import BatchQuery, EngineProvider, execute_batch_query
+from .engines import SearchResponse, format_results
+from .multi import parse_engine_names
+from .serialize import dumps
+
+# 支持的报告格式
+REPORT_FORMATS = ("md", "jsonl", "csv")
+
+# 报告中显示的引擎名称
+ENGINE_LABELS = {"google": "Google", "duckduckgo": "DuckDuckGo"}
+
+# 报告中显示的时间筛选说明
+TIME_LABELS = {
+    "d": "最近一天",
+    "w": "最近一周",
+    "m": "最近一月",
+    "y": "最近一年",
+    None: "不限时间",
+}
+
+# CSV 报告的列
+CSV_FIELDS = (
+    "query",
+    "time_filter",
+    "searched_at",
+    "rank",
+    "title",
+    "url",
+    "description",
+    "engine",
+)
+
+# 文件名中关键词部分的最大长度
+MAX_KEYWORD_LENGTH = 80
+
+_UNSAFE_FILENAME = re.compile(r'[\s/\\:*?"<>|]+')
+
+
+def default_save_dir() -> Path:
+    """报告保存目录，可通过环境变量 MES_SAVE_PATH 设置，默认为当前目录"""
+    path = os.getenv("MES_SAVE_PATH")
+    if path:
+        return Path(path).expanduser()
+    return Path.cwd()
+
+
+class SavedSearch:
+    """一个查询的搜索结果（或错误）以及完成时间"""
+
+    __slots__ = ("query", "response", "error", "searched_at")
+
+    def __init__(
+        self,
+        query: BatchQuery,
+        response: Optional[SearchResponse] = None,
+        error: Optional[str] = None,
+        searched_at: Optional[datetime] = None,
+    ):
+        self.query = query
+        self.response = response
+        self.error = error
+        self.searched_at = searched_at or datetime.now()
+
+    @property
+    def engine_names(self) -> List[str]:
+        return parse_engine_names(self.query.engine)
+
+
+def run_searches(
+    queries: Iterable[BatchQuery],
+    provider: EngineProvider,
+    concurrency: int = 4,
+    weights: Optional[Dict[str, float]] = None,
+) -> List[SavedSearch]:
+    """并发执行全部查询，按输入顺序返回结果；单个查询失败不影响其它查询"""
+
+    def execute(batch_query: BatchQuery) -> SavedSearch:
+        if batch_query.error:
+            return SavedSearch(batch_query, error=batch_query.error)
+        try:
+            response = execute_batch_query(batch_query, provider, weights)
+        except Exception as e:
+            return SavedSearch(batch_query, error=str(e))
+        if response.error is not None:
+            return SavedSearch(batch_query, error=str(response.error))
+        return SavedSearch(batch_query, response)
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, concurrency), thread_name_prefix="mes-save"
+    ) as executor:
+        return list(executor.map(execute, queries))
+
+
+def report_filename(saved: SavedSearch, fmt: str, timestamp: datetime) -> str:
+    """报告文件名：search_时间戳_关键词_引擎_时间筛选.扩展名"""
+    keyword = _UNSAFE_FILENAME.sub("_", saved.query.query.strip())
+    keyword = keyword[:MAX_KEYWORD_LENGTH] or "query"
+    engine = "+".join(saved.engine_names)
+    time_filter = saved.query.time_filter or "all"
+    return f"search_{timestamp:%Y%m%d_%H%M%S}_{keyword}_{engine}_{time_filter}.{fmt}"
+
+
+def render_markdown(saved: SavedSearch) -> str:
+    """按 mesobs.sh 的模板生成一个查询的 Markdown 报告"""
+    engine_label = ", ".join(
+        ENGINE_LABELS.get(name, name) for name in saved.engine_names
+    )
+    time_label = TIME_LABELS.get(saved.query.time_filter, saved.query.time_filter)
+    return (
+        f"# 搜索结果: {saved.query.query}\n"
+        "\n"
+        f"搜索时间: {saved.searched_at:%Y-%m-%d %H:%M:%S}\n"
+        f"搜索引擎: {engine_label}\n"
+        f"时间筛选: {time_label}\n"
+        "\n"
+        f"{format_results(saved.response, 'simple')}\n"
+    )
+
+
+def _rows(saved: SavedSearch) -> Iterable[Dict[str, Any]]:
+    searched_at = saved.searched_at.isoformat(timespec="seconds")
+    for rank, result in enumerate(saved.response.results, saved.query.offset + 1):
+        yield {
+            "query": saved.query.query,
+            "time_filter": saved.query.time_filter,
+            "searched_at": searched_at,
+            "rank": rank,
+            **result.to_dict(),
+        }
+
+
+def render_report(searches: List[SavedSearch], fmt: str) -> str:
+    """在内存中生成完整的报告，多个查询依次写入同一份报告
+
+    Raises:
+        ValueError: 不支持的报告格式
+    """
+    buffer = io.StringIO()
+    if fmt == "md":
+        buffer.write("\n".join(render_markdown(saved) for saved in searches))
+    elif fmt == "jsonl":
+        for saved in searches:
+            for row in _rows(saved):
+                buffer.write(dumps(row))
+                buffer.write("\n")
+    elif fmt == "csv":
+        writer = csv.DictWriter(
+            buffer, fieldnames=CSV_FIELDS, extrasaction="ignore", lineterminator="\n"
+        )
+        writer.writeheader()
+        for saved in searches:
+            writer.writerows(_rows(saved))
+    else:
+        raise ValueError(
+            f"不支持的报告格式: {fmt}，可用的格式: {', '.join(REPORT_FORMATS)}"
+        )
+    return buffer.getvalue()
+
+
+def save_reports(
+    searches: List[SavedSearch],
+    fmt: str = "md",
+    directory: Optional[Path] = None,
+    combined: Optional[Path] = None,
+    timestamp: Optional[datetime] = None,
+) -> List[Path]:
+    """写入成功的查询的报告，返回写入的文件
+
+    Args:
+        searches: run_searches() 的结果，失败的查询不写入
+        fmt: 报告格式，见 REPORT_FORMATS
+        directory: 每个查询一份报告时的保存目录，默认为 default_save_dir()
+        combined: 指定时把全部查询写入这一个文件
+        timestamp: 文件名中的时间戳，默认为当前时间
+    """
+    succeeded = [saved for saved in searches if saved.error is None]
+    if not succeeded:
+        return []
+    # CSV 带 BOM，Excel 打开时能正确识别中文
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+
+    if combined is not None:
+        write_atomic(combined, render_report(succeeded, fmt), encoding)
+        return [combined]
+
+    directory = directory or default_save_dir()
+    timestamp = timestamp or datetime.now()
+    paths = []
+    used = set()
+    for saved in succeeded:
+        name = report_filename(saved, fmt, timestamp)
+        # 同一次运行中重复的查询写入不同的文件
+        stem, suffix, n = name[: -len(fmt) - 1], name[-len(fmt) - 1 :], 2
+        while name in used:
+            name = f"{stem}_{n}{suffix}"
+            n += 1
+        used.add(name)
+        path = directory / name
+        write_atomic(path, render_report([saved], fmt), encoding)
+        paths.append(path)
+    return paths
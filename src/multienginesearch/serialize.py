@@ -0,0 +1,129 @@
+"""
+搜索结果的快速序列化
+
+直接从 SearchResult/SearchResponse 对象生成 JSON 文本，不构造中间字典。
+输出与 json.dumps(obj.to_dict(), ensure_ascii=False[, indent=2]) 逐字节相同，
+与是否安装 orjson 无关。
+
+安装了 orjson 时，通用的 dumps()/loads()（缓存读写等）改用 orjson。
+"""
+
+import json
+import math
+from json.encoder import encode_basestring
+from typing import Any, Dict, Optional
+
+from .engines import SearchResponse, SearchResult
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库
+    orjson = None
+
+
+def dumps(obj: Any) -> str:
+    """将普通的 JSON 值序列化为单行文本（非 ASCII 字符不转义）"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def loads(text: str) -> Any:
+    """解析 JSON 文本"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _float(value: Optional[float]) -> str:
+    if value is None:
+        return "null"
+    value = float(value)
+    if math.isfinite(value):
+        return float.__repr__(value)
+    # 与 json.dumps 相同，输出 NaN、Infinity 和 -Infinity
+    return json.dumps(value)
+
+
+def _sources(result: SearchResult) -> str:
+    return ", ".join(
+        f'{{"engine": {encode_basestring(engine)}, "rank": {int(rank)}}}'
+        for engine, rank in result.sources
+    )
+
+
+def result_json(result: SearchResult) -> str:
+    """将单条结果序列化为一行 JSON（NDJSON 格式）"""
+    text = (
+        f'{{"title": {encode_basestring(result.title)}, '
+        f'"url": {encode_basestring(result.url)}, '
+        f'"description": {encode_basestring(result.description)}, '
+        f'"engine": {encode_basestring(result.engine)}'
+    )
+    if result.sources is not None:
+        text += f', "sources": [{_sources(result)}], "score": {_float(result.score)}'
+    if result.content is not None:
+        text += f', "content": {encode_basestring(result.content)}'
+    return text + "}"
+
+
+def response_json(
+    response: SearchResponse, extra: Optional[Dict[str, Any]] = None
+) -> str:
+    """将响应序列化为一行 JSON
+
+    Args:
+        response: 搜索响应
+        extra: 写在 results 之前的额外字段（如批量搜索的 index、query）
+    """
+    parts = [
+        f"{encode_basestring(key)}: {json.dumps(value, ensure_ascii=False)}"
+        for key, value in (extra or {}).items()
+    ]
+    parts.append(f'"results": [{", ".join(map(result_json, response.results))}]')
+    parts.append(f'"count": {len(response.results)}')
+    for key, value in response.extra_fields().items():
+        parts.append(
+            f"{encode_basestring(key)}: {json.dumps(value, ensure_ascii=False)}"
+        )
+    return "{" + ", ".join(parts) + "}"
+
+
+def response_json_pretty(response: SearchResponse) -> str:
+    """将响应序列化为缩进 2 个空格的 JSON（mes search --output json）"""
+    if response.results:
+        results = "[\n" + ",\n".join(map(_result_pretty, response.results)) + "\n  ]"
+    else:
+        results = "[]"
+    parts = [f'  "results": {results}', f'  "count": {len(response.results)}']
+    for key, value in response.extra_fields().items():
+        # 嵌套的字典整体再缩进一层
+        nested = json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        parts.append(f"  {encode_basestring(key)}: {nested}")
+    return "{\n" + ",\n".join(parts) + "\n}"
+
+
+def _result_pretty(result: SearchResult) -> str:
+    text = (
+        "    {\n"
+        f'      "title": {encode_basestring(result.title)},\n'
+        f'      "url": {encode_basestring(result.url)},\n'
+        f'      "description": {encode_basestring(result.description)},\n'
+        f'      "engine": {encode_basestring(result.engine)}'
+    )
+    if result.sources is not None:
+        if result.sources:
+            sources = ",\n".join(
+                "        {\n"
+                f'          "engine": {encode_basestring(engine)},\n'
+                f'          "rank": {int(rank)}\n'
+                "        }"
+                for engine, rank in result.sources
+            )
+            text += f',\n      "sources": [\n{sources}\n      ]'
+        else:
+            text += ',\n      "sources": []'
+        text += f',\n      "score": {_float(result.score)}'
+    if result.content is not None:
+        text += f',\n      "content": {encode_basestring(result.content)}'
+    return text + "\n    }"
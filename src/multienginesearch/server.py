@@ -0,0 +1,276 @@
+"""
+搜索服务
+
+mes serve 在一个长期运行的进程中通过本地 HTTP JSON 接口提供搜索。
+引擎实例、连接池、结果缓存和 Google 配额跟踪在多次请求之间保持复用，
+避免每次调用 mes 都重新导入依赖、创建引擎和读取配额文件。
+
+接口:
+
+- GET/POST /search: 单个查询（可多引擎），返回与 mes search -o json 相同的 JSON
+- POST /batch: 请求体每行一个查询（与 mes batch 的输入相同），按完成顺序返回 NDJSON
+- GET /metrics: Prometheus 文本格式的累计指标
+- GET /health: 服务状态和已创建的引擎
+"""
+
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .batch import (
+    DEFAULT_CONCURRENCY,
+    TIME_FILTERS,
+    EngineProvider,
+    batch_query_from_dict,
+    execute_batch_query,
+    read_batch_queries,
+    run_batch,
+)
+from .merge import parse_engine_weights
+from .metrics import REGISTRY, MetricsRegistry
+from .multi import DEFAULT_ENGINE_TIMEOUT, MAX_THREAD_CONCURRENCY
+from .serialize import dumps, response_json
+
+# 默认监听地址
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 请求体大小上限（字节）
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+JSON_TYPE = "application/json; charset=utf-8"
+
+
+class SearchServer(ThreadingHTTPServer):
+    """多线程搜索服务，所有请求共享同一个 EngineProvider"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        provider: EngineProvider,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        registry: Optional[MetricsRegistry] = None,
+        verbose: bool = False,
+    ):
+        """
+        Args:
+            address: 监听的 (主机, 端口)，端口为 0 时自动选择
+            provider: 创建并复用引擎实例的 EngineProvider
+            concurrency: /batch 请求默认的查询并发数
+            registry: 累计指标的注册表，默认使用进程内共享的注册表
+            verbose: 是否在标准错误输出访问日志
+        """
+        super().__init__(address, SearchRequestHandler)
+        self.provider = provider
+        self.concurrency = concurrency
+        self.registry = registry if registry is not None else REGISTRY
+        self.verbose = verbose
+        self.started_at = time.monotonic()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """搜索服务的请求处理器"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "mes"
+    # 关闭 Nagle 算法，避免响应头和正文分两次发送时与延迟确认叠加出 40ms
+    disable_nagle_algorithm = True
+    server: SearchServer
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/search":
+            self._handle_search(params)
+        elif url.path == "/metrics":
+            body = self.server.registry.render().encode("utf-8")
+            self._send(200, body, "text/plain; version=0.0.4; charset=utf-8")
+        elif url.path == "/health":
+            self._send_json(
+                200,
+                {
+                    "status": "ok",
+                    "uptime": round(time.monotonic() - self.server.started_at, 3),
+                    "engines": self.server.provider.loaded_engines(),
+                },
+            )
+        else:
+            self._send_json(404, {"error": f"未知的路径: {url.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        body = self._read_body()
+        if body is None:
+            return
+
+        if url.path == "/search":
+            try:
+                data = json.loads(body) if body.strip() else {}
+            except ValueError as e:
+                self._send_json(400, {"error": f"请求体不是合法的 JSON: {e}"})
+                return
+            if not isinstance(data, dict):
+                self._send_json(400, {"error": "请求体必须是 JSON 对象"})
+                return
+            self._handle_search({**params, **data})
+        elif url.path == "/batch":
+            self._handle_batch(params, body.decode("utf-8", "replace"))
+        else:
+            self._send_json(404, {"error": f"未知的路径: {url.path}"})
+
+    def _handle_search(self, params: Dict[str, Any]):
+        if "query" not in params and "q" in params:
+            params["query"] = params["q"]
+        try:
+            batch_query = batch_query_from_dict(params)
+            weights = _parse_weights(params.get("weights"))
+            timeout = float(params.get("timeout", DEFAULT_ENGINE_TIMEOUT))
+            if timeout <= 0:
+                raise ValueError(f"timeout 必须大于 0: {timeout}")
+            response = execute_batch_query(
+                batch_query, self.server.provider, weights, timeout
+            )
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self.server.registry.observe(response.stats)
+        extra = None
+        if _parse_flag(params.get("stats")) and response.stats is not None:
+            extra = {"stats": response.stats.to_dict()}
+        self._send(200, response_json(response, extra).encode("utf-8"), JSON_TYPE)
+
+    def _handle_batch(self, params: Dict[str, str], body: str):
+        try:
+            limit = int(params.get("limit", 10))
+            if not 1 <= limit <= 100:
+                raise ValueError(f"limit 必须在 1-100 之间: {limit}")
+            time_filter = params.get("time")
+            if time_filter is not None and time_filter not in TIME_FILTERS:
+                raise ValueError(f"无效的时间筛选参数: {time_filter}")
+            concurrency = int(params.get("concurrency", self.server.concurrency))
+            if not 1 <= concurrency <= MAX_THREAD_CONCURRENCY:
+                raise ValueError(
+                    f"concurrency 必须在 1-{MAX_THREAD_CONCURRENCY} 之间: {concurrency}"
+                )
+            weights = _parse_weights(params.get("weights"))
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        queries = read_batch_queries(
+            body.splitlines(), params.get("engine"), limit, time_filter
+        )
+
+        # 结果按完成顺序逐行写出，长度事先未知，写完后关闭连接
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for record in run_batch(
+                queries,
+                self.server.provider,
+                concurrency,
+                weights,
+                self.server.registry,
+            ):
+                self.wfile.write((dumps(record) + "\n").encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前断开时停止执行剩余的查询
+            pass
+
+    def _read_body(self) -> Optional[bytes]:
+        """读取请求体，超过大小上限或缺少长度时返回错误响应和 None"""
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "无效的 Content-Length"})
+            return None
+        if length > MAX_BODY_SIZE:
+            self._send_json(413, {"error": f"请求体超过 {MAX_BODY_SIZE} 字节"})
+            self.close_connection = True
+            return None
+        return self.rfile.read(length)
+
+    def _send_json(self, status: int, data: Dict[str, Any]):
+        self._send(status, dumps(data).encode("utf-8"), JSON_TYPE)
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+
+def _parse_weights(value: Any) -> Optional[Dict[str, float]]:
+    """解析 weights 参数，支持 "google=2,duckduckgo=1" 字符串或 JSON 对象"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return parse_engine_weights(value)
+    return parse_engine_weights(str(value))
+
+
+def _parse_flag(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def search_via_server(
+    url: str, request: Dict[str, Any], timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """把搜索请求转发给 mes serve，返回响应的 JSON 对象
+
+    Args:
+        url: 服务地址，如 http://127.0.0.1:8765
+        request: 包含 query、engine、limit、time、weights、timeout、stats 的请求
+        timeout: 等待响应的超时时间（秒）
+
+    Raises:
+        ConnectionError: 无法连接服务
+        ValueError: 服务返回错误
+    """
+    import urllib.error
+    import urllib.request
+
+    http_request = urllib.request.Request(
+        url.rstrip("/") + "/search",
+        data=dumps(request).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read()).get("error") or str(e)
+        except ValueError:
+            message = str(e)
+        raise ValueError(message)
+    except (urllib.error.URLError, OSError) as e:
+        raise ConnectionError(str(getattr(e, "reason", e)))
@@ -0,0 +1,289 @@
+"""
+HTTP 传输层
+
+为搜索引擎提供共享的连接池（keep-alive）、连接/读取超时，
+以及针对 429/5xx 的带抖动指数退避重试（遵循 Retry-After）。
+同时提供基于 httpx（可选依赖）的异步版本。
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import count
+
+# 默认连接池大小（每个主机保持的连接数）
+DEFAULT_POOL_SIZE = 10
+
+# 默认连接/读取超时（秒）
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 15.0
+
+# 默认最大重试次数（不含首次请求）
+DEFAULT_MAX_RETRIES = 3
+
+# 需要重试的 HTTP 状态码
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# 表示被服务端限流的 HTTP 状态码，计入搜索统计的 throttled，供限速器降低速率
+THROTTLE_STATUS = 429
+
+
+class _RetryPolicy:
+    """重试策略：带完全抖动的指数退避，优先遵循 Retry-After"""
+
+    def __init__(
+        self,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        retry_statuses: Iterable[int],
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def _backoff(self, attempt: int) -> float:
+        """带完全抖动的指数退避时间"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _retry_delay(self, attempt: int, response: Any) -> float:
+        """计算重试前的等待时间，优先使用服务端的 Retry-After"""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = retry_at.timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(self.backoff_max, max(0.0, delay))
+        return self._backoff(attempt)
+
+
+class HttpTransport(_RetryPolicy):
+    """带连接池和重试的 HTTP 客户端，可在多个线程和引擎之间共享"""
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_statuses: Iterable[int] = RETRY_STATUSES,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            pool_size: 每个主机的连接池大小
+            connect_timeout: 建立连接超时（秒）
+            read_timeout: 读取响应超时（秒）
+            max_retries: 遇到可重试错误时的最大重试次数
+            backoff_base: 指数退避的基础等待时间（秒）
+            backoff_max: 单次等待时间上限（秒），同时限制 Retry-After
+            retry_statuses: 需要重试的 HTTP 状态码
+            sleep: 等待函数，便于测试时替换
+        """
+        super().__init__(max_retries, backoff_base, backoff_max, retry_statuses)
+        self.timeout = (connect_timeout, read_timeout)
+        self.sleep = sleep
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        before_request: Optional[Callable[[], Any]] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """发送 GET 请求，对 429/5xx 和网络错误进行退避重试
+
+        重试用尽后返回最后一次的响应（状态码可能不是 200），
+        或重新抛出最后一次的网络异常。
+
+        Args:
+            before_request: 每次发出请求（包括重试）之前调用，用于限速
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            if before_request is not None:
+                before_request()
+            try:
+                response = self.session.get(url, params=params, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                self.sleep(self._backoff(attempt))
+                attempt += 1
+                count("retries")
+                continue
+
+            if response.status_code == THROTTLE_STATUS:
+                count("throttled")
+
+            if response.status_code not in self.retry_statuses:
+                return response
+            if attempt >= self.max_retries:
+                return response
+
+            self.sleep(self._retry_delay(attempt, response))
+            response.close()
+            attempt += 1
+            count("retries")
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport() -> HttpTransport:
+    """获取进程内共享的默认传输对象
+
+    可通过环境变量调整：MES_HTTP_POOL_SIZE、MES_HTTP_CONNECT_TIMEOUT、
+    MES_HTTP_READ_TIMEOUT、MES_HTTP_MAX_RETRIES。
+    """
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport(**_env_config())
+        return _default_transport
+
+
+def _env_config() -> Dict[str, Any]:
+    """从环境变量读取传输层配置"""
+    return {
+        "pool_size": int(os.getenv("MES_HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)),
+        "connect_timeout": float(
+            os.getenv("MES_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)
+        ),
+        "read_timeout": float(os.getenv("MES_HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)),
+        "max_retries": int(os.getenv("MES_HTTP_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+    }
+
+
+class AsyncHttpTransport(_RetryPolicy):
+    """基于 httpx.AsyncClient 的异步 HTTP 客户端，重试策略与 HttpTransport 相同
+
+    需要安装可选依赖 httpx；客户端绑定到创建它的事件循环。
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_statuses: Iterable[int] = RETRY_STATUSES,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """
+        Raises:
+            ImportError: 未安装 httpx
+        """
+        import httpx
+
+        super().__init__(max_retries, backoff_base, backoff_max, retry_statuses)
+        self.sleep = sleep
+        self._network_errors = (httpx.TransportError,)
+        # 连接池满时排队等待，不设等待超时，以便同时挂起大量请求
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=None),
+        )
+
+    async def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        before_request: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        """异步发送 GET 请求，对 429/5xx 和网络错误进行退避重试
+
+        Args:
+            before_request: 每次发出请求（包括重试）之前等待的协程函数，用于限速
+        """
+        attempt = 0
+        while True:
+            if before_request is not None:
+                await before_request()
+            try:
+                response = await self.client.get(url, params=params)
+            except self._network_errors:
+                if attempt >= self.max_retries:
+                    raise
+                await self.sleep(self._backoff(attempt))
+                attempt += 1
+                count("retries")
+                continue
+
+            if response.status_code == THROTTLE_STATUS:
+                count("throttled")
+
+            if response.status_code not in self.retry_statuses:
+                return response
+            if attempt >= self.max_retries:
+                return response
+
+            await self.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+            count("retries")
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self.client.aclose()
+
+
+# 每个事件循环一个异步传输对象，事件循环被回收时自动释放
+_async_transports: "weakref.WeakKeyDictionary[Any, AsyncHttpTransport]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_default_async_transport() -> Optional[AsyncHttpTransport]:
+    """获取当前事件循环共享的异步传输对象，未安装 httpx 时返回 None
+
+    与 get_default_transport() 使用相同的环境变量配置。
+    """
+    loop = asyncio.get_running_loop()
+    transport = _async_transports.get(loop)
+    if transport is None:
+        try:
+            transport = AsyncHttpTransport(**_env_config())
+        except ImportError:
+            return None
+        _async_transports[loop] = transport
+    return transport
+
+
+async def close_default_async_transport():
+    """关闭当前事件循环共享的异步传输对象（如果已创建）"""
+    transport = _async_transports.pop(asyncio.get_running_loop(), None)
+    if transport is not None:
+        await transport.aclose()
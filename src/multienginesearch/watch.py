@@ -0,0 +1,349 @@
+"""
+定期监测查询的新结果
+
+mes watch 按计划反复执行一组查询，只输出以前没有见过的结果。见过的结果按规范化后的 URL
+记录在持久化的布隆过滤器中（默认 ~/.mes_watch_seen.bloom）：占用的空间由容量和误判率
+决定，与运行了多久、见过多少 URL 无关。过滤器分为当前和上一代两部分，当前部分写满
+容量后整体轮换，因此至少记住最近 capacity 个不同的 URL，更早只见过一次的 URL
+会被逐渐忘记；误判只会让极少数新结果被当作已见过，不会重复输出旧结果。
+
+Google 查询的间隔按剩余配额和距配额重置的时间计算，并在一个间隔内错开各个查询的
+执行时间，使请求均匀分布在一天中，而不是在每轮开始时集中发出后提前用完配额。
+"""
+
+import hashlib
+import math
+import os
+import re
+import struct
+import time
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+from ._fileutil import write_atomic
+from .batch import BatchQuery
+from .engines import GOOGLE_MAX_RESULTS, SearchResponse, SearchResult
+from .merge import canonicalize_url
+from .multi import parse_engine_names
+
+# 过滤器每一代记住的 URL 数
+DEFAULT_CAPACITY = 100_000
+
+# 过滤器的误判率（新结果被当作已见过的概率）
+DEFAULT_ERROR_RATE = 0.001
+
+# 默认的查询间隔（秒）
+DEFAULT_INTERVAL = 60 * 60
+
+# 配额用完后，等到重置时间之后再多等待的秒数
+RESET_MARGIN = 60
+
+# Google API 每次请求最多返回的结果数
+GOOGLE_PAGE_SIZE = 10
+
+# 过滤器文件头：魔数、版本、容量、哈希函数个数、误判率、当前一代已写入的 URL 数
+_HEADER = struct.Struct("<4sBIIdI")
+_MAGIC = b"MESB"
+_VERSION = 1
+
+_DURATION_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([smhd]?)$")
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def default_seen_path() -> Path:
+    """已见结果记录的路径，可通过环境变量 MES_WATCH_STATE 覆盖"""
+    path = os.getenv("MES_WATCH_STATE")
+    if path:
+        return Path(path).expanduser()
+    return Path.home() / ".mes_watch_seen.bloom"
+
+
+def parse_duration(value: str) -> float:
+    """解析时长，如 90s、30m、2h、1d，不带单位时为秒
+
+    Raises:
+        ValueError: 格式错误或不大于 0
+    """
+    match = _DURATION_PATTERN.match(value.strip().lower())
+    seconds = float(match.group(1)) * _DURATION_UNITS[match.group(2)] if match else 0
+    if seconds <= 0:
+        raise ValueError(f"无效的时长: {value}，应为 90s、30m、2h 或 1d 这样的格式")
+    return seconds
+
+
+def google_requests(limit: int) -> int:
+    """一次 Google 搜索消耗的请求数（每次请求最多 10 条结果）"""
+    return math.ceil(min(limit, GOOGLE_MAX_RESULTS) / GOOGLE_PAGE_SIZE)
+
+
+class SeenFilter:
+    """记录已见过的 URL 的两代布隆过滤器，大小固定"""
+
+    def __init__(
+        self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE
+    ):
+        """
+        Args:
+            capacity: 每一代记住的 URL 数，写满后轮换
+            error_rate: 每一代写满时的误判率
+        """
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("capacity 必须大于 0，error_rate 必须在 0 和 1 之间")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.size = max(64, int(math.ceil(bits / 8)) * 8)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._current = bytearray(self.size // 8)
+        self._previous = bytearray(self.size // 8)
+
+    def _positions(self, key: str) -> List[int]:
+        # 用一个 128 位摘要的两半组合出 k 个位置（Kirsch–Mitzenmacher）
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    @staticmethod
+    def _test(bits: bytearray, positions: List[int]) -> bool:
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def __contains__(self, key: str) -> bool:
+        positions = self._positions(key)
+        return self._test(self._current, positions) or self._test(
+            self._previous, positions
+        )
+
+    def add(self, key: str) -> bool:
+        """记录一个 URL，返回它之前是否没有见过"""
+        positions = self._positions(key)
+        if self._test(self._current, positions):
+            return False
+        seen = self._test(self._previous, positions)
+        # 上一代中见过的 URL 也写入当前一代，轮换后仍然记得
+        if self.count >= self.capacity:
+            self._previous = self._current
+            self._current = bytearray(self.size // 8)
+            self.count = 0
+        for p in positions:
+            self._current[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+        return not seen
+
+    def to_bytes(self) -> bytes:
+        header = _HEADER.pack(
+            _MAGIC, _VERSION, self.capacity, self.hashes, self.error_rate, self.count
+        )
+        return header + bytes(self._current) + bytes(self._previous)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SeenFilter":
+        """从 to_bytes() 的输出还原
+
+        Raises:
+            ValueError: 格式错误
+        """
+        try:
+            magic, version, capacity, hashes, error_rate, count = _HEADER.unpack_from(
+                data
+            )
+        except struct.error:
+            raise ValueError("文件不完整")
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("不是 mes watch 的记录文件")
+        seen = cls(capacity, error_rate)
+        body = data[_HEADER.size :]
+        width = seen.size // 8
+        if hashes != seen.hashes or len(body) != 2 * width:
+            raise ValueError("文件大小与参数不符")
+        seen.count = count
+        seen._current = bytearray(body[:width])
+        seen._previous = bytearray(body[width:])
+        return seen
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        capacity: int = DEFAULT_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE,
+    ) -> "SeenFilter":
+        """读取记录文件，不存在时创建新的过滤器（已有文件沿用文件中的参数）
+
+        Raises:
+            ValueError: 文件无法读取或已损坏
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return cls(capacity, error_rate)
+        except OSError as e:
+            raise ValueError(f"无法读取已见结果记录 {path}: {e}")
+        try:
+            return cls.from_bytes(data)
+        except ValueError as e:
+            raise ValueError(f"已见结果记录 {path} 已损坏: {e}")
+
+    def save(self, path: Path):
+        """原子地写入记录文件：先写临时文件，再重命名覆盖"""
+        write_atomic(path, self.to_bytes())
+
+
+class WatchTask:
+    """被监测的一个查询及其下次执行时间"""
+
+    __slots__ = ("query", "google_cost", "next_due", "runs")
+
+    def __init__(self, query: BatchQuery):
+        self.query = query
+        engines = parse_engine_names(query.engine)
+        # 每次执行消耗的 Google 请求数，不使用 Google 时为 0
+        self.google_cost = google_requests(query.limit) if "google" in engines else 0
+        self.next_due = 0.0
+        self.runs = 0
+
+
+# 返回 (剩余的 Google 请求数, 距配额重置的秒数)，没有配置 Google 时返回 None
+QuotaFunc = Callable[[], Optional[Tuple[int, float]]]
+
+
+def google_quota(reserve: int = 0) -> Optional[Tuple[int, float]]:
+    """读取 Google 密钥池的剩余配额，保留 reserve 次给其它搜索使用"""
+    from .quota import load_credential_pool, next_reset_time, pacific_now
+
+    pool = load_credential_pool()
+    if pool is None:
+        return None
+    remaining = sum(
+        max(0, key["daily_limit"] - key["requests_used"])
+        for key in pool.snapshot()["keys"]
+        if not key["disabled"]
+    )
+    until_reset = (next_reset_time() - pacific_now()).total_seconds()
+    return max(0, remaining - reserve), until_reset
+
+
+class WatchScheduler:
+    """安排各个查询的执行时间
+
+    不使用 Google 的查询每隔 interval 秒执行一次。使用 Google 的查询共享剩余配额：
+    间隔取 interval 和“距重置时间 × 每轮消耗 / 剩余配额”中较大的一个，
+    使剩余配额刚好在重置前均匀用完；配额不足一次搜索时等到重置之后。
+    """
+
+    def __init__(
+        self,
+        tasks: Sequence[WatchTask],
+        interval: float = DEFAULT_INTERVAL,
+        quota: Optional[QuotaFunc] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.tasks = list(tasks)
+        self.interval = interval
+        self.quota = quota
+        self.clock = clock
+
+    def _google_delay(self, cost: int) -> float:
+        """使用 Google 的查询距下次执行的秒数"""
+        budget = self.quota() if self.quota is not None else None
+        if budget is None:
+            return self.interval
+        remaining, until_reset = budget
+        if remaining < cost:
+            return until_reset + RESET_MARGIN
+        per_round = sum(task.google_cost for task in self.tasks)
+        return max(self.interval, until_reset * per_round / remaining)
+
+    def start(self):
+        """安排第一轮：不使用 Google 的查询立即执行，使用 Google 的查询在一个间隔内错开"""
+        now = self.clock()
+        google_tasks = [task for task in self.tasks if task.google_cost]
+        spacing = 0.0
+        if google_tasks:
+            spacing = self._google_delay(google_tasks[0].google_cost) / len(
+                google_tasks
+            )
+        for task in self.tasks:
+            task.next_due = now
+        for i, task in enumerate(google_tasks):
+            task.next_due = now + i * spacing
+
+    def next_task(self) -> WatchTask:
+        """下一个到期的查询"""
+        return min(self.tasks, key=lambda task: task.next_due)
+
+    def reschedule(self, task: WatchTask):
+        """查询执行后安排下一次执行"""
+        delay = self._google_delay(task.google_cost) if task.google_cost else None
+        task.next_due = self.clock() + (self.interval if delay is None else delay)
+
+
+class Watcher:
+    """执行到期的查询，产出其中新出现的结果"""
+
+    def __init__(
+        self,
+        scheduler: WatchScheduler,
+        seen: SeenFilter,
+        search: Callable[[BatchQuery], SearchResponse],
+        seen_path: Optional[Path] = None,
+        prime: bool = False,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            scheduler: 查询的执行计划
+            seen: 已见过的 URL
+            search: 执行一个查询的函数
+            seen_path: 每次记录新 URL 后把 seen 写入该文件，None 表示不保存
+            prime: 为 True 时第一次执行每个查询只记录结果，不产出
+            sleep: 等待下一个查询到期的函数
+        """
+        self.scheduler = scheduler
+        self.seen = seen
+        self.search = search
+        self.seen_path = seen_path
+        self.prime = prime
+        self.sleep = sleep
+
+    def poll(self, task: WatchTask) -> Tuple[Optional[str], List[SearchResult]]:
+        """执行一个查询，返回 (错误信息, 新出现的结果)"""
+        try:
+            response = self.search(task.query)
+        except Exception as e:
+            return str(e), []
+        if response.error is not None:
+            return str(response.error), []
+
+        new = [
+            result
+            for result in response.results
+            if result.url and self.seen.add(canonicalize_url(result.url))
+        ]
+        first_run = task.runs == 0
+        task.runs += 1
+        if new and self.seen_path is not None:
+            self.seen.save(self.seen_path)
+        if self.prime and first_run:
+            return None, []
+        return None, new
+
+    def run_once(self) -> Iterator[Tuple[WatchTask, Optional[str], List[SearchResult]]]:
+        """按顺序执行每个查询一次（忽略计划，适合由 cron 调用）"""
+        for task in self.scheduler.tasks:
+            error, new = self.poll(task)
+            yield task, error, new
+
+    def run(self) -> Iterator[Tuple[WatchTask, Optional[str], List[SearchResult]]]:
+        """按计划无限执行，每执行一个查询产出一次 (查询, 错误信息, 新出现的结果)"""
+        self.scheduler.start()
+        while True:
+            task = self.scheduler.next_task()
+            delay = task.next_due - self.scheduler.clock()
+            if delay > 0:
+                self.sleep(delay)
+            error, new = self.poll(task)
+            self.scheduler.reschedule(task)
+            yield task, error, new
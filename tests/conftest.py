@@ -0,0 +1,19 @@
+"""
+测试公共配置
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path, monkeypatch):
+    """将用户主目录指向临时目录，避免测试读写真实的配额、缓存等文件"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def google_env(monkeypatch):
+    """为 GoogleEngine 提供测试用的 API 密钥和搜索引擎 ID"""
+    monkeypatch.setenv("MES_GOOGLE_API_KEY", "test-key")
+    monkeypatch.setenv("MES_GOOGLE_SEARCH_ENGINE_ID", "test-cx")
@@ -0,0 +1,239 @@
+"""
+测试异步搜索接口和 asyncio 编排
+"""
+
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from typer.testing import CliRunner
+
+from multienginesearch.aio import amulti_search, arun_batch
+from multienginesearch.batch import EngineProvider, read_batch_queries
+from multienginesearch.cli import app
+from multienginesearch.engines import (
+    GoogleEngine,
+    SearchEngine,
+    SearchError,
+    SearchResponse,
+    SearchResult,
+)
+from multienginesearch.memo import LRUCache, MemoizedSearchEngine
+from multienginesearch.multi import multi_search
+
+runner = CliRunner()
+
+
+class SleepyEngine(SearchEngine):
+    """只实现同步 search() 的测试引擎，asearch() 使用默认的线程实现"""
+
+    def __init__(self, name: str = "sleepy", delay: float = 0.0):
+        self._name = name
+        self.delay = delay
+        self.calls = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def search(self, query, limit=10, time_filter=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        return SearchResponse([SearchResult(query, f"http://{self._name}", "", "x")])
+
+
+class AsyncEngine(SleepyEngine):
+    """原生异步的测试引擎，记录同时在途的查询数"""
+
+    def __init__(self, name: str = "async", delay: float = 0.0):
+        super().__init__(name, delay)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def asearch(self, query, limit=10, time_filter=None):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if query == "boom":
+            raise RuntimeError("boom")
+        return SearchResponse([SearchResult(query, f"http://{self._name}", "", "x")])
+
+
+def test_default_asearch_runs_search_in_thread():
+    """测试默认的 asearch() 在线程中运行 search()，不阻塞事件循环"""
+    engine = SleepyEngine(delay=0.2)
+
+    async def main():
+        started = time.monotonic()
+        responses = await asyncio.gather(*(engine.asearch(f"q{i}") for i in range(3)))
+        return responses, time.monotonic() - started
+
+    responses, elapsed = asyncio.run(main())
+    assert elapsed < 0.5
+    assert [r.results[0].title for r in responses] == ["q0", "q1", "q2"]
+
+
+def test_amulti_search_merges_and_marks_timeouts():
+    """测试异步多引擎搜索按引擎顺序合并，并标记超时和出错的引擎"""
+    engines = [AsyncEngine("a", 0.05), AsyncEngine("slow", 2.0), SleepyEngine("b")]
+
+    async def main():
+        return await amulti_search(engines, "query", timeout=0.5)
+
+    started = time.monotonic()
+    response = asyncio.run(main())
+    assert time.monotonic() - started < 1.5
+    assert [r.url for r in response.results] == ["http://a", "http://b"]
+    assert response.engine_meta["slow"]["timed_out"] is True
+    assert response.engine_meta["a"]["count"] == 1
+
+    response = asyncio.run(amulti_search([AsyncEngine("a")], "boom"))
+    assert response.engine_meta["a"]["error"] == "boom"
+
+
+def test_amulti_search_error_metadata_matches_sync():
+    """测试引擎返回错误时，异步与同步多引擎搜索记录相同的元数据"""
+
+    class FailingEngine(SleepyEngine):
+        def search(self, query, limit=10, time_filter=None):
+            error = SearchError(self.name, "throttled", "HTTP 429", status=429)
+            return SearchResponse([], error=error)
+
+    engines = [FailingEngine("bad"), SleepyEngine("good")]
+    sync = multi_search(engines, "query").engine_meta
+    async_ = asyncio.run(amulti_search(engines, "query")).engine_meta
+
+    for meta in (sync, async_):
+        for engine_meta in meta.values():
+            engine_meta.pop("elapsed")
+    assert async_ == sync
+    assert sync["bad"] == {"count": 0, "error": "HTTP 429", "error_kind": "throttled"}
+
+
+def test_arun_batch_bounds_concurrency():
+    """测试异步批量搜索在单个事件循环上以有界并发执行大量查询"""
+    engine = AsyncEngine(delay=0.05)
+    provider = EngineProvider()
+    queries = read_batch_queries([f"q{i}\n" for i in range(200)], engine="async")
+
+    async def main():
+        return [record async for record in arun_batch(queries, provider, 50)]
+
+    with patch(
+        "multienginesearch.batch.SearchEngineFactory.create_engine",
+        return_value=engine,
+    ):
+        started = time.monotonic()
+        records = asyncio.run(main())
+        elapsed = time.monotonic() - started
+
+    assert len(records) == 200
+    assert sorted(r["index"] for r in records) == list(range(200))
+    assert engine.max_in_flight == 50
+    assert elapsed < 2.0  # 串行需要 10 秒
+
+
+def test_memoized_asearch_coalesces_concurrent_calls():
+    """测试并发的相同异步查询只访问一次上游"""
+    engine = AsyncEngine(delay=0.1)
+    memoized = MemoizedSearchEngine(engine, cache=LRUCache())
+
+    async def main():
+        return await asyncio.gather(*(memoized.asearch("same") for _ in range(20)))
+
+    responses = asyncio.run(main())
+    assert engine.calls == 1
+    assert all(r.results[0].title == "same" for r in responses)
+
+
+def _google_handler(total=100, delay=0.0, log=None):
+    """模拟 Google API 分页响应的 httpx 处理函数"""
+    httpx = pytest.importorskip("httpx")
+
+    async def handler(request):
+        start = int(request.url.params["start"])
+        num = int(request.url.params["num"])
+        if log is not None:
+            log.append((start, threading.current_thread().name))
+        await asyncio.sleep(delay)
+        items = [
+            {"title": f"Result {i}", "link": f"http://example.com/{i}", "snippet": ""}
+            for i in range(start, min(start - 1 + num, total) + 1)
+        ]
+        return httpx.Response(200, json={"items": items})
+
+    return handler
+
+
+def _async_transport(handler):
+    httpx = pytest.importorskip("httpx")
+    from multienginesearch.transport import AsyncHttpTransport
+
+    transport = AsyncHttpTransport()
+    transport.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return transport
+
+
+def test_google_asearch_fetches_pages_natively(google_env):
+    """测试 Google asearch() 在事件循环上并发请求分页，不使用线程"""
+    log = []
+    engine = GoogleEngine(
+        page_concurrency=10,
+        async_transport=_async_transport(_google_handler(delay=0.2, log=log)),
+    )
+
+    async def main():
+        started = time.monotonic()
+        response = await engine.asearch("test query", limit=45)
+        return response, time.monotonic() - started
+
+    response, elapsed = asyncio.run(main())
+    assert elapsed < 0.8  # 5 页串行至少需要 1 秒
+    assert [r.url for r in response.results] == [
+        f"http://example.com/{i}" for i in range(1, 46)
+    ]
+    assert {name for _, name in log} == {"MainThread"}
+    assert response.rate_limit_info["requests_used"] == 5
+
+
+def test_google_asearch_stops_after_short_page(google_env):
+    """测试 Google asearch() 遇到不满的一页后停止，并退还未发出请求的配额"""
+    engine = GoogleEngine(
+        page_concurrency=1,
+        async_transport=_async_transport(_google_handler(total=15)),
+    )
+
+    response = asyncio.run(engine.asearch("test query", limit=50))
+    assert len(response.results) == 15
+    assert engine.quota_store.snapshot()["requests_used"] == 2
+
+
+@patch("multienginesearch.batch.SearchEngineFactory.create_engine")
+def test_batch_command_async(mock_create_engine):
+    """测试 mes batch --async"""
+    mock_create_engine.side_effect = lambda name: (
+        AsyncEngine(name) if name == "duckduckgo" else None
+    )
+
+    result = runner.invoke(
+        app,
+        ["batch", "--no-cache", "--async", "-c", "200"],
+        input='first\nboom\n{"query": "third", "engine": "bing"}\n',
+    )
+
+    assert result.exit_code == 0
+    by_index = {r["index"]: r for r in map(json.loads, result.stdout.splitlines())}
+    assert by_index[0]["results"][0]["title"] == "first"
+    assert by_index[1]["error"]["message"] == "boom"
+    assert by_index[2]["error"]["kind"] == "request"
+    assert "bing" in by_index[2]["error"]["message"]
+
+    result = runner.invoke(app, ["batch", "--no-cache", "-c", "200"], input="q\n")
+    assert result.exit_code == 1
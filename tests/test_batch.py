@@ -0,0 +1,100 @@
+"""
+测试批量搜索
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+from typer.testing import CliRunner
+
+from multienginesearch.batch import (
+    EngineProvider,
+    parse_batch_line,
+    read_batch_queries,
+    run_batch,
+)
+from multienginesearch.cli import app
+from multienginesearch.engines import SearchResponse, SearchResult
+
+runner = CliRunner()
+
+
+def _fake_create_engine(name):
+    """为任意引擎名创建返回查询本身作为标题的模拟引擎"""
+    if name not in ("duckduckgo", "google"):
+        return None
+    engine = MagicMock()
+    engine.name = name
+    engine.cache_params.return_value = {}
+    engine.search.side_effect = lambda query, limit, time_filter=None: SearchResponse(
+        [SearchResult(query, f"http://{name}.com", "", name)]
+    )
+    return engine
+
+
+def test_parse_batch_line():
+    """测试纯文本和 JSON 行的解析"""
+    assert parse_batch_line("  ", 0) is None
+    assert parse_batch_line("# comment", 0) is None
+
+    plain = parse_batch_line("python tutorial\n", 3, engine="google", limit=5)
+    assert (plain.index, plain.query, plain.engine, plain.limit) == (
+        3,
+        "python tutorial",
+        "google",
+        5,
+    )
+
+    override = parse_batch_line(
+        '{"query": "rust", "engine": "duckduckgo", "limit": 3, "time": "w"}', 0
+    )
+    assert (override.engine, override.limit, override.time_filter) == (
+        "duckduckgo",
+        3,
+        "w",
+    )
+
+
+def test_read_batch_queries_reports_bad_lines():
+    """测试无法解析的行产出错误而不是中断整个批次"""
+    queries = list(
+        read_batch_queries(["a", '{"limit": 5}', '{"query": "b", "time": "x"}'])
+    )
+    assert [q.error is None for q in queries] == [True, False, False]
+    assert [q.index for q in queries] == [0, 1, 2]
+
+
+@patch("multienginesearch.batch.SearchEngineFactory.create_engine")
+def test_run_batch_reuses_engines_and_coalesces(mock_create_engine):
+    """测试每个引擎只创建一次，重复查询只搜索一次"""
+    mock_create_engine.side_effect = _fake_create_engine
+    lines = ["same", "same", '{"query": "other", "engine": "google"}', "x\ty"]
+    provider = EngineProvider()
+
+    records = list(run_batch(read_batch_queries(lines), provider, concurrency=2))
+
+    assert sorted(r["index"] for r in records) == [0, 1, 2, 3]
+    assert all(r["count"] == 1 for r in records)
+    assert mock_create_engine.call_count == 2
+    # 记忆化 → 熔断器 → 引擎
+    ddg = provider._engines["duckduckgo"].engine.engine
+    assert ddg.search.call_count == 2
+
+
+@patch("multienginesearch.batch.SearchEngineFactory.create_engine")
+def test_batch_command_streams_ndjson(mock_create_engine):
+    """测试 mes batch 从标准输入读取并逐行输出 JSON"""
+    mock_create_engine.side_effect = _fake_create_engine
+
+    result = runner.invoke(
+        app,
+        ["batch", "--no-cache"],
+        input='first\n{"query": "second", "engine": "bing"}\n',
+    )
+
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    by_index = {r["index"]: r for r in records}
+    assert by_index[0]["results"][0]["title"] == "first"
+    assert by_index[1]["error"]["kind"] == "request"
+    assert "bing" in by_index[1]["error"]["message"]
@@ -0,0 +1,34 @@
+"""
+测试基准测试套件的模拟后端和结果对比
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from compare import compare  # noqa: E402
+from stubs import StubConfig, StubServer  # noqa: E402
+
+from multienginesearch.engines import GoogleEngine  # noqa: E402
+
+
+def test_google_engine_against_stub(google_env, monkeypatch):
+    """测试 GoogleEngine 通过 MES_GOOGLE_API_URL 访问模拟接口并正确分页"""
+    with StubServer(StubConfig(latency=0, jitter=0, total_results=25)) as server:
+        monkeypatch.setenv("MES_GOOGLE_API_URL", server.google_url)
+        engine = GoogleEngine(page_concurrency=1)
+        response = engine.search("stub query", limit=40)
+
+    assert len(response.results) == 25
+    assert response.results[0].title == "stub query - 结果 1"
+    assert response.results[-1].url == "https://example.com/25?q=stub query"
+    assert response.rate_limit_info["requests_used"] == 3
+
+
+def test_compare_directions():
+    """测试指标对比按名称判断好坏"""
+    base = {"metrics": {"a.p50_ms": 100, "a.qps": 10, "a.empty_ratio": 0.1}}
+    head = {"metrics": {"a.p50_ms": 150, "a.qps": 12, "a.empty_ratio": 0.5}}
+    rows = {name: status for name, _, _, _, status in compare(base, head, 10)}
+    assert rows == {"a.p50_ms": "worse", "a.qps": "better", "a.empty_ratio": ""}
@@ -0,0 +1,175 @@
+"""
+测试结构化搜索错误和引擎熔断器
+"""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from multienginesearch.breaker import CircuitBreaker, CircuitBreakerSearchEngine
+from multienginesearch.cli import app
+from multienginesearch.clientpool import ClientPool
+from multienginesearch.engines import (
+    DuckDuckGoEngine,
+    GoogleEngine,
+    SearchEngine,
+    SearchError,
+    SearchResponse,
+    SearchResult,
+)
+from multienginesearch.multi import multi_search
+from multienginesearch.quota import QuotaExceededError
+from multienginesearch.ratelimit import SharedRateState
+
+
+class FlakyEngine(SearchEngine):
+    """前 failures 次搜索返回 kind 类型的错误，之后返回结果的测试引擎"""
+
+    def __init__(self, name="flaky", failures=100, kind="network"):
+        self._name = name
+        self.failures = failures
+        self.kind = kind
+        self.calls = 0
+
+    @property
+    def name(self):
+        return self._name
+
+    def search(self, query, limit=10, time_filter=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            error = SearchError(self.name, self.kind, "backend down")
+            return SearchResponse([], error=error)
+        return SearchResponse([SearchResult(query, "https://e.com", "", self.name)])
+
+
+def test_search_error_classification_and_round_trip():
+    """测试异常归类、重试标记和字典格式的往返"""
+    quota = SearchError.from_exception("google", QuotaExceededError("limit"))
+    assert (quota.kind, quota.retryable) == ("quota", False)
+
+    class ReadTimeout(OSError):
+        pass
+
+    timeout = SearchError.from_exception("google", ReadTimeout("slow"))
+    assert (timeout.kind, timeout.retryable) == ("timeout", True)
+    assert SearchError.from_exception("x", RuntimeError("?")).kind == "unknown"
+
+    response = SearchResponse(
+        [], error=SearchError("google", "server", "boom", status=503)
+    )
+    data = response.to_dict()
+    assert data["error"] == {
+        "engine": "google",
+        "kind": "server",
+        "message": "boom",
+        "retryable": True,
+        "status": 503,
+    }
+    restored = SearchResponse.from_dict(data).error
+    assert (restored.kind, restored.status) == ("server", 503)
+    assert str(restored) == "google 搜索出错（服务端错误）: boom"
+
+
+def test_google_returns_structured_error_without_printing(google_env, capsys):
+    """测试 Google 请求失败时返回结构化的错误，而不是打印消息"""
+    transport = MagicMock()
+    transport.get.return_value = MagicMock(status_code=429, content=b"")
+    engine = GoogleEngine(transport=transport)
+
+    response = engine.search("query", limit=1)
+
+    assert response.results == []
+    assert response.error.kind == "throttled"
+    assert response.error.status == 429
+    assert response.error.retryable
+    assert capsys.readouterr().out == ""
+
+
+def test_duckduckgo_iter_search_raises_search_error():
+    """测试流式搜索出错时抛出 SearchError"""
+
+    class Throttled(Exception):
+        pass
+
+    class Client:
+        def text(self, **kwargs):
+            raise Throttled("202 Ratelimit")
+
+    engine = DuckDuckGoEngine(pool=ClientPool(Client, recycle_on=(Throttled,)))
+    assert engine.search("q").error.kind == "throttled"
+    with pytest.raises(SearchError) as excinfo:
+        list(engine.iter_search("q"))
+    assert excinfo.value.kind == "throttled"
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    """测试连续失败后熔断，冷却期内不调用引擎，试探成功后恢复"""
+    engine = FlakyEngine(failures=3)
+    breaker = CircuitBreaker(threshold=3, cooldown=0.1)
+    guarded = CircuitBreakerSearchEngine(engine, breaker)
+
+    for _ in range(3):
+        assert guarded.search("q").error.kind == "network"
+    assert breaker.state == "open"
+
+    response = guarded.search("q")
+    assert response.error.kind == "circuit_open"
+    assert response.stats.counters == {"circuit_open": 1, "errors": 1}
+    assert engine.calls == 3
+
+    time.sleep(0.12)
+    assert breaker.state == "half_open"
+    assert guarded.search("q").results
+    assert breaker.state == "closed"
+    assert engine.calls == 4
+
+
+def test_breaker_ignores_quota_errors():
+    """测试本地配额错误不计为引擎故障"""
+    breaker = CircuitBreaker(threshold=1)
+    guarded = CircuitBreakerSearchEngine(FlakyEngine(kind="quota"), breaker)
+    guarded.search("q")
+    guarded.search("q")
+    assert breaker.state == "closed"
+
+
+def test_breaker_state_shared_between_processes(tmp_path):
+    """测试熔断状态保存在文件中，另一个进程（新的熔断器实例）同样熔断"""
+    path = tmp_path / "breaker.json"
+    first = CircuitBreaker(2, 60, SharedRateState(path), key="google")
+    first.record_failure()
+    first.record_failure()
+
+    second = CircuitBreaker(2, 60, SharedRateState(path), key="google")
+    assert second.state == "open"
+    assert second.check() > 59
+    assert CircuitBreaker(2, 60, SharedRateState(path), key="other").check() == 0
+
+
+def test_multi_search_reports_engine_errors():
+    """测试多引擎搜索记录各引擎的错误类型，全部失败时整体返回错误"""
+    engines = [FlakyEngine("a"), FlakyEngine("b", failures=0)]
+    response = multi_search(engines, "q")
+    assert response.error is None
+    assert response.engine_meta["a"]["error_kind"] == "network"
+
+    response = multi_search([FlakyEngine("a"), FlakyEngine("b")], "q")
+    assert response.error.engine == "a"
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_cli_breaker_persists_across_runs(mock_create_engine, monkeypatch):
+    """测试 CLI 出错时以非零状态退出，熔断状态跨多次运行保持"""
+    monkeypatch.setenv("MES_BREAKER_THRESHOLD", "2")
+    engine = FlakyEngine("duckduckgo")
+    mock_create_engine.return_value = engine
+
+    for _ in range(3):
+        result = CliRunner().invoke(app, ["search", "query", "--no-cache"])
+        assert result.exit_code == 1
+
+    assert "熔断中" in result.stderr
+    assert engine.calls == 2
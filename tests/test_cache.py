@@ -0,0 +1,230 @@
+"""
+测试搜索结果持久化缓存
+"""
+
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+from multienginesearch.cache import CachedSearchEngine, ResultCache
+from multienginesearch.clientpool import ClientPool
+from multienginesearch.engines import (
+    DuckDuckGoEngine,
+    GoogleEngine,
+    SearchResponse,
+    SearchResult,
+)
+
+
+def _make_engine(name="duckduckgo"):
+    """构造返回固定结果的模拟引擎"""
+    engine = MagicMock()
+    engine.name = name
+    engine.cache_params.return_value = {}
+    engine.search.return_value = SearchResponse(
+        [SearchResult("Title", "http://example.com", "Desc", name)],
+        {"requests_used": 1},
+    )
+    return engine
+
+
+def test_cache_hit_skips_engine(tmp_path):
+    """测试命中缓存时不再调用引擎，且查询字符串被规范化"""
+    engine = _make_engine()
+    cached = CachedSearchEngine(engine, ResultCache(tmp_path / "cache.db"))
+
+    first = cached.search("Python  Tutorial", 5)
+    second = cached.search("python tutorial", 5)
+
+    engine.search.assert_called_once_with("Python  Tutorial", 5, time_filter=None)
+    assert second.results[0].url == first.results[0].url
+    assert second.rate_limit_info is None
+
+    # 不同的 limit 或时间筛选是不同的缓存条目
+    cached.search("python tutorial", 5, time_filter="d")
+    assert engine.search.call_count == 2
+
+
+def test_cache_refresh_and_ttl(tmp_path):
+    """测试 refresh 强制更新，以及过期条目失效"""
+    engine = _make_engine()
+    cache = ResultCache(tmp_path / "cache.db", ttls={"d": 0})
+
+    CachedSearchEngine(engine, cache).search("query", 10)
+    CachedSearchEngine(engine, cache, refresh=True).search("query", 10)
+    assert engine.search.call_count == 2
+
+    CachedSearchEngine(engine, cache).search("query", 10, time_filter="d")
+    CachedSearchEngine(engine, cache).search("query", 10, time_filter="d")
+    assert engine.search.call_count == 4
+
+
+def test_cache_lru_eviction(tmp_path):
+    """测试超过容量上限时淘汰最久未访问的条目"""
+    engine = _make_engine()
+    cached = CachedSearchEngine(engine, ResultCache(tmp_path / "c.db", max_entries=2))
+
+    cached.search("a")
+    cached.search("b")
+    cached.search("a")  # 命中，a 成为最近访问
+    cached.search("c")  # 淘汰 b
+    assert engine.search.call_count == 3
+
+    cached.search("a")
+    assert engine.search.call_count == 3
+    cached.search("b")
+    assert engine.search.call_count == 4
+
+
+def test_cache_drops_legacy_results_table(tmp_path):
+    """测试打开旧版本的缓存文件时删除不再使用的 results 表，区间缓存照常使用"""
+    path = tmp_path / "cache.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE results (key TEXT PRIMARY KEY, payload TEXT)")
+    conn.execute("INSERT INTO results VALUES ('k', '{}')")
+    conn.commit()
+    conn.close()
+
+    engine = _make_engine()
+    cached = CachedSearchEngine(engine, ResultCache(path))
+    cached.search("query")
+    cached.search("query")
+    assert engine.search.call_count == 1
+    cached.cache.close()
+
+    conn = sqlite3.connect(str(path))
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    assert "results" not in tables and "ranges" in tables
+    assert conn.execute("PRAGMA user_version").fetchone() == (1,)
+    conn.close()
+
+
+def test_cache_hit_does_not_use_google_quota(tmp_path, google_env):
+    """测试命中缓存时不消耗 Google 配额"""
+    transport = MagicMock()
+    transport.get.return_value = MagicMock(status_code=200)
+    transport.get.return_value.json.return_value = {
+        "items": [{"title": "T", "link": "http://g.com", "snippet": ""}]
+    }
+    engine = GoogleEngine(transport=transport)
+    cached = CachedSearchEngine(engine, ResultCache(tmp_path / "cache.db"))
+
+    with patch.object(engine, "_update_quota_usage") as mock_update:
+        cached.search("query", 1)
+        cached.search("query", 1)
+
+    assert transport.get.call_count == 1
+    assert mock_update.call_count == 1
+
+
+def test_cache_key_includes_google_cx(tmp_path, google_env, monkeypatch):
+    """测试切换 Google 搜索引擎 ID（CX）后不会命中之前的缓存"""
+    transport = MagicMock()
+    transport.get.return_value = MagicMock(status_code=200)
+    transport.get.return_value.json.return_value = {
+        "items": [{"title": "T", "link": "http://g.com", "snippet": ""}]
+    }
+    cache = ResultCache(tmp_path / "cache.db")
+    CachedSearchEngine(GoogleEngine(transport=transport), cache).search("query", 1)
+
+    monkeypatch.setenv("MES_GOOGLE_SEARCH_ENGINE_ID", "other-cx")
+    engine = GoogleEngine(transport=transport)
+    assert engine.cache_params() == {"cx": "other-cx"}
+    CachedSearchEngine(engine, cache).search("query", 1)
+    assert transport.get.call_count == 2
+
+
+def test_cached_iter_search(tmp_path):
+    """测试流式搜索结果在完整产出后写入缓存"""
+    engine = _make_engine()
+    engine.iter_search.side_effect = lambda *a, **kw: iter(
+        engine.search.return_value.results
+    )
+    cached = CachedSearchEngine(engine, ResultCache(tmp_path / "cache.db"))
+
+    assert [r.url for r in cached.iter_search("query")] == ["http://example.com"]
+    assert [r.url for r in cached.iter_search("query")] == ["http://example.com"]
+    assert cached.search("query").results[0].title == "Title"
+    engine.iter_search.assert_called_once()
+    engine.search.assert_not_called()
+
+
+def _make_ranked_engine(total=100, name="duckduckgo"):
+    """构造按排名返回 http://example.com/<排名> 的模拟引擎，共 total 条结果"""
+    engine = MagicMock()
+    engine.name = name
+    engine.cache_params.return_value = {}
+
+    def search(query, limit=10, time_filter=None, offset=0):
+        return SearchResponse(
+            [
+                SearchResult(f"R{i}", f"http://example.com/{i}", "", name)
+                for i in range(offset, min(offset + limit, total))
+            ]
+        )
+
+    engine.search.side_effect = search
+    engine.resumes_at_offset.return_value = True
+    return engine
+
+
+def test_cache_larger_limit_fetches_only_missing_tail(tmp_path):
+    """测试更大的 limit 只请求缺少的部分，已缓存的区间可按 offset 直接读取"""
+    engine = _make_ranked_engine()
+    cached = CachedSearchEngine(engine, ResultCache(tmp_path / "cache.db"))
+
+    cached.search("query", 10)
+    response = cached.search("query", 30)
+    assert engine.search.call_args.args == ("query", 20)
+    assert engine.search.call_args.kwargs == {"time_filter": None, "offset": 10}
+    assert [r.url for r in response.results] == [
+        f"http://example.com/{i}" for i in range(30)
+    ]
+    assert response.stats.counters["cache_misses"] == 1
+
+    response = cached.search("query", 5, offset=20)
+    assert engine.search.call_count == 2
+    assert response.results[0].url == "http://example.com/20"
+    assert response.stats.counters["cache_hits"] == 1
+
+
+def test_cache_remembers_end_of_results(tmp_path):
+    """测试引擎返回不满的一段后，之后更靠后的请求不再调用引擎"""
+    engine = _make_ranked_engine(total=32)
+    cached = CachedSearchEngine(engine, ResultCache(tmp_path / "cache.db"))
+
+    cached.search("query", 10, offset=20)
+    response = cached.search("query", 10, offset=25)
+    assert engine.search.call_args.kwargs["offset"] == 30
+    assert len(response.results) == 7
+
+    response = cached.search("query", 10, offset=28)
+    assert engine.search.call_count == 2
+    assert [r.url for r in response.results] == [
+        f"http://example.com/{i}" for i in range(28, 32)
+    ]
+
+
+def test_cache_refetches_duckduckgo_from_first_result(tmp_path):
+    """测试 DuckDuckGo 先取 10 条再取 30 条时重新获取整个区间，不会出现重复结果"""
+    calls = []
+
+    class Client:
+        def text(self, max_results, **kwargs):
+            calls.append(max_results)
+            # 每次搜索的排名都会变化：第二次搜索时原来的前 10 条排到了第 11-20 位
+            ranks = list(range(max_results))
+            if len(calls) > 1:
+                ranks = ranks[10:20] + ranks[:10] + ranks[20:]
+            return [{"title": "t", "href": f"https://e.com/{i}"} for i in ranks]
+
+    engine = DuckDuckGoEngine(pool=ClientPool(Client))
+    cached = CachedSearchEngine(engine, ResultCache(tmp_path / "cache.db"))
+
+    assert len(cached.search("query", 10).results) == 10
+    urls = [r.url for r in cached.search("query", 30).results]
+    assert len(set(urls)) == 30
+    assert calls == [10, 30]
+
+    urls = [r.url for r in cached.iter_search("query", 10, offset=20)]
+    assert urls == [f"https://e.com/{i}" for i in range(20, 30)]
+    assert calls == [10, 30]
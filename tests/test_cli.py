@@ -271,3 +271,91 @@ def test_search_output_json(mock_create_engine):
 # 注意：如果还有其他测试用例直接或间接调用了 DuckDuckGoEngine.search，
 # 也需要用类似的方式进行 mock。
 # 例如，如果 test_search_with_time_filter 之前没有 mock，现在也加上了。
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_search_multiple_engines(mock_create_engine):
+    """测试逗号分隔的多引擎搜索"""
+    engines = {}
+    for name in ["google", "duckduckgo"]:
+        mock_engine = MagicMock()
+        mock_engine.name = name
+        mock_engine.search.return_value = SearchResponse(
+            [SearchResult(f"{name} title", f"http://{name}.com", "desc", name)]
+        )
+        engines[name] = mock_engine
+    mock_create_engine.side_effect = lambda name: engines.get(name)
+
+    result = runner.invoke(
+        app, ["search", "multi query", "--engine", "google,duckduckgo"]
+    )
+    assert result.exit_code == 0
+    assert "google title" in result.stdout
+    assert "duckduckgo title" in result.stdout
+    assert "引擎统计" in result.stdout
+    for mock_engine in engines.values():
+        mock_engine.search.assert_called_once_with("multi query", 10, time_filter=None)
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_search_uses_cache(mock_create_engine):
+    """测试重复搜索命中缓存，--refresh 和 --no-cache 会重新搜索"""
+    mock_engine = MagicMock()
+    mock_engine.name = "duckduckgo"
+    mock_engine.cache_params.return_value = {}
+    mock_engine.search.return_value = SearchResponse(
+        [SearchResult("Cached", "http://example.com/c", "desc", "duckduckgo")]
+    )
+    mock_create_engine.return_value = mock_engine
+
+    for args in [[], [], ["--refresh"], ["--no-cache"]]:
+        result = runner.invoke(app, ["search", "cache query", *args])
+        assert result.exit_code == 0
+        assert "Cached" in result.stdout
+
+    assert mock_engine.search.call_count == 3
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_search_output_ndjson(mock_create_engine):
+    """测试 NDJSON 输出逐条使用流式搜索"""
+    import json
+
+    mock_engine = MagicMock()
+    mock_engine.name = "duckduckgo"
+    mock_engine.iter_search.return_value = iter(
+        [
+            SearchResult("Line 1", "http://example.com/1", "d1", "duckduckgo"),
+            SearchResult("Line 2", "http://example.com/2", "d2", "duckduckgo"),
+        ]
+    )
+    mock_create_engine.return_value = mock_engine
+
+    result = runner.invoke(
+        app, ["search", "stream test", "--output", "ndjson", "--no-cache"]
+    )
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [line["title"] for line in lines] == ["Line 1", "Line 2"]
+    mock_engine.iter_search.assert_called_once_with("stream test", 10, time_filter=None)
+    mock_engine.search.assert_not_called()
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_search_with_offset(mock_create_engine):
+    """测试 --offset 传给引擎，从指定排名开始返回结果"""
+    mock_engine = MagicMock()
+    mock_engine.name = "duckduckgo"
+    mock_engine.search.return_value = SearchResponse(
+        [SearchResult("Page Two", "http://example.com/11", "", "duckduckgo")]
+    )
+    mock_create_engine.return_value = mock_engine
+
+    result = runner.invoke(
+        app, ["search", "test query", "--offset", "10", "--no-cache"]
+    )
+    assert result.exit_code == 0
+    assert "Page Two" in result.stdout
+    mock_engine.search.assert_called_once_with(
+        "test query", 10, time_filter=None, offset=10
+    )
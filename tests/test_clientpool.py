@@ -0,0 +1,73 @@
+"""
+测试客户端对象池
+"""
+
+import threading
+import time
+
+import pytest
+
+from multienginesearch.clientpool import ClientPool
+
+
+class FakeClient:
+    """测试用客户端"""
+
+
+class Throttled(Exception):
+    """模拟限流异常"""
+
+
+def test_pool_reuses_clients():
+    """测试串行使用时只创建一个客户端"""
+    pool = ClientPool(FakeClient)
+    seen = set()
+    for _ in range(5):
+        with pool.client() as client:
+            seen.add(id(client))
+    assert len(seen) == 1
+    assert pool.created == 1
+
+
+def test_pool_recycles_unhealthy_clients():
+    """测试限流异常立即淘汰客户端，其它异常连续多次后淘汰"""
+    pool = ClientPool(FakeClient, max_failures=2, recycle_on=(Throttled,))
+
+    with pytest.raises(Throttled):
+        with pool.client():
+            raise Throttled()
+    assert pool.recycled == 1
+    assert pool.size == 0
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            with pool.client():
+                raise ValueError()
+    assert pool.recycled == 2
+    assert pool.created == 2
+
+
+def test_pool_bounds_concurrent_clients():
+    """测试并发借用时客户端数量不超过上限"""
+    pool = ClientPool(FakeClient, max_size=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        with pool.client():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert max(peak) == 2
+    assert pool.created == 2
@@ -192,3 +192,111 @@ def test_search_response_to_dict():
     assert "rate_limit" in response_dict
     assert response_dict["count"] == 2
     assert response_dict["rate_limit"] == rate_limit_info
+
+
+def _fake_google_page(payload, total=100, delay=0.0):
+    """根据 start/num 生成模拟的 Google API 分页响应"""
+    import time
+
+    time.sleep(delay)
+    start, num = payload["start"], payload["num"]
+    stop = min(start - 1 + num, total)
+    items = [
+        {"title": f"Result {i}", "link": f"http://example.com/{i}", "snippet": ""}
+        for i in range(start, stop + 1)
+    ]
+    return {"items": items}, {"requests_used": 1}
+
+
+def test_google_parallel_pages_keep_rank_order(google_env):
+    """测试 Google 分页并发请求且按排名顺序合并"""
+    import time
+    from unittest.mock import patch
+
+    engine = GoogleEngine(page_concurrency=10)
+    with patch.object(
+        engine, "_make_request", side_effect=lambda p: _fake_google_page(p, delay=0.2)
+    ) as mock_request:
+        started = time.monotonic()
+        response = engine.search("test query", limit=45)
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 0.8  # 5 页串行至少需要 1 秒
+    assert mock_request.call_count == 5
+    assert [r.url for r in response.results] == [
+        f"http://example.com/{i}" for i in range(1, 46)
+    ]
+    assert mock_request.call_args_list[-1].args[0]["num"] == 5
+
+
+def test_google_parallel_pages_stop_after_short_page(google_env):
+    """测试遇到不满的一页后丢弃后续分页结果"""
+    from unittest.mock import patch
+
+    engine = GoogleEngine(page_concurrency=2)
+    with patch.object(
+        engine, "_make_request", side_effect=lambda p: _fake_google_page(p, total=15)
+    ):
+        response = engine.search("test query", limit=50)
+
+    assert len(response.results) == 15
+    assert response.results[-1].url == "http://example.com/15"
+
+
+def test_google_iter_search_streams_first_page(google_env):
+    """测试流式搜索在第一页到达后立即产出结果"""
+    import time
+    from unittest.mock import patch
+
+    def fake_request(payload):
+        # 第一页很快返回，后续分页较慢
+        delay = 0.0 if payload["start"] == 1 else 0.5
+        return _fake_google_page(payload, delay=delay)
+
+    engine = GoogleEngine(page_concurrency=1)
+    with patch.object(engine, "_make_request", side_effect=fake_request):
+        started = time.monotonic()
+        results = engine.iter_search("test query", limit=30)
+        first = next(results)
+        first_elapsed = time.monotonic() - started
+        rest = list(results)
+
+    assert first_elapsed < 0.3
+    assert first.url == "http://example.com/1"
+    assert len(rest) == 29
+
+
+def test_google_refunds_quota_for_failed_requests(google_env):
+    """测试请求失败时退还预占的配额，且不超过每日限额"""
+    from unittest.mock import MagicMock
+
+    transport = MagicMock()
+    transport.get.return_value = MagicMock(status_code=500)
+    engine = GoogleEngine(transport=transport)
+    engine.search("query", limit=1)
+    assert engine.quota_store.snapshot()["requests_used"] == 0
+
+    transport.get.return_value = MagicMock(status_code=200)
+    transport.get.return_value.json.return_value = {"items": []}
+    engine.quota_store.daily_limit = 1
+    engine.search("query", limit=1)
+    response = engine.search("query", limit=1)
+    assert response.results == []
+    assert transport.get.call_count == 2
+    assert engine.quota_store.snapshot()["requests_used"] == 1
+
+
+def test_google_offset_starts_at_requested_rank(google_env):
+    """测试 Google 按 offset 直接从对应的 start 索引请求，且不超过前 100 条"""
+    from unittest.mock import patch
+
+    engine = GoogleEngine(page_concurrency=1)
+    with patch.object(
+        engine, "_make_request", side_effect=lambda p: _fake_google_page(p)
+    ) as mock_request:
+        response = engine.search("test query", limit=15, offset=10)
+
+    assert [p.args[0]["start"] for p in mock_request.call_args_list] == [11, 21]
+    assert response.results[0].url == "http://example.com/11"
+    assert len(response.results) == 15
+    assert engine._plan_pages(10, offset=95) == [(96, 5)]
@@ -0,0 +1,173 @@
+"""
+测试结果页面抓取
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from multienginesearch.cli import app
+from multienginesearch.engines import SearchResult
+from multienginesearch.fetch import PageFetcher, TextExtractor
+from multienginesearch.metrics import SearchStats, collecting
+
+runner = CliRunner()
+
+PAGE = (
+    "<html><head><title>忽略</title><style>p {color: red}</style></head>"
+    "<body><h1>标题</h1><script>var x = 1;</script>"
+    "<p>第一段  <b>加粗</b>文字</p><p>第二段 &amp; 实体</p></body></html>"
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            self._respond()
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def _respond(self):
+        if self.path.startswith("/slow"):
+            time.sleep(0.2)
+        if self.path == "/busy":
+            self.send_response(503)
+            self.send_header("Retry-After", "120")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/missing":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/image":
+            body, content_type = b"\x89PNG", "image/png"
+        elif self.path == "/big":
+            body = ("<p>" + "x" * 1000 + "</p>") * 1000
+            body, content_type = body.encode("utf-8"), "text/html"
+        elif self.path == "/gbk":
+            body = '<meta charset="gbk"><p>中文页面</p>'.encode("gbk")
+            content_type = "text/html"
+        else:
+            body, content_type = PAGE.encode("utf-8"), "text/html; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    _Handler.active = _Handler.max_active = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_text_extractor_skips_scripts_and_limits_size():
+    """测试正文提取忽略脚本和样式，按块换行，并在字符上限处截断"""
+    extractor = TextExtractor()
+    for i in range(0, len(PAGE), 7):
+        extractor.feed(PAGE[i : i + 7])
+    extractor.close()
+    assert extractor.text() == "标题\n第一段 加粗文字\n第二段 & 实体"
+
+    extractor = TextExtractor(max_chars=5)
+    extractor.feed("<p>0123456789</p>")
+    assert extractor.full
+    assert extractor.text() == "01234"
+
+
+def test_fetch_results_attaches_content_in_order(site):
+    """测试并发抓取后按输入顺序产出结果，失败的页面 content 为 None"""
+    results = [
+        SearchResult("慢", f"{site}/slow", "", "duckduckgo"),
+        SearchResult("正常", f"{site}/page", "", "duckduckgo"),
+        SearchResult("不存在", f"{site}/missing", "", "duckduckgo"),
+        SearchResult("图片", f"{site}/image", "", "duckduckgo"),
+        SearchResult("编码", f"{site}/gbk", "", "duckduckgo"),
+        SearchResult("无链接", "", "", "duckduckgo"),
+    ]
+    fetcher = PageFetcher(concurrency=4)
+    stats = SearchStats("duckduckgo")
+    with collecting(stats):
+        fetched = list(fetcher.fetch_results(results))
+
+    assert [r.title for r in fetched] == [r.title for r in results]
+    assert fetched[0].content == "标题\n第一段 加粗文字\n第二段 & 实体"
+    assert fetched[2].content is None and fetched[3].content is None
+    assert fetched[4].content == "中文页面"
+    assert stats.counters["pages_fetched"] == 3
+    assert stats.counters["fetch_errors"] == 2
+    assert stats.timings["fetch"] > 0
+
+
+def test_fetch_limits_bytes_and_connections_per_host(site):
+    """测试每个页面的读取字节数上限，以及每个主机的同时连接数上限"""
+    fetcher = PageFetcher(concurrency=8, per_host=2, max_bytes=10 * 1024)
+    stats = SearchStats()
+    with collecting(stats):
+        content = fetcher.fetch(f"{site}/big")
+    assert 9000 < len(content) <= 10 * 1024
+    assert stats.counters["fetch_bytes"] == 10 * 1024
+
+    results = [SearchResult(str(i), f"{site}/slow/{i}", "", "google") for i in range(6)]
+    fetched = list(fetcher.fetch_results(results))
+    assert all(r.content for r in fetched)
+    assert _Handler.max_active == 2
+
+
+def test_fetch_does_not_wait_for_retry_after(site):
+    """测试 503 的 Retry-After 不会让页面抓取超过耗时上限"""
+    fetcher = PageFetcher(timeout=1.0)
+    results = [SearchResult("忙", f"{site}/busy", "", "x")]
+
+    started = time.monotonic()
+    (result,) = fetcher.fetch_results(results)
+    assert time.monotonic() - started < 1.0
+    assert result.content is None
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_cli_search_fetch_streams_ndjson(mock_create_engine, site):
+    """测试 mes search --fetch -o ndjson 输出带 content 的结果"""
+    engine = MagicMock()
+    engine.name = "duckduckgo"
+    engine.iter_search.side_effect = lambda *a, **kw: iter(
+        [SearchResult("Page", f"{site}/page", "", "duckduckgo")]
+    )
+    mock_create_engine.return_value = engine
+
+    result = runner.invoke(
+        app, ["search", "query", "--fetch", "-o", "ndjson", "--no-cache", "--stats"]
+    )
+    assert result.exit_code == 0
+    record = json.loads(result.stdout.splitlines()[0])
+    assert record["content"].startswith("标题")
+    assert "抓取页面 1" in result.stderr
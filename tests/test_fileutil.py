@@ -0,0 +1,54 @@
+"""
+测试状态文件的公共读写工具
+"""
+
+import os
+import threading
+
+import pytest
+
+from multienginesearch._fileutil import locked, write_atomic
+
+
+def test_write_atomic_replaces_text_and_bytes(tmp_path):
+    """测试原子写入文本和字节内容，并自动创建目录"""
+    path = tmp_path / "sub" / "state.json"
+    write_atomic(path, "{}")
+    assert path.read_text(encoding="utf-8") == "{}"
+    write_atomic(path, b"\x00\x01")
+    assert path.read_bytes() == b"\x00\x01"
+    assert os.listdir(path.parent) == ["state.json"]
+
+
+def test_write_atomic_keeps_old_content_on_failure(tmp_path, monkeypatch):
+    """测试重命名失败时保留原文件并删除临时文件"""
+    path = tmp_path / "state.json"
+    path.write_text("old", encoding="utf-8")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        write_atomic(path, "new")
+    assert path.read_text(encoding="utf-8") == "old"
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_locked_serializes_threads(tmp_path):
+    """测试同一把线程锁和文件锁下的读改写不会丢失更新"""
+    path = tmp_path / "counter"
+    path.write_text("0")
+    thread_lock = threading.Lock()
+
+    def bump():
+        for _ in range(50):
+            with locked(tmp_path / "counter.lock", thread_lock):
+                path.write_text(str(int(path.read_text()) + 1))
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert path.read_text() == "200"
@@ -0,0 +1,272 @@
+"""
+测试对冲请求和单引擎截止时间
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from multienginesearch.cli import app
+from multienginesearch.engines import (
+    GoogleEngine,
+    SearchEngine,
+    SearchResponse,
+    SearchResult,
+)
+from multienginesearch.hedge import (
+    HedgedSearchEngine,
+    LatencyTracker,
+    parse_engine_deadlines,
+)
+from multienginesearch.metrics import SearchStats
+
+
+class SlowEngine(SearchEngine):
+    """按调用顺序依次等待 delays 中的秒数后返回结果的测试引擎"""
+
+    def __init__(self, name, delays):
+        self._name = name
+        self.delays = list(delays)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self._name
+
+    def search(self, query, limit=10, time_filter=None):
+        with self._lock:
+            delay = self.delays[min(self.calls, len(self.delays) - 1)]
+            self.calls += 1
+        time.sleep(delay)
+        return SearchResponse(
+            [
+                SearchResult(
+                    query, f"https://{self.name}.example/{delay}", "", self.name
+                )
+            ],
+            stats=SearchStats(self.name),
+        )
+
+
+def _tracker(engine="slow", latency=0.05):
+    tracker = LatencyTracker()
+    for _ in range(10):
+        tracker.record(engine, latency)
+    return tracker
+
+
+def test_parse_engine_deadlines():
+    """测试解析每引擎截止时间"""
+    assert parse_engine_deadlines(None) == {}
+    assert parse_engine_deadlines("5, Google=2.5") == {"*": 5.0, "google": 2.5}
+    with pytest.raises(ValueError):
+        parse_engine_deadlines("google=0")
+    with pytest.raises(ValueError):
+        parse_engine_deadlines("google=fast")
+
+
+def test_latency_tracker_percentile_and_persistence(tmp_path):
+    """测试分位数估计、样本窗口和跨进程持久化"""
+    path = tmp_path / "latency.json"
+    tracker = LatencyTracker(path, window=20)
+    for i in range(1, 4):
+        tracker.record("google", i / 10)
+    assert tracker.percentile("google") is None
+
+    for i in range(4, 31):
+        tracker.record("google", i / 10)
+    assert len(tracker.samples("google")) == 20
+    assert tracker.percentile("google") == 2.9
+    assert tracker.percentile("google", 0.5) == 2.0
+
+    assert LatencyTracker(path).samples("google") == tracker.samples("google")
+
+
+def test_hedge_to_secondary_engine_after_p95():
+    """测试超过近期 p95 耗时后向备用引擎发出对冲请求，取先返回的结果"""
+    primary = SlowEngine("slow", [1.0])
+    secondary = SlowEngine("fast", [0.0])
+    engine = HedgedSearchEngine(primary, _tracker(), deadline=5, hedge_engine=secondary)
+
+    started = time.monotonic()
+    response = engine.search("query")
+
+    assert time.monotonic() - started < 0.5
+    assert response.results[0].engine == "fast"
+    assert response.stats.counters["hedges"] == 1
+    assert secondary.calls == 1
+
+
+def test_no_hedge_without_history_or_when_fast():
+    """测试历史样本不足或引擎及时返回时不发出对冲请求"""
+    engine = SlowEngine("slow", [0.2])
+    response = HedgedSearchEngine(engine, LatencyTracker(), hedge=True).search("q")
+    assert engine.calls == 1
+    assert "hedges" not in response.stats.counters
+
+    engine = SlowEngine("slow", [0.0])
+    tracker = _tracker(latency=0.5)
+    HedgedSearchEngine(engine, tracker, hedge=True).search("q")
+    assert engine.calls == 1
+    assert len(tracker.samples("slow")) == 11
+
+
+def test_deadline_returns_empty_with_timeout():
+    """测试超过截止时间时不再等待，返回空结果并记录超时"""
+    engine = HedgedSearchEngine(SlowEngine("slow", [1.0]), LatencyTracker(), 0.1)
+
+    started = time.monotonic()
+    response = engine.search("query")
+
+    assert time.monotonic() - started < 0.5
+    assert response.results == []
+    assert response.stats.counters == {"timeouts": 1, "errors": 1}
+    assert engine.tracker.samples("slow")[0] >= 0.1
+
+
+def test_deadline_does_not_delay_process_exit():
+    """测试超过截止时间后丢弃的请求不会让进程在退出时等待"""
+    script = (
+        "import time\n"
+        "from multienginesearch.engines import SearchEngine, SearchResponse\n"
+        "from multienginesearch.hedge import HedgedSearchEngine, LatencyTracker\n"
+        "class Hang(SearchEngine):\n"
+        "    name = 'hang'\n"
+        "    def search(self, query, limit=10, time_filter=None):\n"
+        "        time.sleep(10)\n"
+        "        return SearchResponse([])\n"
+        "response = HedgedSearchEngine(Hang(), LatencyTracker(), 0.2).search('q')\n"
+        "print(response.error.kind)\n"
+    )
+    env = dict(os.environ)
+    src = str(Path(__file__).resolve().parent.parent / "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+    started = time.monotonic()
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=30,
+        check=True,
+    )
+    assert result.stdout.strip() == "timeout"
+    assert time.monotonic() - started < 5
+
+
+def test_async_hedge_duplicates_request():
+    """测试异步搜索的重复对冲请求"""
+    primary = SlowEngine("slow", [1.0, 0.0])
+    engine = HedgedSearchEngine(primary, _tracker(), deadline=5, hedge=True)
+
+    response = asyncio.run(engine.asearch("query"))
+
+    assert response.results[0].url == "https://slow.example/0.0"
+    assert primary.calls == 2
+
+
+def test_google_hedges_count_toward_quota(google_env):
+    """测试对冲的 Google 请求各自预占配额，落后的请求失败后退还"""
+    calls = []
+    release = threading.Event()
+
+    def get(url, params=None):
+        calls.append(params["start"])
+        status = 200
+        if len(calls) == 1:
+            release.wait(2)
+            status = 500
+        response = MagicMock(status_code=status, content=b"")
+        response.json.return_value = {
+            "items": [{"title": "t", "link": f"https://e.com/{len(calls)}"}]
+        }
+        return response
+
+    transport = MagicMock()
+    transport.get.side_effect = get
+    google = GoogleEngine(transport=transport)
+    engine = HedgedSearchEngine(google, _tracker("google"), deadline=5, hedge=True)
+
+    response = engine.search("query", limit=1)
+    assert response.results[0].url == "https://e.com/2"
+    # 落后的请求仍在进行中，它预占的配额保留到请求结束
+    assert google.quota_store.snapshot()["requests_used"] == 2
+
+    release.set()
+    for _ in range(50):
+        if google.quota_store.snapshot()["requests_used"] == 1:
+            break
+        time.sleep(0.02)
+    assert google.quota_store.snapshot()["requests_used"] == 1
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_cli_search_deadline(mock_create_engine):
+    """测试 --deadline 限制单引擎搜索的耗时"""
+    mock_create_engine.return_value = SlowEngine("duckduckgo", [1.0])
+
+    result = CliRunner().invoke(
+        app, ["search", "query", "--no-cache", "--deadline", "duckduckgo=0.1"]
+    )
+
+    assert result.exit_code == 1
+    assert "duckduckgo 搜索出错（超时）" in result.stderr
+    assert "没有找到搜索结果" not in result.stdout
+
+    result = CliRunner().invoke(app, ["search", "query", "--deadline", "x=-1"])
+    assert result.exit_code == 1
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_cli_search_without_hedge_options_is_not_wrapped(
+    mock_create_engine, monkeypatch, tmp_path
+):
+    """测试没有指定 --hedge、--hedge-to 或 --deadline 时不包装引擎，也不记录耗时"""
+    latency = tmp_path / "latency.json"
+    monkeypatch.setenv("MES_LATENCY_PATH", str(latency))
+    mock_create_engine.side_effect = lambda name: SlowEngine(name, [0.0])
+
+    result = CliRunner().invoke(app, ["search", "q", "--no-cache"])
+    assert result.exit_code == 0
+    assert not latency.exists()
+
+    result = CliRunner().invoke(app, ["search", "q", "--no-cache", "--hedge"])
+    assert result.exit_code == 0
+    assert latency.exists()
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_cli_hedged_secondary_answer_is_not_cached_for_primary(
+    mock_create_engine, monkeypatch, tmp_path
+):
+    """测试备用引擎先返回的结果不会按主引擎缓存，之后不对冲的搜索得到主引擎的结果"""
+    latency = tmp_path / "latency.json"
+    latency.write_text('{"google": [0.01, 0.01, 0.01, 0.01, 0.01]}')
+    monkeypatch.setenv("MES_LATENCY_PATH", str(latency))
+    mock_create_engine.side_effect = lambda name: SlowEngine(
+        name, [1.0] if name == "google" else [0.0]
+    )
+
+    runner = CliRunner()
+    result = runner.invoke(
+        app, ["search", "q", "-e", "google", "--hedge-to", "duckduckgo"]
+    )
+    assert result.exit_code == 0
+    assert "duckduckgo.example" in result.stdout
+
+    result = runner.invoke(app, ["search", "q", "-e", "google", "-o", "json"])
+    assert result.exit_code == 0
+    assert "google.example" in result.stdout
+    assert "duckduckgo.example" not in result.stdout
+
+    result = runner.invoke(app, ["history", "list"])
+    assert "duckduckgo  q" in result.stdout
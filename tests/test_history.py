@@ -0,0 +1,128 @@
+"""
+测试本地搜索历史
+"""
+
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from multienginesearch.cli import app
+from multienginesearch.engines import SearchResponse, SearchResult
+from multienginesearch.history import SearchHistory, parse_time_bound
+
+runner = CliRunner()
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = SearchHistory(tmp_path / "history.db")
+    yield history
+    history.close()
+
+
+def test_search_matches_keywords_in_title_description_and_url(history):
+    """测试关键词匹配标题、摘要和 URL，中文短词也能匹配，结果需包含全部关键词"""
+    history.record(
+        "机器学习",
+        "google",
+        [
+            SearchResult(
+                "机器学习入门教程", "https://a.com/ml", "Python 教程", "google"
+            ),
+            SearchResult("Deep Learning", "https://b.com/dl", "neural nets", "google"),
+        ],
+    )
+    history.record(
+        "rust",
+        "duckduckgo",
+        [SearchResult("The Rust Book", "https://doc.rust-lang.org", "", "duckduckgo")],
+    )
+
+    assert [h.result.url for h in history.search("机器")] == ["https://a.com/ml"]
+    assert [h.result.url for h in history.search("python 教程")] == ["https://a.com/ml"]
+    assert [h.result.url for h in history.search("rust-lang")] == [
+        "https://doc.rust-lang.org"
+    ]
+    assert [h.result.url for h in history.search("NEURAL")] == ["https://b.com/dl"]
+    assert history.search("python rust") == []
+    assert [h.result.url for h in history.search("learning", engine="duckduckgo")] == []
+
+
+def test_search_filters_by_time_and_keeps_latest_occurrence(history):
+    """测试按时间范围查找，同一 URL 默认只返回最近一次出现"""
+    now = 1_750_000_000.0
+    result = SearchResult("Python 新闻", "https://news.com/py", "", "google")
+    history.record("python", "google", [result], searched_at=now - 10 * DAY)
+    history.record(
+        "python news",
+        "google",
+        [result],
+        time_filter="w",
+        offset=3,
+        searched_at=now - DAY,
+    )
+
+    hits = history.search("python")
+    assert len(hits) == 1
+    assert (hits[0].query, hits[0].rank, hits[0].time_filter) == ("python news", 3, "w")
+    assert len(history.search("python", unique=False)) == 2
+
+    old = history.search("python", until=now - 5 * DAY)
+    assert [h.query for h in old] == ["python"]
+    assert history.search("python", since=now) == []
+    assert [h.query for h in history.search("", query="Python")] == ["python"]
+
+    assert history.clear(before=now - 5 * DAY) == 1
+    assert [e.query for e in history.searches()] == ["python news"]
+    assert len(history.search("python", unique=False)) == 1
+
+
+def test_parse_time_bound():
+    """测试相对时间和 ISO 日期的解析"""
+    assert parse_time_bound("7d", now=1000.0 + 7 * DAY) == 1000.0
+    assert parse_time_bound("12h", now=50_000.0) == 50_000.0 - 12 * 3600
+    assert parse_time_bound("2025-06-01") == datetime(2025, 6, 1).timestamp()
+    with pytest.raises(ValueError, match="无效的时间"):
+        parse_time_bound("yesterday")
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_cli_search_records_history(mock_create_engine):
+    """测试 mes search 的结果记入历史，mes history search 可以离线查到"""
+    engine = MagicMock()
+    engine.name = "duckduckgo"
+    engine.search.return_value = SearchResponse(
+        [
+            SearchResult(
+                "异步编程指南", "https://example.com/async", "asyncio", "duckduckgo"
+            )
+        ]
+    )
+    mock_create_engine.return_value = engine
+
+    assert runner.invoke(app, ["search", "python asyncio", "--no-cache"]).exit_code == 0
+    assert (
+        runner.invoke(app, ["search", "不记录", "--no-cache", "--no-history"]).exit_code
+        == 0
+    )
+    engine.search.reset_mock()
+
+    result = runner.invoke(app, ["history", "search", "异步", "-o", "ndjson"])
+    assert result.exit_code == 0
+    record = json.loads(result.stdout.splitlines()[0])
+    assert record["url"] == "https://example.com/async"
+    assert record["query"] == "python asyncio"
+    engine.search.assert_not_called()
+
+    result = runner.invoke(app, ["history", "list", "--since", "1h"])
+    assert result.exit_code == 0
+    assert "python asyncio" in result.stdout
+    assert "不记录" not in result.stdout
+
+    result = runner.invoke(app, ["history", "search", "--since", "soon"])
+    assert result.exit_code == 1
@@ -0,0 +1,94 @@
+"""
+测试进程内记忆化和并发请求合并
+"""
+
+import threading
+import time
+
+from multienginesearch.engines import SearchEngine, SearchResponse, SearchResult
+from multienginesearch.memo import LRUCache, MemoizedSearchEngine, SingleFlight
+
+
+class CountingEngine(SearchEngine):
+    """记录调用次数的慢速测试引擎"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return "counting"
+
+    def search(self, query, limit=10, time_filter=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return SearchResponse([SearchResult(query, "http://example.com", "", "x")])
+
+
+def test_lru_cache_eviction():
+    """测试 LRU 淘汰顺序"""
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2
+
+
+def test_single_flight_shares_result_and_error():
+    """测试并发的相同调用只执行一次，异常同样被共享"""
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("upstream failed")
+
+    errors = []
+
+    def worker():
+        try:
+            flight.do("key", slow)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(errors) == 5
+
+
+def test_memoized_engine_coalesces_concurrent_queries():
+    """测试多个线程同时搜索相同查询时只产生一次上游请求"""
+    engine = CountingEngine(delay=0.2)
+    memo = MemoizedSearchEngine(engine, cache=LRUCache(), flight=SingleFlight())
+    responses = []
+
+    threads = [
+        threading.Thread(target=lambda: responses.append(memo.search("Same Query")))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert engine.calls == 1
+    assert len(responses) == 8
+    assert all(r.results[0].title == "Same Query" for r in responses)
+
+    # 之后的请求直接命中内存缓存；不同的 limit 是不同的请求
+    memo.search("same query")
+    assert engine.calls == 1
+    memo.search("same query", limit=5)
+    assert engine.calls == 2
@@ -0,0 +1,105 @@
+"""
+测试 URL 规范化和多引擎结果融合
+"""
+
+import time
+
+import pytest
+
+from multienginesearch.engines import SearchResult
+from multienginesearch.merge import (
+    canonicalize_url,
+    fuse_results,
+    parse_engine_weights,
+)
+
+
+def _results(engine, urls):
+    return [SearchResult(f"{engine} {url}", url, "", engine) for url in urls]
+
+
+def test_canonicalize_url_equivalent_forms():
+    """测试同一页面的不同写法规范化为相同的 URL"""
+    forms = [
+        "https://example.com/page",
+        "http://www.example.com/page/",
+        "HTTPS://Example.COM:443/page?utm_source=x&utm_medium=y#section",
+        " http://example.com:80/page?fbclid=abc ",
+    ]
+    assert {canonicalize_url(url) for url in forms} == {"https://example.com/page"}
+
+
+def test_canonicalize_url_keeps_meaningful_parts():
+    """测试路径大小写、非默认端口和普通查询参数被保留，参数顺序无关"""
+    assert canonicalize_url("https://example.com/Page") != canonicalize_url(
+        "https://example.com/page"
+    )
+    assert canonicalize_url("http://example.com:8080/") == "https://example.com:8080"
+    assert canonicalize_url("https://example.com/s?b=2&a=1") == canonicalize_url(
+        "https://example.com/s?a=1&b=2&utm_campaign=z"
+    )
+    assert canonicalize_url("ftp://example.com/file") == "ftp://example.com/file"
+    assert canonicalize_url("not a url") == "not a url"
+
+
+def test_fuse_results_dedups_and_ranks():
+    """测试跨引擎去重，且被多个引擎返回的页面排在前面"""
+    google = _results("google", ["https://a.com", "https://b.com", "https://c.com"])
+    ddg = _results("duckduckgo", ["http://www.c.com/", "https://d.com"])
+
+    fused = fuse_results([google, ddg])
+
+    assert [canonicalize_url(r.url) for r in fused] == [
+        "https://c.com",
+        "https://a.com",
+        "https://b.com",
+        "https://d.com",
+    ]
+    assert fused[0].sources == [("google", 3), ("duckduckgo", 1)]
+    assert fused[0].score == pytest.approx(1 / 63 + 1 / 61)
+    # 标题和 URL 取自排名贡献最大的引擎
+    assert fused[0].engine == "duckduckgo"
+    assert fused[0].url == "http://www.c.com/"
+    # 不修改输入
+    assert google[2].sources is None
+
+
+def test_fuse_results_weights_and_in_list_duplicates():
+    """测试引擎权重，以及同一列表中的重复页面只计一次"""
+    google = _results("google", ["https://a.com", "https://a.com/", "https://b.com"])
+    ddg = _results("duckduckgo", ["https://c.com"])
+
+    fused = fuse_results([google, ddg], weights={"duckduckgo": 3})
+
+    assert [r.url for r in fused] == ["https://c.com", "https://a.com", "https://b.com"]
+    assert fused[1].sources == [("google", 1)]
+    assert fused[2].sources == [("google", 3)]
+
+
+def test_fuse_results_scales_linearly():
+    """测试数万条结果的融合仍然很快"""
+    lists = [
+        _results(engine, [f"https://site{i % 5000}.com/{i}" for i in range(10000)])
+        for engine in ("google", "duckduckgo", "bing")
+    ]
+    started = time.monotonic()
+    fused = fuse_results(lists)
+    assert time.monotonic() - started < 2.0
+    assert len(fused) == 10000
+    assert all(len(r.sources) == 3 for r in fused[:10])
+
+
+def test_parse_engine_weights():
+    """测试引擎权重解析"""
+    assert parse_engine_weights(None) == {}
+    assert parse_engine_weights("Google=2, duckduckgo=0.5") == {
+        "google": 2.0,
+        "duckduckgo": 0.5,
+    }
+    with pytest.raises(ValueError):
+        parse_engine_weights("google")
+    with pytest.raises(ValueError):
+        parse_engine_weights("google=-1")
+    assert parse_engine_weights({"Google": 2}) == {"google": 2.0}
+    with pytest.raises(ValueError, match="负数"):
+        parse_engine_weights({"google": -1})
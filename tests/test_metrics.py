@@ -0,0 +1,251 @@
+"""
+测试搜索计量和 Prometheus 指标输出
+"""
+
+from unittest.mock import MagicMock, patch
+
+from typer.testing import CliRunner
+
+from multienginesearch.cache import CachedSearchEngine, ResultCache
+from multienginesearch.cli import app
+from multienginesearch.engines import (
+    GoogleEngine,
+    SearchEngine,
+    SearchResponse,
+    SearchResult,
+)
+from multienginesearch.memo import LRUCache, MemoizedSearchEngine, SingleFlight
+from multienginesearch.metrics import (
+    MetricsRegistry,
+    SearchStats,
+    collecting,
+    format_stats,
+)
+from multienginesearch.multi import multi_search
+from multienginesearch.transport import HttpTransport
+
+
+class StaticEngine(SearchEngine):
+    """返回固定结果的测试引擎，每次搜索带上一份计量数据"""
+
+    def __init__(self, name="static", fail=False):
+        self._name = name
+        self.fail = fail
+        self.calls = 0
+
+    @property
+    def name(self):
+        return self._name
+
+    def search(self, query, limit=10, time_filter=None):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("boom")
+        stats = SearchStats(self.name)
+        stats.add_page(0.01)
+        stats.incr("requests")
+        return SearchResponse(
+            [SearchResult(query, f"https://{self.name}.example/1", "", self.name)],
+            stats=stats,
+        )
+
+
+def _google_transport(total=100):
+    """按 start/num 返回分页结果的模拟传输对象，每页正文 100 字节"""
+
+    def get(url, params=None):
+        start, num = params["start"], params["num"]
+        stop = min(start - 1 + num, total)
+        response = MagicMock(status_code=200, content=b"x" * 100)
+        response.json.return_value = {
+            "items": [
+                {"title": f"R{i}", "link": f"https://example.com/{i}", "snippet": ""}
+                for i in range(start, stop + 1)
+            ]
+        }
+        return response
+
+    transport = MagicMock()
+    transport.get.side_effect = get
+    return transport
+
+
+def test_stats_combine_and_to_dict():
+    """测试多引擎计量数据的汇总和字典输出"""
+    google, ddg = SearchStats("google"), SearchStats("duckduckgo")
+    google.add_page(0.2)
+    google.add_page(0.1)
+    google.incr("bytes_received", 2048)
+    ddg.add_page(0.3)
+    ddg.incr("errors")
+
+    stats = SearchStats.combine({"google": google, "duckduckgo": ddg})
+    stats.add_time("format", 0.005)
+
+    assert abs(stats.total_time("network") - 0.6) < 1e-9
+    assert stats.total_count("errors") == 1
+    data = stats.to_dict()
+    assert data["timings_ms"] == {"format": 5.0}
+    assert data["engines"]["google"]["pages_ms"] == [200.0, 100.0]
+    assert data["engines"]["google"]["counters"] == {"bytes_received": 2048}
+
+    text = format_stats(stats)
+    assert "google: 网络 300.0ms" in text
+    assert "分页: 2 页 (200.0/100.0 ms)" in text
+    assert "接收字节 2.0 KB" in text
+    assert "其它: 格式化 5.0ms" in text
+
+
+def test_google_search_records_pages_and_bytes(google_env):
+    """测试 Google 并发分页的每页耗时、请求数和字节数都计入本次搜索"""
+    engine = GoogleEngine(page_concurrency=3, transport=_google_transport())
+
+    response = engine.search("query", limit=25)
+
+    stats = response.stats
+    assert len(response.results) == 25
+    assert stats.engine == "google"
+    assert len(stats.pages) == 3
+    assert stats.counters["requests"] == 3
+    assert stats.counters["bytes_received"] == 300
+    assert "parse" in stats.timings
+
+
+def test_google_search_counts_errors(google_env):
+    """测试搜索出错时记录错误次数"""
+    transport = MagicMock()
+    transport.get.return_value = MagicMock(status_code=500, content=b"")
+    engine = GoogleEngine(transport=transport)
+
+    response = engine.search("query", limit=5)
+
+    assert response.results == []
+    assert response.stats.counters["errors"] == 1
+
+
+def test_transport_retries_recorded_in_current_search():
+    """测试传输层的重试计入当前正在计量的搜索"""
+    transport = HttpTransport(sleep=lambda delay: None)
+    failed = MagicMock(status_code=503, headers={})
+    transport.session = MagicMock()
+    transport.session.get.side_effect = [failed, failed, MagicMock(status_code=200)]
+
+    stats = SearchStats("test")
+    with collecting(stats):
+        transport.get("http://example.com/")
+    assert stats.counters["retries"] == 2
+
+    # 没有正在计量的搜索时不记录
+    transport.session.get.side_effect = [failed, MagicMock(status_code=200)]
+    transport.get("http://example.com/")
+    assert stats.counters["retries"] == 2
+
+
+def test_cache_hits_and_misses(tmp_path):
+    """测试缓存包装器记录命中和未命中"""
+    engine = CachedSearchEngine(StaticEngine(), ResultCache(str(tmp_path / "c.db")))
+
+    miss = engine.search("query")
+    hit = engine.search("query")
+
+    assert miss.stats.counters == {"requests": 1, "cache_misses": 1}
+    assert hit.stats.counters == {"cache_hits": 1}
+    assert "network" not in hit.stats.timings
+    assert "cache" in hit.stats.timings
+
+
+def test_memo_hit_does_not_repeat_upstream_stats():
+    """测试内存缓存命中时不重复计入上游的请求"""
+    engine = MemoizedSearchEngine(StaticEngine(), LRUCache(), SingleFlight())
+
+    first = engine.search("query")
+    second = engine.search("query")
+
+    assert first.stats.counters == {"requests": 1}
+    assert second.stats.counters == {"memo_hits": 1}
+
+
+def test_multi_search_keeps_per_engine_stats():
+    """测试多引擎搜索保留每个引擎的计量数据，出错的引擎计一次错误"""
+    engines = [StaticEngine("a"), StaticEngine("b", fail=True)]
+
+    response = multi_search(engines, "query")
+
+    stats = response.stats
+    assert set(stats.engines) == {"a", "b"}
+    assert stats.engines["a"].counters == {"requests": 1}
+    assert stats.engines["b"].counters == {"errors": 1}
+    assert "merge" in stats.timings
+
+
+def test_registry_renders_prometheus_text():
+    """测试注册表按引擎累计并输出 Prometheus 文本格式"""
+    registry = MetricsRegistry()
+    for _ in range(2):
+        google = SearchStats("google")
+        google.add_page(0.25)
+        google.incr("requests")
+        google.incr("retries")
+        registry.observe(SearchStats.combine({"google": google}))
+
+    text = registry.render()
+
+    assert 'mes_searches_total{engine="google"} 2' in text
+    assert 'mes_phase_seconds_sum{engine="google",phase="network"} 0.500000' in text
+    assert 'mes_phase_seconds_count{engine="google",phase="network"} 2' in text
+    assert 'mes_page_seconds_count{engine="google"} 2' in text
+    assert 'mes_retries_total{engine="google"} 2' in text
+    assert "# TYPE mes_requests_total counter" in text
+    assert text.endswith("\n")
+    assert MetricsRegistry.parse(text).render() == text
+
+
+def test_registry_write_accumulates_existing_file(tmp_path):
+    """测试 accumulate 写入时累加文件中已有的数据，计数器在多次运行之间不回退"""
+    path = str(tmp_path / "mes.prom")
+    for _ in range(2):
+        registry = MetricsRegistry()
+        stats = SearchStats("google")
+        stats.add_time("network", 0.5)
+        stats.incr("retries")
+        registry.observe(stats)
+        registry.write(path, accumulate=True)
+
+    text = (tmp_path / "mes.prom").read_text()
+    assert 'mes_searches_total{engine="google"} 2' in text
+    assert 'mes_retries_total{engine="google"} 2' in text
+    assert 'mes_phase_seconds_sum{engine="google",phase="network"} 1.000000' in text
+    assert 'mes_phase_seconds_count{engine="google",phase="network"} 2' in text
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_cli_search_stats(mock_create_engine, tmp_path):
+    """测试 --stats 在标准错误输出统计，--stats-file 写入 Prometheus 文本"""
+    mock_create_engine.return_value = StaticEngine("duckduckgo")
+    stats_file = tmp_path / "mes.prom"
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "search",
+            "stats query",
+            "--output",
+            "json",
+            "--no-cache",
+            "--stats",
+            "--stats-file",
+            str(stats_file),
+        ],
+    )
+
+    assert result.exit_code == 0
+    assert "搜索统计" not in result.stdout
+    assert "搜索统计" in result.stderr
+    assert "构建" in result.stderr and "格式化" in result.stderr
+    assert 'mes_searches_total{engine="duckduckgo"} 1' in stats_file.read_text()
+
+    result = CliRunner().invoke(
+        app, ["search", "again", "--no-cache", "--stats-file", str(stats_file)]
+    )
+    assert result.exit_code == 0
+    assert 'mes_searches_total{engine="duckduckgo"} 2' in stats_file.read_text()
@@ -0,0 +1,134 @@
+"""
+测试多引擎并发搜索
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from multienginesearch.engines import SearchEngine, SearchResponse, SearchResult
+from multienginesearch.multi import multi_search, parse_engine_names, submit_daemon
+
+SRC_DIR = str(Path(__file__).resolve().parent.parent / "src")
+
+
+class SleepyEngine(SearchEngine):
+    """按指定延迟返回固定结果的测试引擎"""
+
+    def __init__(self, name: str, delay: float, count: int = 2):
+        self._name = name
+        self.delay = delay
+        self.count = count
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def search(self, query, limit=10, time_filter=None):
+        time.sleep(self.delay)
+        results = [
+            SearchResult(
+                f"{self._name} {i}", f"http://{self._name}/{i}", "", self._name
+            )
+            for i in range(min(self.count, limit))
+        ]
+        return SearchResponse(results)
+
+
+class BrokenEngine(SleepyEngine):
+    """总是抛出异常的测试引擎"""
+
+    def search(self, query, limit=10, time_filter=None):
+        raise RuntimeError("boom")
+
+
+def test_parse_engine_names():
+    """测试 --engine 参数解析"""
+    assert parse_engine_names(None) == ["duckduckgo"]
+    assert parse_engine_names("Google") == ["google"]
+    assert parse_engine_names("google, duckduckgo,google") == ["google", "duckduckgo"]
+    assert parse_engine_names("all") == ["duckduckgo", "google"]
+
+
+def test_multi_search_runs_concurrently():
+    """测试多引擎搜索的总耗时取决于最慢的引擎"""
+    engines = [SleepyEngine("a", 0.3), SleepyEngine("b", 0.3), SleepyEngine("c", 0.3)]
+
+    started = time.monotonic()
+    response = multi_search(engines, "query", limit=5)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.8
+    # 倒数排名融合：各引擎的第一名排在所有第二名之前
+    assert [r.engine for r in response.results] == ["a", "b", "c", "a", "b", "c"]
+    assert set(response.engine_meta) == {"a", "b", "c"}
+    assert response.engine_meta["b"]["count"] == 2
+
+
+def test_multi_search_timeout_and_errors():
+    """测试超时引擎和出错引擎不影响其它引擎的结果"""
+    engines = [
+        SleepyEngine("fast", 0.0),
+        SleepyEngine("slow", 2.0),
+        BrokenEngine("broken", 0.0),
+    ]
+
+    started = time.monotonic()
+    response = multi_search(engines, "query", timeout=0.3)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 1.5
+    assert [r.engine for r in response.results] == ["fast", "fast"]
+    assert response.engine_meta["slow"]["timed_out"] is True
+    assert response.engine_meta["broken"]["error"] == "boom"
+    assert "engines" in response.to_dict()
+
+
+def test_multi_search_timeout_does_not_delay_process_exit():
+    """测试超时的引擎不会让进程在退出时等待其线程结束"""
+    script = (
+        "import time\n"
+        "from multienginesearch.engines import SearchEngine, SearchResponse\n"
+        "from multienginesearch.multi import multi_search\n"
+        "class Hang(SearchEngine):\n"
+        "    name = 'hang'\n"
+        "    def search(self, query, limit=10, time_filter=None):\n"
+        "        time.sleep(10)\n"
+        "        return SearchResponse([])\n"
+        "response = multi_search([Hang()], 'q', timeout=0.2)\n"
+        "print(response.engine_meta['hang']['timed_out'])\n"
+    )
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    started = time.monotonic()
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=30,
+        check=True,
+    )
+    assert result.stdout.strip() == "True"
+    assert time.monotonic() - started < 5
+
+
+def test_submit_daemon_queued_future_can_be_cancelled():
+    """测试等待空位的任务可以被取消，取消后不会执行也不占用空位"""
+    slots = threading.BoundedSemaphore(1)
+    release = threading.Event()
+    ran = []
+
+    running = submit_daemon(release.wait, slots=slots)
+    queued = submit_daemon(ran.append, "queued", slots=slots)
+    time.sleep(0.05)
+    assert running.running()
+    assert queued.cancel()
+
+    release.set()
+    assert running.result(timeout=1)
+    assert submit_daemon(ran.append, "next", slots=slots).result(timeout=1) is None
+    assert ran == ["next"]
@@ -0,0 +1,70 @@
+"""
+测试分页续取令牌
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from multienginesearch.cache import CachedSearchEngine, ResultCache
+from multienginesearch.engines import SearchResponse, SearchResult
+from multienginesearch.paging import PageToken, search_page
+
+
+def _make_ranked_engine(total=100):
+    """构造按排名返回 http://example.com/<排名> 的模拟引擎，共 total 条结果"""
+    engine = MagicMock()
+    engine.name = "duckduckgo"
+    engine.cache_params.return_value = {}
+    engine.search.side_effect = lambda query, limit, time_filter=None, offset=0: (
+        SearchResponse(
+            [
+                SearchResult(f"R{i}", f"http://example.com/{i}", "", "duckduckgo")
+                for i in range(offset, min(offset + limit, total))
+            ]
+        )
+    )
+    return engine
+
+
+def test_page_token_round_trip():
+    """测试令牌编码后可以还原，且格式错误的令牌被拒绝"""
+    token = PageToken("google", "机器学习 tutorial", 20, "w").encode()
+    page = PageToken.decode(token)
+    assert (page.engine, page.query, page.offset, page.time_filter) == (
+        "google",
+        "机器学习 tutorial",
+        20,
+        "w",
+    )
+
+    for bad in ("not a token", PageToken("google", "q", -1).encode(), ""):
+        with pytest.raises(ValueError, match="无效的分页令牌"):
+            PageToken.decode(bad)
+
+
+def test_search_page_follows_tokens_until_exhausted(tmp_path):
+    """测试用令牌逐页向后翻页，最后一页不满时不再返回令牌"""
+    engine = _make_ranked_engine(total=25)
+    cached = CachedSearchEngine(engine, ResultCache(tmp_path / "cache.db"))
+
+    response, token = search_page(cached, "query", limit=10, time_filter="m")
+    assert response.results[-1].url == "http://example.com/9"
+
+    response, token = search_page(cached, token=token, limit=10)
+    assert response.results[0].url == "http://example.com/10"
+    assert engine.search.call_args.kwargs == {"time_filter": "m", "offset": 10}
+
+    response, token = search_page(cached, token=token, limit=10)
+    assert len(response.results) == 5
+    assert token is None
+
+
+def test_search_page_rejects_token_for_other_engine():
+    """测试令牌不能用于其它引擎"""
+    engine = _make_ranked_engine()
+    token = PageToken("google", "query", 10).encode()
+    with pytest.raises(ValueError, match="google"):
+        search_page(engine, token=token)
+    with pytest.raises(ValueError, match="query 或 token"):
+        search_page(engine)
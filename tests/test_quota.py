@@ -0,0 +1,203 @@
+"""
+测试 Google 配额持久化存储
+"""
+
+import json
+import multiprocessing
+from unittest.mock import MagicMock
+
+import pytest
+
+from multienginesearch.engines import GoogleEngine
+from multienginesearch.quota import (
+    CredentialPool,
+    GoogleCredential,
+    QuotaExceededError,
+    QuotaStore,
+    load_credential_pool,
+)
+
+
+def _reserve_many(path, count):
+    store = QuotaStore(path, daily_limit=1000)
+    for _ in range(count):
+        store.reserve().commit()
+
+
+def test_snapshot_does_not_write(tmp_path):
+    """测试只读路径不会创建或修改配额文件"""
+    path = tmp_path / "quota.json"
+    data = QuotaStore(path).snapshot()
+    assert data["requests_used"] == 0
+    assert not path.exists()
+
+
+def test_reserve_commit_and_cancel(tmp_path):
+    """测试预占、确认和退还配额"""
+    path = tmp_path / "quota.json"
+    store = QuotaStore(path, daily_limit=2)
+
+    store.reserve().commit()
+    pending = store.reserve()
+    assert store.snapshot()["requests_used"] == 2
+
+    with pytest.raises(QuotaExceededError):
+        store.reserve()
+
+    pending.cancel()
+    pending.cancel()  # 重复退还无效
+    assert store.snapshot()["requests_used"] == 1
+    assert json.loads(path.read_text())["requests_used"] == 1
+
+
+def test_corrupt_file_is_reset(tmp_path):
+    """测试损坏的配额文件被视为新的一天"""
+    path = tmp_path / "quota.json"
+    path.write_text("not json")
+    store = QuotaStore(path)
+    assert store.snapshot()["requests_used"] == 0
+    store.reserve().commit()
+    assert store.snapshot()["requests_used"] == 1
+
+
+def test_concurrent_processes_do_not_lose_increments(tmp_path):
+    """测试多个进程并发计数时不会丢失增量"""
+    path = tmp_path / "quota.json"
+    ctx = multiprocessing.get_context("fork")
+    processes = [ctx.Process(target=_reserve_many, args=(path, 25)) for _ in range(4)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+
+    assert QuotaStore(path).snapshot()["requests_used"] == 100
+
+
+def _pool(tmp_path, limits, strategy="most_remaining"):
+    credentials = [
+        GoogleCredential(
+            f"key-{i}", f"cx-{i}", QuotaStore(tmp_path / f"q{i}.json", limit)
+        )
+        for i, limit in enumerate(limits)
+    ]
+    return CredentialPool(credentials, strategy)
+
+
+def _google_transport(statuses):
+    """按密钥返回指定状态码的模拟传输对象，记录每次请求使用的密钥"""
+    transport = MagicMock()
+    transport.keys = []
+
+    def get(url, params=None):
+        transport.keys.append(params["key"])
+        response = MagicMock(status_code=statuses.get(params["key"], 200), content=b"")
+        response.json.return_value = {"items": []}
+        return response
+
+    transport.get.side_effect = get
+    return transport
+
+
+def test_load_credential_pool_from_env_and_file(tmp_path, monkeypatch):
+    """测试从环境变量和配置文件加载密钥池，MES_GOOGLE_API_KEY 沿用原来的配额文件"""
+    monkeypatch.setenv("MES_GOOGLE_API_KEY", "key-a")
+    monkeypatch.setenv("MES_GOOGLE_SEARCH_ENGINE_ID", "cx")
+    monkeypatch.setenv("MES_GOOGLE_API_KEY_2", "key-b")
+    keys_file = tmp_path / "keys.json"
+    keys_file.write_text(
+        json.dumps(
+            {
+                "strategy": "round_robin",
+                "keys": [
+                    {"api_key": "key-a", "search_engine_id": "cx"},
+                    {"api_key": "key-c", "daily_limit": 1000, "label": "team"},
+                ],
+            }
+        )
+    )
+    monkeypatch.setenv("MES_GOOGLE_KEYS_FILE", str(keys_file))
+
+    pool = load_credential_pool()
+
+    assert [c.api_key for c in pool.credentials] == ["key-a", "key-b", "key-c"]
+    assert [c.daily_limit for c in pool.credentials] == [100, 100, 1000]
+    assert pool.credentials[1].search_engine_id == "cx"
+    assert pool.credentials[2].label == "team"
+    assert pool.strategy == "round_robin"
+    assert pool.primary.store.path == tmp_path / ".mes_google_quota.json"
+    assert len({c.store.path for c in pool.credentials}) == 3
+
+    # 配额文件按密钥区分，与密钥在密钥池中的位置无关
+    paths = {c.api_key: c.store.path for c in pool.credentials}
+    monkeypatch.delenv("MES_GOOGLE_API_KEY")
+    pool = load_credential_pool()
+    assert pool.primary.api_key == "key-b"
+    assert pool.primary.store.path == paths["key-b"]
+    assert pool.credentials[2].store.path == paths["key-c"]
+
+    keys_file.write_text('[{"search_engine_id": "cx"}]')
+    with pytest.raises(ValueError, match="api_key"):
+        load_credential_pool()
+
+
+def test_pool_picks_most_remaining_and_skips_exhausted(tmp_path):
+    """测试按剩余配额选择密钥，用完的密钥被跳过"""
+    pool = _pool(tmp_path, [1, 3])
+
+    picked = [pool.reserve()[0].api_key for _ in range(4)]
+
+    assert picked == ["key-1", "key-1", "key-0", "key-1"]
+    with pytest.raises(QuotaExceededError, match="2 个密钥"):
+        pool.reserve()
+    assert pool.snapshot()["requests_used"] == 4
+
+
+def test_pool_round_robin(tmp_path):
+    """测试轮询选择密钥"""
+    pool = _pool(tmp_path, [10, 10, 10], strategy="round_robin")
+
+    picked = [pool.reserve()[0].api_key for _ in range(4)]
+
+    assert picked == ["key-0", "key-1", "key-2", "key-0"]
+    with pytest.raises(ValueError, match="策略"):
+        _pool(tmp_path, [1], strategy="random")
+
+
+def test_google_fails_over_on_403(tmp_path):
+    """测试密钥返回 403 时切换到下一个密钥并当天停用，限流信息包含每个密钥的用量"""
+    pool = _pool(tmp_path, [100, 50])
+    transport = _google_transport({"key-0": 403})
+    engine = GoogleEngine(transport=transport, credentials=pool)
+
+    response = engine.search("query", limit=1)
+    engine.search("query", limit=1)
+
+    assert transport.keys == ["key-0", "key-1", "key-1"]
+    assert response.stats.counters["key_failovers"] == 1
+    info = engine._get_quota_info()
+    assert info["daily_limit"] == 150
+    assert info["requests_used"] == 2
+    assert info["requests_remaining"] == 48
+    assert [(k["requests_used"], k["disabled"]) for k in info["keys"]] == [
+        (0, True),
+        (2, False),
+    ]
+
+    # 停用记录保存在配额文件中，之后的进程当天也不再使用该密钥
+    reloaded = _pool(tmp_path, [100, 50])
+    assert [c.is_disabled() for c in reloaded.credentials] == [True, False]
+    assert reloaded.reserve()[0].api_key == "key-1"
+
+
+def test_google_single_key_does_not_fail_over(tmp_path):
+    """测试只有一个密钥时 403 直接报错，限流信息与以前的格式一致"""
+    pool = _pool(tmp_path, [100])
+    transport = _google_transport({"key-0": 403})
+    engine = GoogleEngine(transport=transport, credentials=pool)
+
+    response = engine.search("query", limit=1)
+
+    assert response.results == []
+    assert transport.keys == ["key-0"]
+    assert "keys" not in engine._get_quota_info()
+    assert not pool.primary.is_disabled()
@@ -0,0 +1,204 @@
+"""
+测试请求限速
+"""
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from multienginesearch.clientpool import ClientPool
+from multienginesearch.engines import (
+    DuckDuckGoEngine,
+    GoogleEngine,
+    SearchEngine,
+    SearchError,
+    SearchResponse,
+)
+from multienginesearch.metrics import SearchStats, collecting
+from multienginesearch.ratelimit import (
+    RateLimitedSearchEngine,
+    RateLimiter,
+    SharedRateState,
+    parse_rate_limits,
+)
+from multienginesearch.transport import HttpTransport
+
+
+def test_parse_rate_limits():
+    """测试速率参数解析"""
+    assert parse_rate_limits(None) == {}
+    assert parse_rate_limits("Google=1, duckduckgo=0.5") == {
+        "google": 1.0,
+        "duckduckgo": 0.5,
+    }
+    with pytest.raises(ValueError):
+        parse_rate_limits("google")
+    with pytest.raises(ValueError):
+        parse_rate_limits("google=0")
+
+
+def test_rate_limiter_paces_requests():
+    """测试限速器按最小间隔放行请求"""
+    limiter = RateLimiter(rate=20)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    elapsed = time.monotonic() - started
+    assert 0.19 <= elapsed < 0.5
+
+
+def test_rate_limiter_allows_burst():
+    """测试令牌桶空闲时允许连续发出 burst 个请求，之后按速率放行"""
+    limiter = RateLimiter(rate=20, burst=3)
+    waits = [limiter._reserve() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.05, abs=0.01)
+    assert waits[4] == pytest.approx(0.10, abs=0.01)
+
+
+def test_rate_limiter_adapts_to_throttling():
+    """测试遇到限流时速率减半（不低于下限），成功后逐步恢复"""
+    limiter = RateLimiter(rate=8, min_rate=1, increase=0.25)
+    limiter.penalize()
+    assert limiter.rate == 4
+    for _ in range(5):
+        limiter.penalize()
+    assert limiter.rate == 1
+
+    limiter.reward()
+    assert limiter.rate == 3
+    for _ in range(5):
+        limiter.reward()
+    assert limiter.rate == 8
+
+    fixed = RateLimiter(rate=8, adaptive=False)
+    fixed.penalize()
+    assert fixed.rate == 8
+
+
+def test_shared_rate_state_across_limiters(tmp_path):
+    """测试使用同一状态文件的限速器（模拟不同进程）共同遵守同一个速率"""
+    path = tmp_path / "rate.json"
+    first = RateLimiter(rate=10, shared=SharedRateState(path), key="google")
+    second = RateLimiter(rate=10, shared=SharedRateState(path), key="google")
+    other = RateLimiter(rate=10, shared=SharedRateState(path), key="duckduckgo")
+
+    assert first._reserve() == 0.0
+    assert second._reserve() == pytest.approx(0.1, abs=0.02)
+    assert other._reserve() == 0.0
+
+    first.penalize()
+    assert second.rate == 5
+    assert other.rate == 10
+
+
+class _ThrottledEngine(SearchEngine):
+    """按预设序列返回是否被限流的测试引擎"""
+
+    def __init__(self, throttled):
+        self.throttled = list(throttled)
+
+    @property
+    def name(self):
+        return "test"
+
+    def search(self, query, limit=10, time_filter=None):
+        stats = SearchStats(self.name)
+        if self.throttled.pop(0):
+            stats.incr("errors")
+            stats.incr("throttled")
+        return SearchResponse([], stats=stats)
+
+
+def test_rate_limited_engine_feeds_back_throttling():
+    """测试包装器根据响应中的限流计数调整限速器，并记录等待时间"""
+    limiter = RateLimiter(rate=1000, increase=0.1)
+    engine = RateLimitedSearchEngine(_ThrottledEngine([True, True, False]), limiter)
+
+    engine.search("q")
+    engine.search("q")
+    assert limiter.rate == 250
+    response = engine.search("q")
+    assert limiter.rate == 350
+    assert "ratelimit" in response.stats.timings
+
+
+def test_rate_limited_google_takes_a_token_per_http_request(google_env):
+    """测试 Google 在每页和每次重试发出之前各取一个令牌，并发分页也按间隔发出"""
+    sent = []
+
+    def get(url, params=None, **kwargs):
+        sent.append(time.monotonic())
+        if len(sent) == 1:
+            return MagicMock(status_code=500, headers={})
+        response = MagicMock(status_code=200, content=b"", headers={})
+        response.json.return_value = {
+            "items": [
+                {"title": "t", "link": f"https://e.com/{params['start']}/{i}"}
+                for i in range(params["num"])
+            ]
+        }
+        return response
+
+    transport = HttpTransport(sleep=lambda delay: None)
+    transport.session = MagicMock()
+    transport.session.get.side_effect = get
+    limiter = RateLimiter(rate=20)
+    limiter.acquire = MagicMock(wraps=limiter.acquire)
+    engine = RateLimitedSearchEngine(GoogleEngine(transport=transport), limiter)
+
+    response = engine.search("q", limit=25)
+    # 三页加一次重试
+    assert limiter.acquire.call_count == len(sent) == 4
+    gaps = [b - a for a, b in zip(sent, sent[1:])]
+    assert min(gaps) >= 0.04
+    assert "ratelimit" in response.stats.timings
+
+
+def test_rate_limited_iter_search_penalizes_throttling_errors():
+    """测试流式搜索以异常抛出的限流错误同样降低速率"""
+
+    class _StreamingEngine(_ThrottledEngine):
+        def iter_search(self, query, limit=10, time_filter=None):
+            yield from ()
+            raise SearchError(self.name, "throttled", "429")
+
+    for stats in (None, SearchStats("x")):
+        limiter = RateLimiter(rate=1000)
+        engine = RateLimitedSearchEngine(_StreamingEngine([]), limiter)
+        with pytest.raises(SearchError):
+            if stats is None:
+                list(engine.iter_search("q"))
+            else:
+                with collecting(stats):
+                    list(engine.iter_search("q"))
+        assert limiter.rate == 500
+
+
+def test_transport_counts_throttled_responses():
+    """测试传输层把 429 响应计入限流次数"""
+    transport = HttpTransport(sleep=lambda delay: None)
+    throttled = MagicMock(status_code=429, headers={})
+    transport.session = MagicMock()
+    transport.session.get.side_effect = [throttled, MagicMock(status_code=200)]
+
+    stats = SearchStats("test")
+    with collecting(stats):
+        transport.get("http://example.com/")
+    assert stats.counters == {"throttled": 1, "retries": 1}
+
+
+def test_duckduckgo_counts_throttling_exceptions():
+    """测试 DuckDuckGo 的限流异常计入限流次数"""
+
+    class Throttled(Exception):
+        pass
+
+    class Client:
+        def text(self, **kwargs):
+            raise Throttled("202 Ratelimit")
+
+    engine = DuckDuckGoEngine(pool=ClientPool(Client, recycle_on=(Throttled,)))
+    response = engine.search("q")
+    assert response.stats.counters["throttled"] == 1
@@ -0,0 +1,123 @@
+"""
+测试搜索报告保存
+"""
+
+import csv
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from typer.testing import CliRunner
+
+from multienginesearch.batch import BatchQuery
+from multienginesearch.cli import app
+from multienginesearch.engines import SearchResponse, SearchResult
+from multienginesearch.save import SavedSearch, render_markdown, save_reports
+
+runner = CliRunner()
+
+
+def _fake_create_engine(name):
+    """为任意引擎名创建返回查询本身作为标题的模拟引擎，查询 fail 时出错"""
+    if name not in ("duckduckgo", "google"):
+        return None
+    engine = MagicMock()
+    engine.name = name
+    engine.cache_params.return_value = {}
+
+    def search(query, limit, time_filter=None):
+        if query == "fail":
+            raise RuntimeError("boom")
+        return SearchResponse([SearchResult(query, f"http://{name}.com", "摘要", name)])
+
+    engine.search.side_effect = search
+    return engine
+
+
+def test_render_markdown_uses_mesobs_template():
+    """测试 Markdown 报告与 mesobs.sh 生成的内容一致"""
+    saved = SavedSearch(
+        BatchQuery(0, "Python教程", "google", time_filter="w"),
+        SearchResponse(
+            [SearchResult("Python", "https://python.org", "官网", "google")]
+        ),
+        searched_at=datetime(2025, 6, 1, 8, 30),
+    )
+    lines = render_markdown(saved).splitlines()
+    assert lines[:6] == [
+        "# 搜索结果: Python教程",
+        "",
+        "搜索时间: 2025-06-01 08:30:00",
+        "搜索引擎: Google",
+        "时间筛选: 最近一周",
+        "",
+    ]
+    assert lines[6] == "🔍 找到 1 个搜索结果:"
+    assert " 1. Python" in lines
+
+
+def test_save_reports_names_files_and_skips_failures(tmp_path):
+    """测试每个查询一份报告，重复的查询不互相覆盖，失败的查询不写入"""
+    response = SearchResponse([SearchResult("T", "https://t.com", "", "duckduckgo")])
+    searches = [
+        SavedSearch(BatchQuery(0, "a b/c", time_filter="d"), response),
+        SavedSearch(BatchQuery(1, "a b/c", time_filter="d"), response),
+        SavedSearch(BatchQuery(2, "bad"), error="出错"),
+    ]
+    paths = save_reports(
+        searches, "md", directory=tmp_path, timestamp=datetime(2025, 6, 1, 8, 30)
+    )
+    assert [p.name for p in paths] == [
+        "search_20250601_083000_a_b_c_duckduckgo_d.md",
+        "search_20250601_083000_a_b_c_duckduckgo_d_2.md",
+    ]
+    # 没有遗留临时文件
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(p.name for p in paths)
+
+
+@patch("multienginesearch.batch.SearchEngineFactory.create_engine")
+def test_save_command_writes_combined_reports(mock_create_engine, tmp_path):
+    """测试 mes save 并发执行多个查询，写入 JSONL 和 CSV 报告，失败时以非零状态退出"""
+    mock_create_engine.side_effect = _fake_create_engine
+
+    report = tmp_path / "report.jsonl"
+    result = runner.invoke(
+        app,
+        ["save", "机器学习", "深度学习", "-e", "google", "-o", "jsonl"]
+        + ["--file", str(report), "--no-cache"],
+    )
+    assert result.exit_code == 0
+    rows = [json.loads(line) for line in report.read_text("utf-8").splitlines()]
+    assert [(r["query"], r["rank"], r["engine"]) for r in rows] == [
+        ("机器学习", 1, "google"),
+        ("深度学习", 1, "google"),
+    ]
+
+    queries = tmp_path / "queries.txt"
+    queries.write_text('fail\n{"query": "rust", "time": "m"}\n', encoding="utf-8")
+    result = runner.invoke(
+        app,
+        ["save", "-i", str(queries), "-o", "csv", "--dir", str(tmp_path / "out")]
+        + ["--no-cache"],
+    )
+    assert result.exit_code == 1
+    assert "boom" in result.stderr
+    (path,) = (tmp_path / "out").iterdir()
+    assert path.name.endswith("_rust_duckduckgo_m.csv")
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        (row,) = csv.DictReader(f)
+    assert (row["query"], row["title"], row["time_filter"]) == ("rust", "rust", "m")
+
+
+@patch("multienginesearch.batch.SearchEngineFactory.create_engine")
+def test_save_command_uses_mes_save_path(mock_create_engine, tmp_path, monkeypatch):
+    """测试默认保存到 MES_SAVE_PATH"""
+    mock_create_engine.side_effect = _fake_create_engine
+    monkeypatch.setenv("MES_SAVE_PATH", str(tmp_path / "notes"))
+
+    result = runner.invoke(app, ["save", "AI新闻", "--time", "d", "--no-cache"])
+    assert result.exit_code == 0
+    (path,) = (tmp_path / "notes").iterdir()
+    assert path.name.endswith("_AI新闻_duckduckgo_d.md")
+    assert path.read_text("utf-8").startswith("# 搜索结果: AI新闻\n")
+    assert str(path) in result.stdout
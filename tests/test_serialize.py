@@ -0,0 +1,88 @@
+"""
+测试结果模型和快速序列化
+"""
+
+import json
+
+import pytest
+
+from multienginesearch import serialize
+from multienginesearch.engines import SearchResponse, SearchResult
+
+
+def _response():
+    results = [
+        SearchResult(
+            '标题 "引号"', "https://例子.com/a?b=1", "换行\n和\t制表符", "google"
+        ),
+        SearchResult(
+            "Fused",
+            "https://example.com",
+            "",
+            "duckduckgo",
+            sources=[("duckduckgo", 1), ("google", 3)],
+            score=1 / 61 + 1 / 63,
+        ),
+        SearchResult("No sources", "", "", "bing", sources=[], score=None),
+        SearchResult(
+            "Fetched", "https://example.org", "", "google", content="正文\n第二行"
+        ),
+    ]
+    return SearchResponse(
+        results,
+        {"daily_limit": 100, "requests_used": 3, "limit_exceeded": False},
+        {"google": {"count": 2, "elapsed": 0.25}, "duckduckgo": {"count": 1}},
+    )
+
+
+def test_result_model_is_slotted():
+    """测试结果对象使用 __slots__，引擎名称被驻留"""
+    first = SearchResult("a", "u", "d", "".join(["goo", "gle"]))
+    second = SearchResult("b", "u", "d", "".join(["go", "ogle"]))
+    assert not hasattr(first, "__dict__")
+    assert not hasattr(SearchResponse([]), "__dict__")
+    assert first.engine is second.engine
+
+
+@pytest.mark.parametrize("response", [_response(), SearchResponse([])])
+def test_serializer_matches_json_module(monkeypatch, response):
+    """测试直接序列化与 json.dumps(to_dict()) 的输出逐字节相同"""
+    monkeypatch.setattr(serialize, "orjson", None)
+    data = response.to_dict()
+
+    assert serialize.response_json(response) == json.dumps(data, ensure_ascii=False)
+    assert serialize.response_json_pretty(response) == json.dumps(
+        data, ensure_ascii=False, indent=2
+    )
+    for result in response.results:
+        assert serialize.result_json(result) == json.dumps(
+            result.to_dict(), ensure_ascii=False
+        )
+
+    extra = {"index": 3, "query": "查询"}
+    assert serialize.response_json(response, extra) == json.dumps(
+        {**extra, **data}, ensure_ascii=False
+    )
+
+
+@pytest.mark.parametrize("score", [float("nan"), float("inf"), float("-inf"), 0.5])
+def test_serializer_formats_floats_like_json_module(score):
+    """测试非有限的分数与 json.dumps 一样输出 NaN/Infinity，而不是 nan/inf"""
+    response = SearchResponse(
+        [SearchResult("t", "u", "", "google", sources=[], score=score)]
+    )
+    data = response.to_dict()
+    assert serialize.response_json(response) == json.dumps(data, ensure_ascii=False)
+    assert serialize.response_json_pretty(response) == json.dumps(
+        data, ensure_ascii=False, indent=2
+    )
+
+
+def test_serializer_with_orjson():
+    """测试安装 orjson 时缩进 JSON 的格式不变"""
+    pytest.importorskip("orjson")
+    response = _response()
+    assert serialize.response_json_pretty(response) == json.dumps(
+        response.to_dict(), ensure_ascii=False, indent=2
+    )
+    assert serialize.loads(serialize.dumps({"a": "中文"})) == {"a": "中文"}
@@ -0,0 +1,178 @@
+"""
+测试 mes serve 搜索服务
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from multienginesearch.batch import EngineProvider
+from multienginesearch.cli import app
+from multienginesearch.engines import SearchResponse, SearchResult
+from multienginesearch.metrics import MetricsRegistry, SearchStats
+from multienginesearch.server import SearchServer, search_via_server
+
+runner = CliRunner()
+
+
+def _fake_create_engine(name):
+    """为 google 和 duckduckgo 创建返回查询本身作为标题的模拟引擎"""
+    if name not in ("duckduckgo", "google"):
+        return None
+    engine = MagicMock()
+    engine.name = name
+    engine.cache_params.return_value = {}
+
+    def search(query, limit, time_filter=None):
+        stats = SearchStats(name)
+        stats.incr("requests")
+        return SearchResponse(
+            [SearchResult(query, f"http://{name}.com/{query}", "", name)],
+            stats=stats,
+        )
+
+    engine.search.side_effect = search
+    return engine
+
+
+@pytest.fixture
+def server():
+    with patch(
+        "multienginesearch.batch.SearchEngineFactory.create_engine",
+        side_effect=_fake_create_engine,
+    ) as create_engine:
+        server = SearchServer(
+            ("127.0.0.1", 0), EngineProvider(), registry=MetricsRegistry()
+        )
+        server.create_engine = create_engine
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+
+def _get(server, path):
+    with urllib.request.urlopen(server.url + path) as response:
+        return response.read().decode("utf-8")
+
+
+def _post(server, path, body: bytes):
+    request = urllib.request.Request(server.url + path, data=body)
+    with urllib.request.urlopen(request) as response:
+        return response.read().decode("utf-8")
+
+
+def test_search_reuses_warm_engines(server):
+    """测试 GET 和 POST /search，引擎只创建一次"""
+    data = json.loads(_get(server, "/search?q=python&engine=google&limit=5"))
+    assert data["count"] == 1
+    assert data["results"][0]["title"] == "python"
+
+    body = json.dumps({"query": "rust", "engine": "google"}).encode("utf-8")
+    data = json.loads(_post(server, "/search", body))
+    assert data["results"][0]["url"] == "http://google.com/rust"
+    assert "stats" not in data
+    assert server.create_engine.call_count == 1
+
+
+def test_search_multi_engine_with_stats(server):
+    """测试多引擎搜索和按需返回的统计"""
+    data = search_via_server(
+        server.url,
+        {"query": "go", "engine": "google,duckduckgo", "weights": "google=2"},
+    )
+    assert [r["engine"] for r in data["results"]] == ["google", "duckduckgo"]
+    assert set(data["engines"]) == {"google", "duckduckgo"}
+
+    data = search_via_server(server.url, {"query": "rust", "stats": True})
+    assert SearchStats.from_dict(data["stats"]).counters == {"requests": 1}
+
+    # duckduckgo 已经搜索过 go，服务内的记忆化缓存直接返回
+    data = search_via_server(server.url, {"query": "go", "stats": True})
+    assert SearchStats.from_dict(data["stats"]).counters == {"memo_hits": 1}
+
+
+def test_search_rejects_invalid_parameters(server):
+    """测试参数错误返回 400 和错误信息"""
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        _get(server, "/search?q=python&limit=500")
+    assert excinfo.value.code == 400
+    assert "limit" in json.loads(excinfo.value.read())["error"]
+
+    with pytest.raises(ValueError, match="不支持"):
+        search_via_server(server.url, {"query": "x", "engine": "bing"})
+
+    for weights in ("google=-1", {"google": -1}, {"google": "x"}):
+        body = json.dumps({"query": "x", "weights": weights}).encode("utf-8")
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            _post(server, "/search", body)
+        assert excinfo.value.code == 400
+        assert "权重" in json.loads(excinfo.value.read())["error"]
+
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        _get(server, "/nowhere")
+    assert excinfo.value.code == 404
+
+
+def test_batch_streams_ndjson(server):
+    """测试 /batch 按行返回每个查询的结果"""
+    body = 'python\n{"query": "rust", "engine": "google"}\n{bad\n'
+    lines = _post(server, "/batch?limit=3", body.encode("utf-8")).splitlines()
+    records = sorted((json.loads(line) for line in lines), key=lambda r: r["index"])
+
+    assert [r["query"] for r in records] == ["python", "rust", "{bad"]
+    assert records[0]["engine"] == "duckduckgo"
+    assert records[1]["results"][0]["engine"] == "google"
+    assert records[2]["error"]["kind"] == "request"
+
+
+def test_metrics_and_health(server):
+    """测试 /metrics 累计请求的指标，/health 列出已创建的引擎"""
+    _get(server, "/search?q=python&engine=google")
+
+    metrics = _get(server, "/metrics")
+    assert 'mes_searches_total{engine="google"} 1' in metrics
+    assert 'mes_requests_total{engine="google"} 1' in metrics
+
+    health = json.loads(_get(server, "/health"))
+    assert health["status"] == "ok"
+    assert health["engines"] == ["google"]
+
+
+def test_cli_search_forwards_to_server(server):
+    """测试 mes search --server 转发搜索并按本地格式输出"""
+    result = runner.invoke(
+        app,
+        ["search", "remote query", "--server", server.url, "-e", "google", "--stats"],
+    )
+    assert result.exit_code == 0
+    assert "remote query" in result.stdout
+    assert "http://google.com/remote query" in result.stdout
+    assert "搜索统计" in result.stderr
+
+
+def test_cli_search_rejects_local_only_options_with_server():
+    """测试 --server 与只在本地生效的选项同时使用时报错，而不是忽略这些选项"""
+    result = runner.invoke(
+        app,
+        ["search", "python", "--server", "http://127.0.0.1:9"]
+        + ["--hedge", "--no-cache", "--deadline", "google=5"],
+    )
+    assert result.exit_code == 1
+    assert "--server 不支持以下选项: --deadline, --hedge, --no-cache" in result.stdout
+    assert "无法连接搜索服务" not in result.stdout
+
+
+def test_cli_search_reports_unreachable_server():
+    """测试无法连接服务时给出错误"""
+    result = runner.invoke(
+        app, ["search", "python", "--server", "http://127.0.0.1:9", "--timeout", "1"]
+    )
+    assert result.exit_code == 1
+    assert "无法连接搜索服务" in result.stdout
@@ -0,0 +1,96 @@
+"""
+测试 CLI 启动开销和引擎延迟加载
+"""
+
+import json
+import os
+import subprocess
+import sys
+from importlib.metadata import EntryPoint
+from pathlib import Path
+from unittest.mock import patch
+
+from multienginesearch.engines import SearchEngineFactory
+
+SRC_DIR = str(Path(__file__).resolve().parent.parent / "src")
+
+# mes version 等命令启动时不应加载的模块：引擎的第三方依赖，
+# 以及批量搜索、缓存、历史、对冲等只有部分命令才用到的模块
+HEAVY_MODULES = (
+    "duckduckgo_search",
+    "requests",
+    "pytz",
+    "orjson",
+    "sqlite3",
+    "multienginesearch.aio",
+    "multienginesearch.batch",
+    "multienginesearch.breaker",
+    "multienginesearch.cache",
+    "multienginesearch.fetch",
+    "multienginesearch.hedge",
+    "multienginesearch.history",
+    "multienginesearch.memo",
+    "multienginesearch.quota",
+    "multienginesearch.ratelimit",
+    "multienginesearch.save",
+    "multienginesearch.serialize",
+    "multienginesearch.server",
+    "multienginesearch.transport",
+    "multienginesearch.watch",
+)
+
+
+def _run_python(*args):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, env=env, check=True
+    )
+
+
+def _loaded_heavy_modules(code):
+    """在新进程中执行 code，返回其中已加载的 HEAVY_MODULES"""
+    result = _run_python(
+        "-c",
+        f"import json, sys\n{code}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))",
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_cli_import_does_not_load_heavy_modules():
+    """测试导入 CLI 不会加载引擎的第三方依赖和只有部分命令才用到的模块"""
+    assert _loaded_heavy_modules("import multienginesearch.cli") == []
+
+
+def test_version_command_does_not_load_heavy_modules():
+    """测试 mes version 和 mes config 只加载运行它们所需的模块"""
+    code = (
+        "from typer.testing import CliRunner\n"
+        "from multienginesearch.cli import app\n"
+        "assert 'Multi-Engine Search' in CliRunner().invoke(app, ['version']).stdout\n"
+        "assert 'duckduckgo' in CliRunner().invoke(app, ['config', '--list']).stdout"
+    )
+    assert _loaded_heavy_modules(code) == []
+
+
+def test_factory_resolves_import_paths_and_entry_points(monkeypatch):
+    """测试工厂延迟导入字符串登记的引擎，并发现入口点注册的引擎"""
+    monkeypatch.setattr(
+        SearchEngineFactory, "_engines", dict(SearchEngineFactory._engines)
+    )
+    monkeypatch.setattr(SearchEngineFactory, "_entry_points_loaded", False)
+
+    plugin = EntryPoint(
+        name="plugin",
+        value="multienginesearch.engines:DuckDuckGoEngine",
+        group=SearchEngineFactory.ENTRY_POINT_GROUP,
+    )
+    with patch("importlib.metadata.entry_points", return_value=[plugin]):
+        assert "plugin" in SearchEngineFactory.get_available_engines()
+
+    engine = SearchEngineFactory.create_engine("plugin")
+    assert engine is not None and engine.name == "duckduckgo"
+
+    SearchEngineFactory.register_engine("broken", "nonexistent.module:Engine")
+    assert SearchEngineFactory.create_engine("broken") is None
@@ -0,0 +1,94 @@
+"""
+测试 HTTP 传输层的重试和退避
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from multienginesearch.transport import HttpTransport
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """按预设的状态码序列依次响应"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        server.ports.add(self.client_address[1])
+        status, headers = server.script.pop(0) if server.script else (200, {})
+        body = b'{"ok": true}'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.script = []
+    server.requests = 0
+    server.ports = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_retry_respects_retry_after(stub_server):
+    """测试 429 时遵循 Retry-After，并复用 keep-alive 连接"""
+    delays = []
+    transport = HttpTransport(sleep=delays.append)
+    stub_server.script = [(429, {"Retry-After": "2"}), (503, {})]
+    url = f"http://127.0.0.1:{stub_server.server_port}/"
+
+    response = transport.get(url)
+
+    assert response.status_code == 200
+    assert stub_server.requests == 3
+    assert delays[0] == 2.0
+    assert 0 <= delays[1] <= transport.backoff_base * 2
+    assert len(stub_server.ports) == 1
+
+
+def test_retries_exhausted_returns_last_response(stub_server):
+    """测试重试用尽后返回最后一次响应"""
+    delays = []
+    transport = HttpTransport(max_retries=2, sleep=delays.append)
+    stub_server.script = [(500, {})] * 5
+    url = f"http://127.0.0.1:{stub_server.server_port}/"
+
+    response = transport.get(url)
+
+    assert response.status_code == 500
+    assert stub_server.requests == 3
+    assert len(delays) == 2
+
+
+def test_google_quota_charged_once_per_billed_request(stub_server, google_env):
+    """测试重试的请求只有在最终成功时才计入 Google 配额"""
+    from unittest.mock import patch
+
+    from multienginesearch.engines import GoogleEngine
+
+    transport = HttpTransport(sleep=lambda _: None)
+    stub_server.script = [(429, {}), (503, {})]
+    engine = GoogleEngine(transport=transport)
+    url = f"http://127.0.0.1:{stub_server.server_port}/"
+
+    with patch("multienginesearch.engines.GOOGLE_API_URL", url):
+        engine.search("query", limit=1)
+
+    assert stub_server.requests == 3
+    assert engine.quota_data["requests_used"] == 1
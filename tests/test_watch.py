@@ -0,0 +1,156 @@
+"""
+测试定期监测新结果
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from typer.testing import CliRunner
+
+from multienginesearch.batch import BatchQuery
+from multienginesearch.cli import app
+from multienginesearch.engines import SearchResponse, SearchResult
+from multienginesearch.watch import (
+    SeenFilter,
+    WatchScheduler,
+    WatchTask,
+    Watcher,
+    parse_duration,
+)
+
+runner = CliRunner()
+
+
+def test_seen_filter_remembers_urls_and_round_trips(tmp_path):
+    """测试过滤器记录见过的 URL，保存后可以还原，文件大小与 URL 数量无关"""
+    seen = SeenFilter(capacity=1000, error_rate=0.01)
+    assert seen.add("https://a.com")
+    assert not seen.add("https://a.com")
+    assert "https://a.com" in seen and "https://b.com" not in seen
+
+    path = tmp_path / "seen.bloom"
+    seen.save(path)
+    size = path.stat().st_size
+    loaded = SeenFilter.load(path)
+    assert "https://a.com" in loaded and not loaded.add("https://a.com")
+
+    for i in range(500):
+        loaded.add(f"https://example.com/{i}")
+    loaded.save(path)
+    assert path.stat().st_size == size
+
+    path.write_bytes(b"broken")
+    with pytest.raises(ValueError, match="已损坏"):
+        SeenFilter.load(path)
+
+
+def test_seen_filter_rotates_generations():
+    """测试当前一代写满后轮换：最近的 URL 仍被记住，两代之前的被忘记"""
+    seen = SeenFilter(capacity=10, error_rate=0.001)
+    first = [f"https://old.com/{i}" for i in range(10)]
+    for url in first:
+        seen.add(url)
+    for i in range(10):
+        seen.add(f"https://mid.com/{i}")
+    assert all(url in seen for url in first)
+    for i in range(10):
+        seen.add(f"https://new.com/{i}")
+    assert sum(url in seen for url in first) <= 1
+
+
+def test_scheduler_spreads_google_queries_over_remaining_quota():
+    """测试 Google 查询的间隔按剩余配额放宽并错开，配额用完时等到重置之后"""
+    now = [1000.0]
+    budget = [(24, 86400.0)]
+    tasks = [
+        WatchTask(BatchQuery(0, "a", "google")),
+        WatchTask(BatchQuery(1, "b", "google")),
+        WatchTask(BatchQuery(2, "c", "duckduckgo")),
+    ]
+    scheduler = WatchScheduler(
+        tasks, interval=600, quota=lambda: budget[0], clock=lambda: now[0]
+    )
+    scheduler.start()
+    # 每轮 2 次请求，剩余 24 次要用满 86400 秒：每 7200 秒一轮，两个查询错开 3600 秒
+    assert [t.next_due for t in tasks] == [1000.0, 4600.0, 1000.0]
+
+    scheduler.reschedule(tasks[2])
+    assert tasks[2].next_due == 1600.0
+    scheduler.reschedule(tasks[0])
+    assert tasks[0].next_due == 8200.0
+
+    budget[0] = (0, 3000.0)
+    scheduler.reschedule(tasks[1])
+    assert tasks[1].next_due == 1000.0 + 3000.0 + 60
+
+
+def test_watcher_emits_only_new_results(tmp_path):
+    """测试只产出没有见过的结果（按规范化 URL 判断），--prime 时第一次只记录"""
+    pages = iter(
+        [
+            ["https://a.com/", "https://b.com"],
+            ["http://www.a.com", "https://c.com"],
+        ]
+    )
+
+    def search(batch_query):
+        return SearchResponse(
+            [SearchResult(url, url, "", "duckduckgo") for url in next(pages)]
+        )
+
+    task = WatchTask(BatchQuery(0, "q"))
+    path = tmp_path / "seen.bloom"
+    watcher = Watcher(
+        WatchScheduler([task], 60, clock=lambda: 0.0),
+        SeenFilter(1000),
+        search,
+        seen_path=path,
+        prime=True,
+        sleep=lambda seconds: None,
+    )
+    assert watcher.poll(task) == (None, [])
+    error, new = watcher.poll(task)
+    assert error is None and [r.url for r in new] == ["https://c.com"]
+    assert "https://b.com" in SeenFilter.load(path)
+
+
+def test_parse_duration():
+    """测试时长解析"""
+    assert parse_duration("90") == 90
+    assert parse_duration("30m") == 1800
+    assert parse_duration("1.5h") == 5400
+    with pytest.raises(ValueError, match="无效的时长"):
+        parse_duration("0m")
+
+
+@patch("multienginesearch.cli.SearchEngineFactory.create_engine")
+def test_watch_once_outputs_new_results_across_runs(mock_create_engine, tmp_path):
+    """测试 mes watch --once 两次运行之间记住见过的结果，只输出新结果"""
+    engine = MagicMock()
+    engine.name = "duckduckgo"
+    engine.search.return_value = SearchResponse(
+        [SearchResult("A", "https://a.com", "", "duckduckgo")]
+    )
+    mock_create_engine.return_value = engine
+    state = str(tmp_path / "seen.bloom")
+
+    result = runner.invoke(app, ["watch", "news", "--once", "--state", state])
+    assert result.exit_code == 0
+    record = json.loads(result.stdout)
+    assert (record["query"], record["url"]) == ("news", "https://a.com")
+    engine.search.assert_called_once_with("news", 10, time_filter="d")
+
+    engine.search.return_value = SearchResponse(
+        [
+            SearchResult("A", "https://a.com/", "", "duckduckgo"),
+            SearchResult("B", "https://b.com", "", "duckduckgo"),
+        ]
+    )
+    result = runner.invoke(app, ["watch", "news", "--once", "--state", state])
+    assert [json.loads(line)["url"] for line in result.stdout.splitlines()] == [
+        "https://b.com"
+    ]
+
+    result = runner.invoke(app, ["watch", "news", "--every", "soon"])
+    assert result.exit_code == 1